@@ -1,48 +1,252 @@
 import sys
 import os
+import time
+import asyncio
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import numpy as np
-from tensorflow.keras.models import load_model
+import yaml
 import pandas as pd
+import logging
 from data.loader import DataLoader
-import tensorflow as tf
+from data.categorical import CategoricalEncoder
+from data.feature_store import FeatureStore
+from data.refresh import ActionFileWatcher, FeatureRefresher
+from api import codec
+from api.batching import QueueFullError
+from api.log_utils import configure_logging
+from api.model_manager import ModelManager
+from api.metrics import FEATURE_LOOKUP, IDS_MISSING, IDS_REQUESTED, IN_FLIGHT_REQUESTS, REQUEST_ERRORS, REQUEST_LATENCY
+from api.prediction_cache import PredictionCache
+from api.ranking import ScoreTableCache
+from api.recording import RequestRecorder
+from api.startup import StartupManager
+from api.workers import InferenceWorkerPool, configure_tf_threads, cpu_limit, thread_counts
+from models.serving import categories_path_for, load_serving_model, read_manifest
 
 
-tf.config.threading.set_intra_op_parallelism_threads(2)
 # Define input data schema using Pydantic
 class PredictionRequest(BaseModel):
     ids: List[int]  # List of IDs for which predictions are needed
 
+class RankRequest(BaseModel):
+    ids: Optional[List[int]] = None  # Ids to rank; None ranks all ids (of the segment)
+    segment: Optional[str] = None    # 0/1 feature selecting the candidates, e.g. an INDUSTRY_* dummy
+    k: int = 100                     # Number of top ids to return
+    class_index: int = 1             # Class whose probability is ranked
+
+class ActionBatch(BaseModel):
+    actions: List[Dict[str, Any]]  # New action rows, with the columns of actions.csv
+
 # Initialize FastAPI app
 app = FastAPI()
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = os.environ.get("CONFIG_PATH", "./config.yaml")
+
+def load_config(config_path: str) -> dict:
+    """
+    Read the configuration file, or return an empty dict if there is none.
+    """
+    try:
+        with open(config_path, "r") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        logger.warning(f"Config file {config_path} not found, using defaults.")
+        return {}
+
+config = load_config(CONFIG_PATH)
+serving_config = config.get("serving") or {}
+data_config = config.get("data") or {}
+
+# Leveled logging, rate limited per call site so the request path cannot flood stdout
+logging_config = serving_config.get("logging", {})
+configure_logging(logging_config.get("level", "INFO"), logging_config.get("rate_limit_per_second", 10))
+
+# Served model, its runtime, and paths to artifacts and data files
+model_config = serving_config.get("model", {})
+MODEL_NAME = model_config.get("name", "tensorflow")
+RUNTIME = model_config.get("runtime", "keras")
+MODEL_PATH = model_config.get("path", "./artifacts/tf_model.h5")
+PREPROCESSOR_PATH = model_config.get("preprocessor_path")
+MANIFEST_PATH = model_config.get("manifest")
+CUSTOMERS_FILE = data_config.get("customers_file", "./data/customers.csv")
+NONCUSTOMERS_FILE = data_config.get("noncustomers_file", "./data/noncustomers.csv")
+ACTIONS_FILE = data_config.get("actions_file", "./data/actions.csv")
+CACHE_DIR = data_config.get("cache_dir")
+CHUNKSIZE = data_config.get("chunksize")
+NUM_LOADER_WORKERS = data_config.get("num_workers", 1)
+CATEGORIES_PATH = data_config.get("categories_path")
+worker_config = serving_config.get("workers", {})
+WORKER_KIND = worker_config.get("kind", "thread")
+NUM_WORKERS = worker_config.get("num_workers", 1)
+
+# Size TensorFlow thread pools from the pod's CPU limit, split across the inference workers
+intra_op_threads, inter_op_threads = thread_counts(cpu_limit(), NUM_WORKERS)
+intra_op_threads = worker_config.get("intra_op_threads") or intra_op_threads
+inter_op_threads = worker_config.get("inter_op_threads") or inter_op_threads
+refresh_config = serving_config.get("refresh", {})
+startup_config = serving_config.get("startup", {})
+manager_config = serving_config.get("model_manager", {})
+
+# Populated in the background by the startup phases below
+model_manager = None
+loader = None
+refresher = None
+watcher = None
+feature_store = None
+startup = StartupManager()
+
+# Per-id outputs of repeatedly scored ids, keyed by model and feature store version
+cache_config = serving_config.get("prediction_cache", {})
+prediction_cache = PredictionCache(cache_config.get("max_entries", 100_000), cache_config.get("ttl_seconds"),
+                                   cache_config.get("max_entries_per_request", 10_000)) \
+    if cache_config.get("enabled", True) else None
+# Requests with more ids skip the cache: its per-id bookkeeping would cost more than
+# batch scoring saves, and their ids are rarely requested again
+CACHE_MAX_REQUEST_IDS = cache_config.get("max_request_ids", 1024)
 
-# Paths to artifacts and data files
-MODEL_PATH = "./artifacts/tf_model.h5"
-CUSTOMERS_FILE = "./data/customers.csv"
-NONCUSTOMERS_FILE = "./data/noncustomers.csv"
-ACTIONS_FILE = "./data/actions.csv"
-
-# Load the trained TensorFlow model
-try:
-    model = load_model(MODEL_PATH)
-    print("Model loaded successfully.")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
-
-# Load and preprocess the merged data
-try:
-    loader = DataLoader(CUSTOMERS_FILE, NONCUSTOMERS_FILE, ACTIONS_FILE)
-    merged_data = loader.load_and_preprocess()
-    print("Merged data loaded successfully.")
-except Exception as e:
-    print(f"Error loading merged data: {e}")
-    merged_data = None
+# Full-table class probabilities for /rank, recomputed when the model or the features change
+ranking_config = serving_config.get("ranking", {})
+score_tables = ScoreTableCache(ranking_config.get("chunk_rows", 65536))
+
+# Optionally append incoming /predict payloads to a JSONL log for scripts/replay.py
+record_config = serving_config.get("record", {})
+recorder = RequestRecorder(record_config["path"], record_config.get("sample_rate", 1.0),
+                           record_config.get("max_requests")) if record_config.get("path") else None
+
+def build_pool(model_path: str, preprocessor_path: Optional[str]) -> InferenceWorkerPool:
+    """
+    Start inference workers running a model with the configured runtime.
+    """
+    load_args = (MODEL_NAME, model_path, RUNTIME, preprocessor_path)
+    if WORKER_KIND == "process":
+        # Every worker process loads its own copy of the model
+        uses_tensorflow = MODEL_NAME == "tensorflow" and RUNTIME == "keras"
+        return InferenceWorkerPool(
+            kind="process", num_workers=NUM_WORKERS,
+            load_fn=load_serving_model, load_args=load_args,
+            intra_op_threads=intra_op_threads if uses_tensorflow else None,
+            inter_op_threads=inter_op_threads,
+        )
+    return InferenceWorkerPool(load_serving_model(*load_args), kind="thread", num_workers=NUM_WORKERS)
+
+def load_inference():
+    """
+    Load the trained model with the configured runtime, with its inference workers and
+    batcher. The model manager swaps in new versions later, if enabled.
+    """
+    global model_manager
+    if WORKER_KIND != "process" and MODEL_NAME == "tensorflow" and RUNTIME == "keras":
+        configure_tf_threads(intra_op_threads, inter_op_threads)
+    shadow_config = manager_config.get("shadow", {})
+    model_manager = ModelManager(
+        build_pool, serving_config.get("batching", {}),
+        model_path=MODEL_PATH, preprocessor_path=PREPROCESSOR_PATH, manifest_path=MANIFEST_PATH,
+        warm_up=warm_up_model,
+        interval_seconds=manager_config.get("interval_seconds", 30),
+        keep_previous=manager_config.get("keep_previous", True),
+        shadow_sample_rate=shadow_config.get("sample_rate", 0.0) if shadow_config.get("enabled") else 0.0,
+        shadow_min_requests=shadow_config.get("min_requests", 200),
+        min_agreement=shadow_config.get("min_agreement", 0.98),
+        max_latency_ratio=shadow_config.get("max_latency_ratio", 1.5),
+        auto_promote=shadow_config.get("auto_promote", True),
+    )
+    model_manager.load_initial()
+    deployment = model_manager.active
+    logger.info(f"Model '{MODEL_NAME}' version {deployment.version} loaded successfully ({RUNTIME} runtime, "
+                f"{deployment.model_path}, preprocessor {deployment.preprocessor_path}).")
+
+def categories_path() -> Optional[str]:
+    """
+    The category vocabulary the served model was trained with: data.categories_path, the
+    one published with the manifest's version, or the one saved next to the model file.
+    """
+    if CATEGORIES_PATH:
+        return CATEGORIES_PATH
+    path = read_manifest(MANIFEST_PATH)["categories_path"] if MANIFEST_PATH else categories_path_for(MODEL_PATH)
+    return path if path and os.path.exists(path) else None
+
+def load_features():
+    """
+    Load and preprocess the merged data, then index it for per-id lookups.
+    With incremental refresh enabled, the running per-id aggregates are kept as well.
+    """
+    global loader, refresher, watcher, feature_store
+    path = categories_path()
+    if path is None:
+        logger.warning("No category vocabulary saved with the model; fitting it on the served data, "
+                       "so the dummy columns may not match the ones the model was trained on.")
+    loader = DataLoader(CUSTOMERS_FILE, NONCUSTOMERS_FILE, ACTIONS_FILE, cache_dir=CACHE_DIR,
+                        chunksize=CHUNKSIZE, num_workers=NUM_LOADER_WORKERS,
+                        encoder=CategoricalEncoder.load(path) if path else None,
+                        window_features=data_config.get("window_features"))
+    if refresh_config.get("enabled"):
+        refresher = FeatureRefresher(loader)
+        feature_store = refresher.build()
+        if refresh_config.get("watch_dir"):
+            watcher = ActionFileWatcher(refresher, refresh_config["watch_dir"],
+                                        refresh_config.get("interval_seconds", 60))
+            watcher.start()
+    else:
+        merged_data = loader.load_and_preprocess()
+        feature_store = FeatureStore.from_frame(merged_data)
+    logger.info(f"Merged data loaded successfully ({len(feature_store)} ids).")
+
+def warm_up_model(deployment):
+    """
+    Check that a model version's features match the served ones (their names, or
+    without a preprocessor, the model's input width), then run a forward pass on every
+    one of its inference workers with real feature rows, so its first request does not
+    pay for graph tracing or worker process start-up.
+    """
+    store = current_feature_store()
+    if deployment.feature_names is not None and list(deployment.feature_names) != store.feature_names:
+        raise ValueError(f"The model was trained on {len(deployment.feature_names)} features that do not match "
+                         f"the {store.num_features} served features (names or order differ).")
+    if deployment.input_width is not None and deployment.input_width != store.num_features:
+        raise ValueError(f"The model takes {deployment.input_width} inputs but {store.num_features} features are "
+                         f"served; retrain required (models trained before the '<prefix>_Unknown' category "
+                         f"columns were added take fewer inputs).")
+    if not startup_config.get("warmup", True):
+        return
+    rows = store.features[:max(1, min(len(store), startup_config.get("warmup_rows", 32)))]
+    futures = [deployment.pool.submit(rows) for _ in range(deployment.pool.num_workers)]
+    for future in futures:
+        future.result()
+
+def warm_up():
+    """
+    Warm up the initial model version, then start watching for new ones.
+    """
+    warm_up_model(model_manager.active)
+    if ranking_config.get("precompute"):
+        score_tables.get(current_feature_store(), model_manager.active)
+    if manager_config.get("enabled"):
+        model_manager.start()
+
+def current_feature_store():
+    """
+    The feature store snapshot to serve from; refreshed stores are swapped in atomically.
+    """
+    return refresher.store if refresher is not None else feature_store
+
+@app.on_event("startup")
+def start_loading():
+    """
+    Load the model and the features in parallel in the background, so the server binds
+    its port immediately. /readyz reports when they are loaded and warmed up.
+    """
+    startup.start(
+        {"model": load_inference, "features": load_features},
+        warmup=warm_up,
+    )
 
 @app.get("/")
 def health_check():
@@ -51,58 +255,300 @@ def health_check():
     """
     return {"status": "ok"}
 
+@app.get("/healthz")
+def healthz():
+    """
+    Liveness probe: the process is up and serving HTTP.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """
+    Readiness probe: the model and features are loaded and warmed up.
+    Also reports the status and duration of every startup phase.
+    """
+    status = startup.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
 @app.post("/predict/")
-def predict(data: PredictionRequest):
+async def predict(data: PredictionRequest, probabilities: bool = False):
     """
     Predict endpoint to make predictions using the trained model.
     
     Args:
         data (PredictionRequest): Input data containing a list of IDs for which predictions are needed.
+        probabilities (bool): Also return the class probabilities of every found ID.
     
     Returns:
-        dict: Predictions for the input IDs.
+        dict: Predictions for the found IDs (in request order), the IDs they belong to,
+            and the IDs that were not found.
+    """
+    if recorder is not None:
+        recorder.record("/predict/", data.dict())
+    with IN_FLIGHT_REQUESTS.track_inprogress(), REQUEST_LATENCY.time():
+        check_ready()
+        ids, predictions_prob, missing_ids = await score(data.ids)
+    predictions = np.argmax(predictions_prob, axis=1)  # Convert probabilities to class labels
+    response = {
+        "predictions": predictions.tolist(),
+        "ids": ids.tolist(),
+        "missing_ids": missing_ids,
+    }
+    if probabilities:
+        response["probabilities"] = predictions_prob.tolist()
+    return response
+
+@app.post("/rank")
+async def rank(data: RankRequest):
     """
-    if model is None:
-        raise HTTPException(status_code=500, detail="Model is not loaded.")
-    if merged_data is None:
-        raise HTTPException(status_code=500, detail="Merged data is not loaded.")
+    Rank ids by predicted probability, e.g. the best leads of a segment.
+
+    All ids are scored once per model and feature store version, in one batched pass;
+    a query then selects the top k from these scores (argpartition) instead of
+    running the model or sorting the whole table.
+
+    Args:
+        data (RankRequest): Candidate ids and/or segment, k and the ranked class.
+
+    Returns:
+        dict: The top ids with their probabilities, highest first, and requested ids
+            that were not found.
+    """
+    check_ready()
+    if data.k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1.")
+    store = current_feature_store()
+    deployment = model_manager.active
+    table = await asyncio.to_thread(score_tables.get, store, deployment)
+
+    rows, missing_ids = None, []
+    if data.ids is not None:
+        lookup_rows = store.row_index(data.ids)
+        missing_ids = [data.ids[i] for i in np.flatnonzero(lookup_rows < 0)]
+        rows = np.unique(lookup_rows[lookup_rows >= 0])
+    try:
+        ranked, scores = table.rank(data.k, data.class_index, rows, data.segment)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "ids": store.ids[ranked].tolist(),
+        "probabilities": scores.tolist(),
+        "missing_ids": missing_ids,
+        "model_version": deployment.version,
+    }
+
+@app.post("/predict/binary")
+async def predict_binary(request: Request, stream: bool = False, chunk_size: int = 8192):
+    """
+    Predict endpoint for large batches, in the binary format of api.codec: the body is
+    the ids as packed little-endian int64, the response holds the found ids with their
+    float32 probabilities and int8 classes, and the missing ids.
+
+    Args:
+        stream (bool): Stream the response as one record per chunk_size ids, so clients
+            can consume results while later chunks are still being scored.
+        chunk_size (int): Ids per streamed record.
+    """
+    with IN_FLIGHT_REQUESTS.track_inprogress(), REQUEST_LATENCY.time():
+        check_ready()
+        try:
+            ids = codec.decode_ids(await request.body())
+        except ValueError as e:
+            REQUEST_ERRORS.labels(reason="invalid_request").inc()
+            raise HTTPException(status_code=400, detail=str(e))
+        if chunk_size < 1:
+            raise HTTPException(status_code=400, detail="chunk_size must be at least 1.")
+        if not stream:
+            found, predictions_prob, missing_ids = await score(ids, require_found=False)
+            return Response(codec.encode_record(found, predictions_prob, missing_ids), media_type=codec.MEDIA_TYPE)
+
+    async def records():
+        # Score the next chunk while the current one is being sent
+        chunks = [ids[start:start + chunk_size] for start in range(0, max(len(ids), 1), chunk_size)]
+        pending = asyncio.ensure_future(score(chunks[0], require_found=False))
+        try:
+            for index in range(len(chunks)):
+                found, predictions_prob, missing_ids = await pending
+                last = index == len(chunks) - 1
+                if not last:
+                    pending = asyncio.ensure_future(score(chunks[index + 1], require_found=False))
+                yield codec.encode_record(found, predictions_prob, missing_ids, last=last)
+        except Exception as e:
+            # The status is already sent; the missing last record tells the client
+            logger.error(f"Streaming prediction failed: {e!r}")
+        finally:
+            pending.cancel()
+    return StreamingResponse(records(), media_type=codec.MEDIA_TYPE)
+
+def check_ready():
+    """
+    Raise 503 until the model and the features are loaded.
+    """
+    if not startup.ready:
+        REQUEST_ERRORS.labels(reason="not_ready").inc()
+        raise HTTPException(status_code=503, detail="Model and merged data are not loaded yet.",
+                            headers={"Retry-After": "5"})
+
+async def score(request_ids: Sequence[int], require_found: bool = True) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """
+    Look up the features of the requested ids and predict their class probabilities,
+    serving repeated ids from the prediction cache (for requests of at most
+    prediction_cache.max_request_ids found ids).
+
+    Args:
+        request_ids (Sequence[int]): Requested ids, as a list or an int64 array.
+        require_found (bool): Fail with 400 if none of the ids is found.
+
+    Returns:
+        Tuple: (found ids in request order, their (found, classes) probabilities, missing ids)
+    """
+    store = current_feature_store()
+    # The version that answers this request, even if a new one is swapped in meanwhile
+    deployment = model_manager.active
+    IDS_REQUESTED.inc(len(request_ids))
 
     # Lookup features for the provided IDs
     try:
-        features = merged_data[merged_data["id"].isin(data.ids)].drop(columns=["id", "IS_CUSTOMER"])
-        if features.empty:
+        with FEATURE_LOOKUP.time():
+            lookup = store.lookup(request_ids)
+        IDS_MISSING.inc(len(lookup.missing_ids))
+        if require_found and len(lookup.ids) == 0:
             raise ValueError("No matching IDs found.")
     except Exception as e:
+        REQUEST_ERRORS.labels(reason="lookup").inc()
+        logger.warning(f"Feature lookup failed for {len(request_ids)} ids: {e}")
         raise HTTPException(status_code=400, detail=f"Error during feature lookup: {e}")
+    if len(lookup.ids) == 0:
+        return lookup.ids, np.empty((0, 0), dtype=np.float32), lookup.missing_ids
+
+    # Serve repeated ids from the prediction cache; only the misses go to inference
+    cache = prediction_cache if len(lookup.ids) <= CACHE_MAX_REQUEST_IDS else None
+    if cache is not None:
+        ids = lookup.ids.tolist()
+        cached = cache.get_many(deployment.version, store.version, ids)
+        misses = [i for i, output in enumerate(cached) if output is None]
+    else:
+        ids = lookup.ids
+        misses = range(len(ids))
+    features = lookup.features[misses] if len(misses) < len(ids) else lookup.features
+
+    predictions_prob = None
+    if misses:
+        # Missing values are filled by the model's preprocessor, if it has one
+        if not (np.isfinite(features) if deployment.preprocessor_path is None else ~np.isinf(features)).all():
+            REQUEST_ERRORS.labels(reason="invalid_features").inc()
+            logger.error(f"Non-finite features for ids {lookup.ids[:10].tolist()}.")
+            raise HTTPException(status_code=500, detail="Input contains NaN or infinite values.")
+        logger.debug("Predicting %d rows (%d cached, %d missing ids), features %s %s.",
+                     len(misses), len(ids) - len(misses), len(lookup.missing_ids), features.dtype, features.shape)
 
-    # Convert features to numpy array
-    features = features.astype(np.float32).to_numpy()
-    print('yes new code')
-    if np.isnan(features).any() or np.isinf(features).any():
-        raise ValueError("Input contains NaN or infinite values.")
+        # Hand the forward pass to the worker pool; shed load once the queue is full
+        try:
+            submitted = time.perf_counter()
+            future = deployment.batcher.submit(features)
+        except QueueFullError as e:
+            REQUEST_ERRORS.labels(reason="queue_full").inc()
+            logger.warning(str(e))
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
-    # Check data type
-    print(f"Features dtype: {features.dtype}")  # Should be float32
+        try:
+            # Make predictions, batched together with concurrent requests
+            predictions_prob = await asyncio.wrap_future(future)
+        except Exception as e:
+            REQUEST_ERRORS.labels(reason="prediction").inc()
+            logger.error(f"Prediction failed: {e!r}")
+            raise HTTPException(status_code=500, detail=f"Error during prediction: {e}")
+        # A new version that is shadowing this one scores a sample of the same rows
+        model_manager.shadow(features, predictions_prob, time.perf_counter() - submitted)
+        if cache is not None:
+            cache.put_many(deployment.version, store.version, [ids[i] for i in misses], predictions_prob)
 
-    # Check shape
-    print(f"Features shape: {features.shape}")
+    if len(misses) < len(ids):
+        # Merge cached rows and fresh predictions back into request order
+        outputs = list(cached)
+        for i, output in zip(misses, predictions_prob if misses else ()):
+            outputs[i] = output
+        predictions_prob = np.stack(outputs)
 
+    return lookup.ids, predictions_prob, lookup.missing_ids
+
+@app.post("/admin/actions")
+def apply_actions(batch: ActionBatch):
+    """
+    Apply new action rows to the served features without reloading the actions log.
+
+    Args:
+        batch (ActionBatch): New action rows.
+
+    Returns:
+        dict: Version and size of the feature store now being served.
+    """
+    if refresher is None:
+        raise HTTPException(status_code=409, detail="Incremental refresh is not enabled.")
     try:
-        # Make predictions
-        tensor_input = tf.convert_to_tensor(features, dtype=tf.float32)
-        print("1")
-        predictions_prob = model.predict(tensor_input)
-        print("2")
-        predictions = np.argmax(predictions_prob, axis=1)  # Convert probabilities to class labels
-        print("3")
-        return {"predictions": predictions.tolist()}
+        store = refresher.apply_actions(pd.DataFrame(batch.actions))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error during prediction: {e}")
+        raise HTTPException(status_code=400, detail=f"Error applying actions: {e}")
+    return {"version": store.version, "num_ids": len(store)}
+
+def check_model_loaded():
+    """
+    Raise 503 until the model manager has loaded a version.
+    """
+    if model_manager is None or model_manager.active is None:
+        raise HTTPException(status_code=503, detail="The model is not loaded yet.",
+                            headers={"Retry-After": "5"})
+
+@app.get("/admin/model")
+def model_status():
+    """
+    The active, previous and candidate model versions, with the shadow comparison.
+    """
+    check_model_loaded()
+    return model_manager.status()
+
+@app.post("/admin/model/promote")
+def promote_model():
+    """
+    Promote the shadowing candidate version to active.
+    """
+    check_model_loaded()
+    try:
+        model_manager.promote()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return model_manager.status()
+
+@app.post("/admin/model/rollback")
+def rollback_model():
+    """
+    Swap the previous model version back in.
+    """
+    check_model_loaded()
+    try:
+        model_manager.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return model_manager.status()
+
+@app.on_event("shutdown")
+def shutdown():
+    """
+    Stop the background threads and the inference workers when the server shuts down.
+    """
+    if watcher is not None:
+        watcher.stop()
+    if model_manager is not None:
+        model_manager.stop()
+    if recorder is not None:
+        recorder.close()
 
 @app.get("/metrics")
 def metrics():
     """
-    Metrics endpoint for Prometheus scraping.
+    Metrics endpoint for Prometheus scraping, in the text exposition format.
     """
-    from prometheus_client import generate_latest
-    return generate_latest()
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
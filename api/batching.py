@@ -0,0 +1,234 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, NamedTuple, Optional
+import numpy as np
+import logging
+from api.metrics import (
+    BATCH_ERRORS, BATCH_REQUESTS, BATCH_SIZE, FORWARD_PASS, LAST_BATCH_SIZE, QUEUE_DEPTH, QUEUE_WAIT, REJECTED_REQUESTS,
+)
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """
+    Raised by MicroBatcher.submit when the admission queue is at capacity.
+    """
+    pass
+
+
+class BatcherStoppedError(QueueFullError):
+    """
+    Raised by MicroBatcher.submit after stop(). It is a QueueFullError, so callers
+    answer it the same way (try again); a retry reaches the version that replaced it.
+    """
+    pass
+
+
+class _PendingRequest(NamedTuple):
+    features: np.ndarray
+    future: Future
+    enqueued_at: float
+
+
+class MicroBatcher:
+    """
+    Server-side dynamic batcher. Concurrent requests are collected for up to
+    max_latency_ms (or until max_batch_size rows are queued), run through a single
+    forward pass, and each caller receives its own slice of the output.
+
+    When a worker pool is given, forward passes run on the pool and the batcher only
+    assembles batches; while every worker is busy, requests keep queueing (and form
+    larger batches) until the admission queue is full.
+    """
+
+    def __init__(self, predict_fn: Optional[Callable[[np.ndarray], np.ndarray]],
+                 max_batch_size: int = 256, max_latency_ms: float = 5.0,
+                 max_queue_size: int = 0, pool=None):
+        """
+        Initialize the batcher.
+
+        Args:
+            predict_fn (Callable): Maps a float32 (rows, features) batch to per-row outputs.
+                Unused when a pool is given.
+            max_batch_size (int): Maximum number of rows in one forward pass. A single
+                request larger than this runs as its own batch.
+            max_latency_ms (float): Longest time the first request of a batch waits for
+                other requests to join.
+            max_queue_size (int): Maximum number of queued requests; submit() raises
+                QueueFullError beyond it. 0 means unbounded.
+            pool (InferenceWorkerPool, optional): Pool that runs the forward passes.
+                Without one, they run on the batching thread.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self.pool = pool
+        self._queue = queue.Queue()
+        self._carry = None
+        self._thread = None
+        self._stopped = threading.Event()
+        # Orders submit() against stop(), so nothing is queued after the final drain
+        self._submit_lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the background batching thread.
+        """
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Micro-batcher started (max_batch_size={self.max_batch_size}, "
+                    f"max_latency_ms={self.max_latency * 1000:g}).")
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop the batching thread. It finishes the batch in progress, then runs the
+        requests that are still queued (or held over for the next batch) as final
+        batches before it exits, so every submitted future resolves. submit() raises
+        BatcherStoppedError from here on.
+
+        Only the batching thread takes requests off the queue: if it does not exit
+        within timeout (e.g. a slow forward pass), it still resolves them afterwards.
+        """
+        if self._thread is None:
+            return
+        with self._submit_lock:
+            self._stopped.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Micro-batcher did not stop within {timeout}s; it runs its pending requests "
+                           f"once the batch in progress finishes.")
+            return
+        self._thread = None
+
+    def submit(self, features: np.ndarray) -> Future:
+        """
+        Queue a request for batched inference.
+
+        Args:
+            features (numpy.ndarray): float32 feature rows for this request.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the output rows for this request.
+
+        Raises:
+            QueueFullError: If max_queue_size requests are already waiting.
+            BatcherStoppedError: If the batcher was stopped.
+        """
+        future = Future()
+        with self._submit_lock:
+            if self._stopped.is_set():
+                raise BatcherStoppedError("The inference batcher was stopped.")
+            if self.max_queue_size and self._queue.qsize() >= self.max_queue_size:
+                REJECTED_REQUESTS.inc()
+                raise QueueFullError(f"Inference queue is full ({self.max_queue_size} requests waiting).")
+            self._queue.put(_PendingRequest(features, future, time.perf_counter()))
+            QUEUE_DEPTH.inc()
+        return future
+
+    def queue_depth(self) -> int:
+        """
+        Number of requests waiting to be batched, including one held over for the next batch.
+        """
+        return self._queue.qsize() + (self._carry is not None)
+
+    def _next_request(self, timeout: float):
+        if self._carry is not None:
+            request, self._carry = self._carry, None
+            return request
+        if timeout > 0:
+            request = self._queue.get(timeout=timeout)
+        else:
+            request = self._queue.get_nowait()
+        QUEUE_DEPTH.dec()
+        return request
+
+    def _collect(self) -> List[_PendingRequest]:
+        """
+        Block for the first request, then gather more until the batch is full or the
+        latency budget of the first request runs out. Requests that are already queued
+        (e.g. while all workers were busy) join the batch even past the deadline.
+        """
+        try:
+            first = self._next_request(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch, rows = [first], len(first.features)
+        deadline = first.enqueued_at + self.max_latency
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._next_request(timeout=remaining)
+            except queue.Empty:
+                break
+            if rows + len(request.features) > self.max_batch_size:
+                # Leave it for the next batch rather than exceed the size limit
+                self._carry = request
+                break
+            batch.append(request)
+            rows += len(request.features)
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if batch:
+                self._process(batch)
+        # Nothing is queued after stop(); run what is left
+        while self._carry is not None or not self._queue.empty():
+            batch = self._collect()
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch: List[_PendingRequest]):
+        """
+        Run one forward pass for the batch and hand each request its slice of the output.
+        """
+        started = time.perf_counter()
+        for request in batch:
+            QUEUE_WAIT.observe(started - request.enqueued_at)
+
+        try:
+            if len(batch) == 1:
+                inputs = batch[0].features
+            else:
+                inputs = np.concatenate([request.features for request in batch])
+            BATCH_SIZE.observe(len(inputs))
+            BATCH_REQUESTS.observe(len(batch))
+            LAST_BATCH_SIZE.set(len(inputs))
+            if self.pool is not None:
+                self.pool.submit(inputs).add_done_callback(
+                    lambda future: self._resolve(batch, future))
+                return
+            with FORWARD_PASS.time():
+                outputs = self.predict_fn(inputs)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        self._deliver(batch, outputs)
+
+    def _resolve(self, batch: List[_PendingRequest], future: Future):
+        error = future.exception()
+        if error is not None:
+            self._fail(batch, error)
+        else:
+            self._deliver(batch, future.result())
+
+    def _fail(self, batch: List[_PendingRequest], error: BaseException):
+        BATCH_ERRORS.inc()
+        logger.error(f"Batched forward pass failed: {error!r}")
+        for request in batch:
+            request.future.set_exception(error)
+
+    def _deliver(self, batch: List[_PendingRequest], outputs: np.ndarray):
+        offsets = np.cumsum([len(request.features) for request in batch])[:-1]
+        for request, output in zip(batch, np.split(outputs, offsets)):
+            request.future.set_result(output)
@@ -0,0 +1,155 @@
+"""
+Compact binary format of the /predict/binary endpoint, for large batch calls where
+JSON validation and encoding cost more than inference.
+
+Request body: the ids as packed little-endian int64 (no header).
+
+Response body: one or more records, each a 24-byte header followed by its arrays:
+
+    header   magic b"MLPR", uint16 version, uint16 flags, uint32 num_found,
+             uint32 num_missing, uint32 num_classes, 4 bytes padding
+    int64    ids[num_found]                        found ids, in request order
+    float32  probabilities[num_found, num_classes]
+    int8     classes[num_found]                    argmax of the probabilities
+    (padding to a multiple of 8 bytes)
+    int64    missing_ids[num_missing]
+
+All numbers are little-endian. A streamed response holds one record per chunk of the
+request; the last record has the LAST flag set, so a stream cut short by an error can
+be told apart from a complete one.
+"""
+import struct
+from typing import Iterable, Iterator, List, NamedTuple, Sequence
+import numpy as np
+
+MEDIA_TYPE = "application/x-predictions"
+MAGIC = b"MLPR"
+VERSION = 1
+LAST = 1
+HEADER = struct.Struct("<4sHHIII4x")
+
+_IDS = np.dtype("<i8")
+_PROBABILITIES = np.dtype("<f4")
+
+
+class PredictionRecord(NamedTuple):
+    ids: np.ndarray
+    probabilities: np.ndarray
+    classes: np.ndarray
+    missing_ids: np.ndarray
+    last: bool
+
+
+def decode_ids(body: bytes) -> np.ndarray:
+    """
+    Ids of a binary request body.
+
+    Raises:
+        ValueError: If the body is not a whole number of int64 values.
+    """
+    if len(body) % _IDS.itemsize:
+        raise ValueError(f"Request body of {len(body)} bytes is not a sequence of int64 ids.")
+    return np.frombuffer(body, dtype=_IDS).astype(np.int64, copy=False)
+
+
+def encode_ids(ids: Sequence[int]) -> bytes:
+    """
+    Binary request body for the given ids.
+    """
+    return np.asarray(ids, dtype=_IDS).tobytes()
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+def encode_record(ids: np.ndarray, probabilities: np.ndarray, missing_ids: Sequence[int], last: bool = True) -> bytes:
+    """
+    Encode the predictions of found ids, and the missing ids, as one record.
+
+    Args:
+        ids (numpy.ndarray): Found ids.
+        probabilities (numpy.ndarray): (found, classes) class probabilities.
+        missing_ids (Sequence[int]): Ids that were not found.
+        last (bool): Whether this is the last record of the response.
+    """
+    probabilities = np.asarray(probabilities, dtype=_PROBABILITIES).reshape(len(ids), -1) \
+        if len(ids) else np.empty((0, 0), dtype=_PROBABILITIES)
+    num_classes = probabilities.shape[1]
+    if num_classes > 127:
+        raise ValueError(f"{num_classes} classes do not fit the int8 class labels.")
+    classes = probabilities.argmax(axis=1).astype(np.int8) if len(ids) else np.empty(0, dtype=np.int8)
+    return b"".join((
+        HEADER.pack(MAGIC, VERSION, LAST if last else 0, len(ids), len(missing_ids), num_classes),
+        np.asarray(ids, dtype=_IDS).tobytes(),
+        probabilities.tobytes(),
+        classes.tobytes(),
+        bytes(_padding(probabilities.nbytes + classes.nbytes)),
+        np.asarray(missing_ids, dtype=_IDS).tobytes(),
+    ))
+
+
+def record_size(header: bytes) -> int:
+    """
+    Size in bytes of the record that starts with this header, header included.
+    """
+    magic, version, _, num_found, num_missing, num_classes = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} prediction record.")
+    arrays = num_found * (8 + 4 * num_classes + 1)
+    return HEADER.size + arrays + _padding(arrays - 8 * num_found) + 8 * num_missing
+
+
+def decode_record(data: bytes, offset: int = 0) -> PredictionRecord:
+    """
+    Decode the record at offset. The arrays are read-only views of data.
+    """
+    _, _, flags, num_found, num_missing, num_classes = HEADER.unpack_from(data, offset)
+    offset += HEADER.size
+    ids = np.frombuffer(data, dtype=_IDS, count=num_found, offset=offset)
+    offset += ids.nbytes
+    probabilities = np.frombuffer(data, dtype=_PROBABILITIES, count=num_found * num_classes, offset=offset)
+    offset += probabilities.nbytes
+    classes = np.frombuffer(data, dtype=np.int8, count=num_found, offset=offset)
+    offset += classes.nbytes + _padding(probabilities.nbytes + classes.nbytes)
+    missing_ids = np.frombuffer(data, dtype=_IDS, count=num_missing, offset=offset)
+    return PredictionRecord(ids, probabilities.reshape(num_found, num_classes), classes, missing_ids,
+                            bool(flags & LAST))
+
+
+def iter_records(chunks: Iterable[bytes]) -> Iterator[PredictionRecord]:
+    """
+    Decode records from a response body as it arrives, in chunks of any size (e.g.
+    httpx's Response.iter_bytes()).
+
+    Raises:
+        ValueError: If the body ends before the record with the LAST flag.
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= HEADER.size and len(buffer) >= record_size(buffer[:HEADER.size]):
+            size = record_size(buffer[:HEADER.size])
+            record = decode_record(bytes(buffer[:size]))
+            del buffer[:size]
+            yield record
+            if record.last:
+                return
+    raise ValueError("The prediction stream ended before its last record.")
+
+
+def decode_response(data: bytes) -> PredictionRecord:
+    """
+    Decode a whole response body, concatenating the records of a streamed one.
+    """
+    records: List[PredictionRecord] = list(iter_records([data]))
+    found = [record for record in records if len(record.ids)]
+    num_classes = found[0].probabilities.shape[1] if found else 0
+    return PredictionRecord(
+        np.concatenate([record.ids for record in records]),
+        np.concatenate([record.probabilities for record in found]) if found
+        else np.empty((0, num_classes), dtype=_PROBABILITIES),
+        np.concatenate([record.classes for record in records]),
+        np.concatenate([record.missing_ids for record in records]),
+        True,
+    )
@@ -0,0 +1,59 @@
+import time
+import threading
+import logging
+from typing import Optional
+
+
+class RateLimitedFilter(logging.Filter):
+    """
+    Lets through at most `rate` records per `per_seconds` from each call site (logger,
+    file and line), so logging on the request path cannot flood stdout under load.
+    The first record let through after a suppressed stretch notes how many were dropped.
+    Records at or above `always_level` are never dropped.
+    """
+
+    def __init__(self, rate: int = 10, per_seconds: float = 1.0, always_level: int = logging.ERROR):
+        super().__init__()
+        self.rate = rate
+        self.per_seconds = per_seconds
+        self.always_level = always_level
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.always_level:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - window_start >= self.per_seconds:
+                window_start, count = now, 0
+            if count >= self.rate:
+                self._windows[key] = (window_start, count, suppressed + 1)
+                return False
+            self._windows[key] = (window_start, count + 1, 0)
+
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+def configure_logging(level: str = "INFO", rate: Optional[int] = 10, per_seconds: float = 1.0):
+    """
+    Set up leveled logging for the service: a stream handler on the root logger at the
+    given level, rate limited per call site.
+
+    Args:
+        level (str): Log level name, e.g. 'DEBUG' or 'INFO'.
+        rate (int, optional): Records per call site and period; None disables rate limiting.
+        per_seconds (float): Length of the rate limiting period.
+    """
+    logging.basicConfig(level=level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    if rate is None:
+        return
+    for handler in root.handlers:
+        if not any(isinstance(f, RateLimitedFilter) for f in handler.filters):
+            handler.addFilter(RateLimitedFilter(rate, per_seconds))
@@ -0,0 +1,77 @@
+"""
+Prometheus metrics of the serving path, registered in one place so dashboards can
+break a /predict request down by stage: feature lookup, queueing, tensor conversion
+and the forward pass.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+
+# Requests
+REQUEST_LATENCY = Histogram(
+    "predict_request_seconds", "Total /predict request latency.", buckets=LATENCY_BUCKETS)
+IN_FLIGHT_REQUESTS = Gauge(
+    "predict_requests_in_flight", "/predict requests currently being handled.")
+IDS_REQUESTED = Counter(
+    "predict_ids_requested_total", "IDs requested through /predict.")
+IDS_MISSING = Counter(
+    "predict_ids_missing_total", "Requested IDs that were not found in the feature store.")
+REQUEST_ERRORS = Counter(
+    "predict_errors_total", "Failed /predict requests, by reason.", ["reason"])
+
+# Stages
+FEATURE_LOOKUP = Histogram(
+    "feature_lookup_seconds", "Time to gather the feature rows of a request.", buckets=LATENCY_BUCKETS)
+TENSOR_CONVERSION = Histogram(
+    "tensor_conversion_seconds", "Time to convert a batch to the model's input tensor.", buckets=LATENCY_BUCKETS)
+FORWARD_PASS = Histogram(
+    "model_forward_seconds", "Time of one batched model forward pass.", buckets=LATENCY_BUCKETS)
+
+# Batching
+QUEUE_DEPTH = Gauge(
+    "inference_queue_depth", "Requests waiting to be batched for inference.")
+QUEUE_WAIT = Histogram(
+    "inference_queue_wait_seconds", "Time a request waits in the queue before its batch runs.",
+    buckets=LATENCY_BUCKETS[:-1])
+BATCH_SIZE = Histogram(
+    "inference_batch_size", "Rows per batched forward pass.", buckets=ROW_BUCKETS)
+BATCH_REQUESTS = Histogram(
+    "inference_batch_requests", "Requests merged into one batched forward pass.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+LAST_BATCH_SIZE = Gauge(
+    "inference_last_batch_size", "Rows in the most recent batched forward pass.")
+IN_FLIGHT_BATCHES = Gauge(
+    "inference_batches_in_flight", "Batched forward passes currently running on the workers.")
+IN_FLIGHT_ROWS = Gauge(
+    "inference_rows_in_flight", "Rows in the forward passes currently running on the workers.")
+BATCH_ERRORS = Counter(
+    "inference_batch_errors_total", "Batched forward passes that raised an exception.")
+REJECTED_REQUESTS = Counter(
+    "inference_rejected_requests_total", "Requests rejected because the inference queue was full.")
+
+# Startup
+PHASE_SECONDS = Gauge(
+    "startup_phase_seconds", "Wall time of each startup phase.", ["phase"])
+READY = Gauge(
+    "startup_ready", "1 once the model and features are loaded and warmed up.")
+
+# Prediction cache
+PREDICTION_CACHE_HITS = Counter(
+    "prediction_cache_hits_total", "Requested ids served from the prediction cache.")
+PREDICTION_CACHE_MISSES = Counter(
+    "prediction_cache_misses_total", "Requested ids not in the prediction cache.")
+PREDICTION_CACHE_EVICTIONS = Counter(
+    "prediction_cache_evictions_total", "Prediction cache entries evicted as least recently used.")
+PREDICTION_CACHE_ENTRIES = Gauge(
+    "prediction_cache_entries", "Ids currently in the prediction cache.")
+
+# Model versions
+MODEL_SWAPS = Counter(
+    "model_swaps_total", "Served model version changes, by reason (promote, rollback).", ["reason"])
+MODEL_LOAD_ERRORS = Counter(
+    "model_load_errors_total", "New model versions that failed to load or warm up.")
+SHADOW_ROWS = Counter(
+    "shadow_rows_total", "Rows scored by a shadow model version alongside the active one.")
+SHADOW_DISAGREEMENTS = Counter(
+    "shadow_disagreements_total", "Shadow rows whose predicted class differs from the active version's.")
@@ -0,0 +1,425 @@
+import os
+import time
+import random
+import threading
+from typing import Callable, Optional, Tuple
+import numpy as np
+import logging
+from api.batching import MicroBatcher, QueueFullError
+from api.metrics import MODEL_LOAD_ERRORS, MODEL_SWAPS, SHADOW_DISAGREEMENTS, SHADOW_ROWS
+from data.cache import file_digest
+from models.serving import load_preprocessor, model_input_width, preprocessor_path_for, read_manifest
+logger = logging.getLogger(__name__)
+
+# Replaced versions keep their workers this long, so requests that picked the version
+# just before a swap still find its batcher running
+RETIRE_GRACE_SECONDS = 5.0
+
+
+class ModelDeployment:
+    """
+    One loaded model version: its inference worker pool and the batcher in front of it.
+    Every version has its own, so a batch never mixes rows of two versions, and a
+    replaced version finishes its queued batches undisturbed.
+    """
+
+    def __init__(self, version: str, model_path: str, preprocessor_path: Optional[str], pool, batching: dict):
+        """
+        Initialize the deployment and start its batcher.
+
+        Args:
+            version (str): Version id, e.g. the content digest of the model file.
+            model_path (str): Model artifact.
+            preprocessor_path (str, optional): Preprocessor applied by the serving function.
+            pool (InferenceWorkerPool): Workers running this version's serving function.
+            batching (dict): MicroBatcher arguments (serving.batching).
+        """
+        self.version = version
+        self.model_path = model_path
+        self.preprocessor_path = preprocessor_path
+        self.feature_names = load_preprocessor(preprocessor_path).get_required_features() \
+            if preprocessor_path is not None else None
+        # Without a preprocessor, served features go to the model as they are
+        self.input_width = model_input_width(model_path) if preprocessor_path is None else None
+        self.pool = pool
+        self.batcher = MicroBatcher(None, pool=pool, **batching)
+        self.batcher.start()
+        self.loaded_at = time.time()
+
+    def status(self) -> dict:
+        return {"version": self.version, "model_path": self.model_path,
+                "preprocessor_path": self.preprocessor_path, "loaded_at": round(self.loaded_at, 3)}
+
+    def stop(self):
+        """
+        Stop the batcher and the workers. The batcher runs the requests still queued as
+        final batches, and the workers finish them before they shut down.
+        """
+        self.batcher.stop()
+        self.pool.shutdown()
+
+
+class ShadowComparison:
+    """
+    Running comparison of a candidate version with the active one, on the same rows of
+    live traffic: how often they predict the same class, how far their probabilities
+    are apart, and their latency (submit to result, batching included).
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.rows = 0
+        self.agreeing_rows = 0
+        self.max_abs_diff = 0.0
+        self.errors = 0
+        self.active_seconds = 0.0
+        self.candidate_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, active_outputs: np.ndarray, candidate_outputs: np.ndarray,
+            active_seconds: float, candidate_seconds: float):
+        agreeing = int((active_outputs.argmax(axis=1) == candidate_outputs.argmax(axis=1)).sum())
+        diff = float(np.abs(active_outputs - candidate_outputs).max()) if len(active_outputs) else 0.0
+        SHADOW_ROWS.inc(len(active_outputs))
+        SHADOW_DISAGREEMENTS.inc(len(active_outputs) - agreeing)
+        with self._lock:
+            self.requests += 1
+            self.rows += len(active_outputs)
+            self.agreeing_rows += agreeing
+            self.max_abs_diff = max(self.max_abs_diff, diff)
+            self.active_seconds += active_seconds
+            self.candidate_seconds += candidate_seconds
+
+    def add_error(self):
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+
+    @property
+    def agreement(self) -> Optional[float]:
+        return self.agreeing_rows / self.rows if self.rows else None
+
+    @property
+    def latency_ratio(self) -> Optional[float]:
+        return self.candidate_seconds / self.active_seconds if self.active_seconds else None
+
+    def summary(self) -> dict:
+        with self._lock:
+            compared = self.requests - self.errors
+            return {
+                "requests": self.requests,
+                "rows": self.rows,
+                "errors": self.errors,
+                "agreement": None if self.agreement is None else round(self.agreement, 6),
+                "max_abs_diff": round(self.max_abs_diff, 6),
+                "active_ms": round(self.active_seconds / compared * 1000, 3) if compared else None,
+                "candidate_ms": round(self.candidate_seconds / compared * 1000, 3) if compared else None,
+            }
+
+
+class ModelManager:
+    """
+    Serves one active model version and replaces it without a restart.
+
+    A background thread polls the model artifact (or a manifest naming the current
+    version, see models.serving.publish_version) for changes. A new version is loaded
+    and warmed up on its own workers while the active one keeps serving, then swapped
+    in by replacing a single reference: requests that already picked a version finish
+    on it, later ones use the new one. With shadowing, a new version first scores a
+    sample of live traffic next to the active one and is promoted (or rejected) once
+    the comparison is in. The replaced version stays loaded for rollback().
+    """
+
+    def __init__(self, build_pool: Callable, batching: dict, model_path: Optional[str] = None,
+                 preprocessor_path: Optional[str] = None, manifest_path: Optional[str] = None,
+                 warm_up: Optional[Callable[[ModelDeployment], None]] = None, interval_seconds: float = 30.0,
+                 keep_previous: bool = True, shadow_sample_rate: float = 0.0, shadow_min_requests: int = 200,
+                 min_agreement: float = 0.98, max_latency_ratio: Optional[float] = 1.5, auto_promote: bool = True):
+        """
+        Initialize the manager.
+
+        Args:
+            build_pool (Callable): (model_path, preprocessor_path) -> InferenceWorkerPool
+                running that model.
+            batching (dict): MicroBatcher arguments for every version.
+            model_path (str, optional): Model artifact to serve; its content digest is the version.
+            preprocessor_path (str, optional): Preprocessor of model_path. None uses the one
+                saved next to the model, if present.
+            manifest_path (str, optional): Manifest naming the version to serve, instead of model_path.
+            warm_up (Callable, optional): Check and warm up a new version before it serves;
+                raising rejects the version.
+            interval_seconds (float): Polling interval.
+            keep_previous (bool): Keep the replaced version loaded for rollback().
+            shadow_sample_rate (float): Fraction of requests also scored by a new version
+                before promotion. 0 promotes new versions once they are warmed up.
+            shadow_min_requests (int): Shadowed requests before a new version is judged.
+            min_agreement (float): Fraction of shadowed rows that must get the same class.
+            max_latency_ratio (float, optional): Highest candidate/active latency ratio.
+            auto_promote (bool): Promote (or reject) a shadowed version automatically once
+                judged. With False, it shadows until promote() is called.
+        """
+        if manifest_path is None and model_path is None:
+            raise ValueError("A model path or a manifest path is required.")
+        self.build_pool = build_pool
+        self.batching = batching
+        self.model_path = model_path
+        self.preprocessor_path = preprocessor_path
+        self.manifest_path = manifest_path
+        self.warm_up = warm_up
+        self.interval_seconds = interval_seconds
+        self.keep_previous = keep_previous
+        self.shadow_sample_rate = shadow_sample_rate
+        self.shadow_min_requests = shadow_min_requests
+        self.min_agreement = min_agreement
+        self.max_latency_ratio = max_latency_ratio
+        self.auto_promote = auto_promote
+
+        self.active = None
+        self.previous = None
+        self.candidate = None
+        self.comparison = None
+        self._rejected_version = None
+        self._source_stat = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def current_artifact(self) -> Tuple[str, str, Optional[str]]:
+        """
+        The version currently published on disk.
+
+        Returns:
+            Tuple: (version, model path, preprocessor path or None)
+        """
+        if self.manifest_path is not None:
+            manifest = read_manifest(self.manifest_path)
+            return manifest["version"], manifest["model_path"], manifest["preprocessor_path"]
+        preprocessor_path = self.preprocessor_path
+        if preprocessor_path is None and os.path.exists(preprocessor_path_for(self.model_path)):
+            preprocessor_path = preprocessor_path_for(self.model_path)
+        return file_digest(self.model_path)[:16], self.model_path, preprocessor_path
+
+    def load(self, version: str, model_path: str, preprocessor_path: Optional[str],
+             warm_up: bool = True) -> ModelDeployment:
+        """
+        Load a version on new workers, and warm it up unless warm_up is False.
+        """
+        pool = self.build_pool(model_path, preprocessor_path)
+        try:
+            deployment = ModelDeployment(version, model_path, preprocessor_path, pool, self.batching)
+        except Exception:
+            pool.shutdown()
+            raise
+        if warm_up and self.warm_up is not None:
+            try:
+                self.warm_up(deployment)
+            except Exception:
+                deployment.stop()
+                raise
+        return deployment
+
+    def load_initial(self):
+        """
+        Load the published version as the active one. Warming it up is left to the
+        caller, which may still be loading the features it needs.
+        """
+        self._source_stat = self._stat()
+        self.active = self.load(*self.current_artifact(), warm_up=False)
+
+    def start(self):
+        """
+        Start polling for new versions in a background thread.
+        """
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="model-manager", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.manifest_path or self.model_path} for new model versions "
+                    f"every {self.interval_seconds}s.")
+
+    def stop(self):
+        """
+        Stop polling and shut down every loaded version.
+        """
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for deployment in {id(d): d for d in (self.candidate, self.previous, self.active) if d}.values():
+            deployment.batcher.stop()
+            deployment.pool.shutdown()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.manifest_path or self.model_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self):
+        """
+        Load the published version if it is new. The artifact is only read again when
+        its modification time or size changed.
+        """
+        stat = self._stat()
+        if stat is None or stat == self._source_stat:
+            return
+        self._source_stat = stat
+        try:
+            version, model_path, preprocessor_path = self.current_artifact()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read the published model version: {e!r}")
+            return
+
+        known = {d.version for d in (self.active, self.candidate) if d is not None}
+        if version in known or version == self._rejected_version:
+            return
+        if self.previous is not None and version == self.previous.version:
+            logger.info(f"The published model is the previous version {version} again; rolling back.")
+            self.rollback()
+            return
+
+        logger.info(f"Loading model version {version} ({model_path}).")
+        try:
+            deployment = self.load(version, model_path, preprocessor_path)
+        except Exception:
+            MODEL_LOAD_ERRORS.inc()
+            self._rejected_version = version
+            logger.exception(f"Model version {version} failed to load or warm up; keeping {self.active.version}.")
+            return
+
+        if self.shadow_sample_rate > 0:
+            with self._lock:
+                replaced, self.candidate = self.candidate, deployment
+                self.comparison = ShadowComparison()
+            if replaced is not None:
+                self._retire(replaced)
+            logger.info(f"Model version {version} is shadowing {self.active.version} "
+                        f"on {self.shadow_sample_rate:.0%} of requests.")
+        else:
+            self.promote(deployment)
+
+    def promote(self, deployment: Optional[ModelDeployment] = None):
+        """
+        Make a version (by default the shadowing candidate) the active one.
+
+        Raises:
+            ValueError: If there is no candidate to promote.
+        """
+        with self._lock:
+            deployment = deployment or self.candidate
+            if deployment is None:
+                raise ValueError("There is no candidate model version to promote.")
+            replaced, retired = self.active, self.previous
+            self.active = deployment
+            self.previous = replaced if self.keep_previous else None
+            if deployment is self.candidate:
+                self.candidate = self.comparison = None
+        MODEL_SWAPS.labels(reason="promote").inc()
+        logger.info(f"Serving model version {deployment.version} (was {replaced.version}).")
+        for old in (retired, None if self.keep_previous else replaced):
+            if old is not None and old is not deployment:
+                self._retire(old)
+
+    def rollback(self):
+        """
+        Swap the previous version back in; the replaced one becomes the previous version.
+
+        Raises:
+            ValueError: If no previous version is loaded.
+        """
+        with self._lock:
+            if self.previous is None:
+                raise ValueError("There is no previous model version to roll back to.")
+            self.active, self.previous = self.previous, self.active
+        MODEL_SWAPS.labels(reason="rollback").inc()
+        logger.warning(f"Rolled back to model version {self.active.version} (from {self.previous.version}).")
+
+    def reject(self):
+        """
+        Drop the shadowing candidate; its version is not loaded again until it changes.
+
+        Raises:
+            ValueError: If there is no candidate.
+        """
+        with self._lock:
+            candidate, self.candidate = self.candidate, None
+            comparison, self.comparison = self.comparison, None
+            if candidate is None:
+                raise ValueError("There is no candidate model version to reject.")
+            self._rejected_version = candidate.version
+        logger.warning(f"Rejected model version {candidate.version}: {comparison.summary()}")
+        self._retire(candidate)
+
+    def shadow(self, features: np.ndarray, active_outputs: np.ndarray, active_seconds: float):
+        """
+        Score a sample of requests with the candidate as well, in the background, and
+        compare its outputs with the active version's. Never delays the request.
+        """
+        candidate, comparison = self.candidate, self.comparison
+        if candidate is None or random.random() >= self.shadow_sample_rate:
+            return
+        start = time.perf_counter()
+        try:
+            future = candidate.batcher.submit(features)
+        except QueueFullError:
+            return
+
+        def done(future):
+            if future.exception() is not None:
+                comparison.add_error()
+            else:
+                comparison.add(active_outputs, future.result(), active_seconds, time.perf_counter() - start)
+            if comparison.requests == self.shadow_min_requests:
+                self._wake.set()
+        future.add_done_callback(done)
+
+    def judge(self):
+        """
+        Promote or reject the candidate once enough shadowed requests were compared
+        (with auto_promote).
+        """
+        candidate, comparison = self.candidate, self.comparison
+        if candidate is None or comparison.requests < self.shadow_min_requests or not self.auto_promote:
+            return
+        agreement, ratio = comparison.agreement, comparison.latency_ratio
+        if comparison.errors or agreement is None or agreement < self.min_agreement or \
+                (self.max_latency_ratio is not None and ratio is not None and ratio > self.max_latency_ratio):
+            self.reject()
+        else:
+            logger.info(f"Model version {candidate.version} passed shadowing: {comparison.summary()}")
+            self.promote(candidate)
+
+    def status(self) -> dict:
+        """
+        Loaded versions and the shadow comparison, for the admin endpoint.
+        """
+        candidate, comparison = self.candidate, self.comparison
+        return {
+            "active": self.active.status() if self.active else None,
+            "previous": self.previous.status() if self.previous else None,
+            "candidate": dict(candidate.status(), shadow=comparison.summary()) if candidate else None,
+            "rejected_version": self._rejected_version,
+        }
+
+    def _retire(self, deployment: ModelDeployment):
+        def retire():
+            time.sleep(RETIRE_GRACE_SECONDS)
+            deployment.stop()
+            logger.info(f"Unloaded model version {deployment.version}.")
+        threading.Thread(target=retire, name="model-retire", daemon=True).start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.poll()
+                self.judge()
+            except Exception:
+                logger.exception("Model version check failed.")
@@ -0,0 +1,101 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence
+import numpy as np
+import logging
+from api.metrics import PREDICTION_CACHE_ENTRIES, PREDICTION_CACHE_EVICTIONS, PREDICTION_CACHE_HITS, PREDICTION_CACHE_MISSES
+logger = logging.getLogger(__name__)
+
+
+class PredictionCache:
+    """
+    In-process cache of per-id model outputs, with LRU eviction and an optional TTL.
+
+    Entries are keyed by (model version, feature store version, id), so reloading the
+    model or refreshing the features makes older entries unreachable; they are evicted
+    as least recently used.
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl_seconds: Optional[float] = None,
+                 max_entries_per_request: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cached ids.
+            ttl_seconds (float, optional): Time after which an entry expires. None keeps
+                entries until they are evicted.
+            max_entries_per_request (int, optional): Maximum number of ids one put_many()
+                call inserts, so a single large request cannot evict the hot ids. None
+                does not limit it.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        if max_entries_per_request is not None and max_entries_per_request < 0:
+            raise ValueError("max_entries_per_request must not be negative.")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_request = max_entries_per_request
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, model_version: Hashable, feature_version: Hashable,
+                 ids: Sequence[int]) -> List[Optional[np.ndarray]]:
+        """
+        Look up the cached outputs of several ids.
+
+        Returns:
+            List[Optional[numpy.ndarray]]: The output row of every id, None for misses.
+        """
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            for id_ in ids:
+                key = (model_version, feature_version, id_)
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl_seconds is not None and now - entry[1] > self.ttl_seconds:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    results.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                results.append(entry[0])
+            PREDICTION_CACHE_ENTRIES.set(len(self._entries))
+
+        hits = sum(result is not None for result in results)
+        PREDICTION_CACHE_HITS.inc(hits)
+        PREDICTION_CACHE_MISSES.inc(len(results) - hits)
+        return results
+
+    def put_many(self, model_version: Hashable, feature_version: Hashable,
+                 ids: Sequence[int], outputs: np.ndarray):
+        """
+        Cache the output rows of several ids, evicting the least recently used entries
+        beyond max_entries. Only the first max_entries_per_request ids are cached.
+        """
+        if self.max_entries_per_request is not None and len(ids) > self.max_entries_per_request:
+            ids, outputs = ids[:self.max_entries_per_request], outputs[:self.max_entries_per_request]
+        now = time.monotonic()
+        evicted = 0
+        with self._lock:
+            for id_, output in zip(ids, outputs):
+                key = (model_version, feature_version, id_)
+                # Copy, so the entry does not keep the whole batch output alive
+                self._entries[key] = (np.array(output), now)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            PREDICTION_CACHE_ENTRIES.set(len(self._entries))
+        if evicted:
+            PREDICTION_CACHE_EVICTIONS.inc(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            PREDICTION_CACHE_ENTRIES.set(0)
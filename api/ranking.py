@@ -0,0 +1,150 @@
+import time
+import threading
+from typing import Optional, Tuple
+import numpy as np
+import logging
+from data.feature_store import FeatureStore
+logger = logging.getLogger(__name__)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest scores, highest first (ties by position). Uses a
+    partial selection (argpartition, linear time) and only sorts the k selected scores.
+    """
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    selected = np.sort(np.argpartition(-scores, k - 1)[:k])
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+
+class ScoreTable:
+    """
+    Class probabilities of every id of one feature store snapshot under one model
+    version, computed in a single batched pass. Ranking queries then only select from
+    this table; the top rows of whole segments are cached as well, so repeated
+    "best k in segment" queries cost O(k).
+    """
+
+    def __init__(self, store: FeatureStore, model_version: str, probabilities: np.ndarray):
+        """
+        Initialize the table.
+
+        Args:
+            store (FeatureStore): Snapshot the probabilities were computed from.
+            model_version (str): Version of the model that computed them.
+            probabilities (numpy.ndarray): (ids, classes) float32 probabilities, in store row order.
+        """
+        self.store = store
+        self.model_version = model_version
+        # Rows the model could not score (NaN) sort last, and rank() leaves them out
+        self.probabilities = np.where(np.isnan(probabilities), -np.inf, probabilities).astype(np.float32)
+        self._segments = {}
+        self._top = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def compute(cls, store: FeatureStore, deployment, chunk_rows: int = 65536) -> "ScoreTable":
+        """
+        Score every row of the store on the deployment's inference workers, in chunks
+        of chunk_rows rows.
+        """
+        start = time.perf_counter()
+        futures = [deployment.pool.submit(store.features[i:i + chunk_rows])
+                   for i in range(0, len(store), chunk_rows)]
+        probabilities = np.concatenate([future.result() for future in futures]) if futures \
+            else np.empty((0, 0), dtype=np.float32)
+        logger.info(f"Scored {len(store)} ids with model version {deployment.version} "
+                    f"in {time.perf_counter() - start:.2f}s.")
+        return cls(store, deployment.version, probabilities)
+
+    def segment_rows(self, segment: str) -> np.ndarray:
+        """
+        Rows whose 0/1 feature (e.g. an INDUSTRY_* dummy) named segment is 1.
+
+        Raises:
+            ValueError: If there is no such feature, or it is not a 0/1 column.
+        """
+        with self._lock:
+            rows = self._segments.get(segment)
+        if rows is not None:
+            return rows
+        if segment not in self.store.feature_names:
+            raise ValueError(f"Unknown segment '{segment}'.")
+        column = self.store.features[:, self.store.feature_names.index(segment)]
+        values = column[~np.isnan(column)]
+        if not np.isin(values, (0.0, 1.0)).all():
+            raise ValueError(f"Feature '{segment}' is not a 0/1 segment column.")
+        rows = np.flatnonzero(column == 1.0)
+        with self._lock:
+            self._segments[segment] = rows
+        return rows
+
+    def rank(self, k: int, class_index: int = 1, rows: Optional[np.ndarray] = None,
+             segment: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k rows with the highest probability of class_index, among the given rows
+        and/or the rows of a segment (all rows if neither is given). Rows the model
+        could not score are left out, so fewer than k rows may be returned.
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: (rows, probabilities), highest first.
+        """
+        if not 0 <= class_index < self.probabilities.shape[1]:
+            raise ValueError(f"class_index must be in [0, {self.probabilities.shape[1]}).")
+        scores = self.probabilities[:, class_index]
+        if rows is not None:
+            if segment is not None:
+                rows = rows[np.isin(rows, self.segment_rows(segment))]
+            return self._scored(rows[top_k(scores[rows], k)], scores)
+
+        key = (segment, class_index)
+        with self._lock:
+            cached = self._top.get(key)
+        if cached is None or (len(cached) < k and len(cached) < self._candidates(segment)):
+            candidates = self.segment_rows(segment) if segment is not None else None
+            if candidates is None:
+                cached = top_k(scores, k)
+            else:
+                cached = candidates[top_k(scores[candidates], k)]
+            with self._lock:
+                self._top[key] = cached
+        return self._scored(cached[:k], scores)
+
+    @staticmethod
+    def _scored(ranked: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Unscored rows are -inf, at the end of the ranking (and not valid JSON)
+        ranked_scores = scores[ranked]
+        scored = np.isfinite(ranked_scores)
+        if not scored.all():
+            ranked, ranked_scores = ranked[scored], ranked_scores[scored]
+        return ranked, ranked_scores
+
+    def _candidates(self, segment: Optional[str]) -> int:
+        return len(self.segment_rows(segment)) if segment is not None else len(self.store)
+
+
+class ScoreTableCache:
+    """
+    Holds the score table of the served feature store and model version, and
+    recomputes it (once, for concurrent callers) when either of them changes.
+    """
+
+    def __init__(self, chunk_rows: int = 65536):
+        self.chunk_rows = chunk_rows
+        self._table = None
+        self._lock = threading.Lock()
+
+    def get(self, store: FeatureStore, deployment) -> ScoreTable:
+        """
+        The score table of this store snapshot and model version.
+        """
+        table = self._table
+        if table is not None and table.store is store and table.model_version == deployment.version:
+            return table
+        with self._lock:
+            table = self._table
+            if table is None or table.store is not store or table.model_version != deployment.version:
+                table = ScoreTable.compute(store, deployment, self.chunk_rows)
+                self._table = table
+        return table
@@ -0,0 +1,101 @@
+import json
+import time
+import queue
+import random
+import threading
+import logging
+from typing import Optional
+logger = logging.getLogger(__name__)
+
+# Recorded requests waiting for the writer thread; more are dropped rather than queued
+MAX_PENDING = 10_000
+
+
+class RequestRecorder:
+    """
+    Appends incoming request payloads to a JSONL file, in the format read by
+    scripts/replay.py: one {"t": arrival time (Unix seconds), "path": ..., "body": ...}
+    object per line. The arrival times let a replay reproduce the recorded traffic
+    pattern, not just its payloads; being absolute, they keep increasing when a later
+    server process appends to the same file.
+
+    record() only samples and queues the payload; a background thread serializes and
+    writes it, so the request handler never waits on JSON encoding or the disk.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0, max_requests: Optional[int] = None):
+        """
+        Open the recording file for appending and start the writer thread.
+
+        Args:
+            path (str): JSONL file to append to.
+            sample_rate (float): Fraction of requests recorded, chosen at random.
+            max_requests (int, optional): Stop recording after this many requests.
+        """
+        if not 0.0 < sample_rate <= 1.0:
+            raise ValueError("sample_rate must be in (0, 1].")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_requests = max_requests
+        self.num_recorded = 0
+        self.num_dropped = 0
+        self._file = open(path, "a", buffering=1 << 16)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._queue = queue.Queue(MAX_PENDING)
+        self._thread = threading.Thread(target=self._write, name="request-recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"Recording {sample_rate:.0%} of requests to {path}")
+
+    def record(self, path: str, body: dict):
+        """
+        Record one request, subject to sampling and max_requests. The body must not be
+        modified afterwards; it is serialized later, on the writer thread.
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        arrived = time.time()
+        with self._lock:
+            if self._closed or (self.max_requests is not None and self.num_recorded >= self.max_requests):
+                return
+            try:
+                self._queue.put_nowait((arrived, path, body))
+            except queue.Full:
+                self.num_dropped += 1
+                return
+            self.num_recorded += 1
+
+    def _write(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                arrived, path, body = item
+                self._file.write(json.dumps({"t": round(arrived, 6), "path": path, "body": body}) + "\n")
+            except Exception as e:
+                logger.error(f"Failed to record a request to {self.path}: {e!r}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Wait until every recorded request is written, and flush the file.
+        """
+        self._queue.join()
+        if not self._file.closed:
+            self._file.flush()
+
+    def close(self):
+        """
+        Write the requests still queued, stop the writer thread and close the file.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        dropped = f" ({self.num_dropped} dropped, the writer fell behind)" if self.num_dropped else ""
+        logger.info(f"Recorded {self.num_recorded} requests to {self.path}{dropped}")
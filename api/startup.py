@@ -0,0 +1,96 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+import logging
+from api.metrics import PHASE_SECONDS, READY
+logger = logging.getLogger(__name__)
+
+
+class StartupManager:
+    """
+    Runs the startup phases (model loading, feature building, warm-up) in a background
+    thread so the server can bind its port immediately, and tracks readiness.
+
+    Loading phases run in parallel; the warm-up phase runs once all of them succeeded.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self, load_phases: Dict[str, Callable[[], None]], warmup: Optional[Callable[[], None]] = None):
+        """
+        Start the startup phases in the background.
+
+        Args:
+            load_phases (Dict[str, Callable]): Independent loading steps, run in parallel.
+            warmup (Callable, optional): Step run after every loading step succeeded.
+        """
+        for name in list(load_phases) + (["warmup"] if warmup else []):
+            self.phases[name] = {"status": "pending"}
+        self._thread = threading.Thread(
+            target=self._run, args=(load_phases, warmup), name="startup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until startup finished (successfully or not).
+
+        Returns:
+            bool: Whether the service is ready.
+        """
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self) -> dict:
+        """
+        Readiness and per-phase status, for the /readyz endpoint.
+        """
+        with self._lock:
+            return {"ready": self.ready, "phases": {name: dict(phase) for name, phase in self.phases.items()}}
+
+    def _run_phase(self, name: str, fn: Callable[[], None]) -> bool:
+        with self._lock:
+            self.phases[name] = {"status": "running"}
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            logger.exception(f"Startup phase '{name}' failed after {elapsed:.2f}s.")
+            with self._lock:
+                self.phases[name] = {"status": "failed", "seconds": round(elapsed, 3), "error": str(e)}
+            return False
+        elapsed = time.perf_counter() - start
+        PHASE_SECONDS.labels(phase=name).set(elapsed)
+        logger.info(f"Startup phase '{name}' finished in {elapsed:.2f}s.")
+        with self._lock:
+            self.phases[name] = {"status": "done", "seconds": round(elapsed, 3)}
+        return True
+
+    def _run(self, load_phases: Dict[str, Callable[[], None]], warmup: Optional[Callable[[], None]]):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(len(load_phases), thread_name_prefix="startup") as executor:
+            results = list(executor.map(self._run_phase, load_phases.keys(), load_phases.values()))
+
+        ok = all(results)
+        if ok and warmup is not None:
+            ok = self._run_phase("warmup", warmup)
+        elapsed = time.perf_counter() - start
+        PHASE_SECONDS.labels(phase="total").set(elapsed)
+
+        if ok:
+            self._ready.set()
+            READY.set(1)
+            logger.info(f"Service ready after {elapsed:.2f}s.")
+        else:
+            logger.error(f"Startup failed after {elapsed:.2f}s; the service will not become ready.")
+        self._done.set()
@@ -0,0 +1,205 @@
+import os
+import math
+import threading
+import time
+import multiprocessing
+from functools import partial
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+import numpy as np
+import logging
+from api.metrics import FORWARD_PASS, IN_FLIGHT_BATCHES, IN_FLIGHT_ROWS, TENSOR_CONVERSION
+logger = logging.getLogger(__name__)
+
+
+def cpu_limit() -> float:
+    """
+    Number of CPUs available to this container.
+
+    Reads the cgroup v2 (cpu.max) or v1 (cpu.cfs_quota_us) CPU quota set from the pod's
+    CPU limit, and falls back to the CPU affinity / count of the host.
+
+    Returns:
+        float: Available CPUs, possibly fractional (e.g. 1.5 for a 1500m limit).
+    """
+    try:
+        available = float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        available = float(os.cpu_count() or 1)
+
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()[:2]
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    return min(available, quota) if quota else available
+
+
+def thread_counts(cpus: float, num_workers: int = 1) -> Tuple[int, int]:
+    """
+    Derive TensorFlow intra-/inter-op thread counts from the CPU budget, so that
+    num_workers concurrent forward passes do not oversubscribe the pod.
+
+    Returns:
+        Tuple[int, int]: (intra_op_threads, inter_op_threads)
+    """
+    per_worker = max(1, math.floor(cpus) // max(1, num_workers))
+    return per_worker, 1 if per_worker <= 2 else 2
+
+
+def configure_tf_threads(intra_op_threads: int, inter_op_threads: int):
+    """
+    Apply TensorFlow thread pool sizes. Only takes effect before TensorFlow executes any
+    op; if the runtime is already initialized, the existing sizes are kept.
+    """
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError as e:
+        logger.warning(f"Could not set TensorFlow thread counts: {e}")
+        return
+    logger.info(f"TensorFlow threads: intra_op={intra_op_threads}, inter_op={inter_op_threads}.")
+
+
+def _timed_predict(predict_fn, features: np.ndarray) -> Tuple[np.ndarray, Optional[float], float]:
+    """
+    Run a forward pass and time its stages. Serving functions that expose convert() and
+    forward() (like ServingFunction) are timed per stage; plain callables count as a
+    forward pass only.
+
+    Returns:
+        Tuple[numpy.ndarray, float, float]: (outputs, conversion_seconds, forward_seconds),
+            with conversion_seconds None for plain callables.
+    """
+    convert = getattr(predict_fn, "convert", None)
+    start = time.perf_counter()
+    if convert is None:
+        outputs = predict_fn(features)
+        return outputs, None, time.perf_counter() - start
+    inputs = convert(features)
+    converted = time.perf_counter()
+    outputs = predict_fn.forward(inputs)
+    return outputs, converted - start, time.perf_counter() - converted
+
+
+# Per-process serving function used by process workers
+_worker_predict_fn = None
+
+
+def _init_process_worker(load_fn, load_args, intra_op_threads, inter_op_threads):
+    global _worker_predict_fn
+    if intra_op_threads is not None:
+        configure_tf_threads(intra_op_threads, inter_op_threads)
+    _worker_predict_fn = load_fn(*load_args)
+
+
+def _process_worker_predict(features: np.ndarray) -> Tuple[np.ndarray, Optional[float], float]:
+    return _timed_predict(_worker_predict_fn, features)
+
+
+class InferenceWorkerPool:
+    """
+    Dedicated pool that runs batched forward passes off the request-handling threads.
+
+    In 'thread' mode the workers share the in-process serving function. In 'process'
+    mode every worker process loads its own copy of the model through load_fn, which
+    sidesteps the GIL at the cost of one model per worker.
+    """
+
+    def __init__(self, predict_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 kind: str = "thread", num_workers: int = 1,
+                 load_fn: Optional[Callable] = None, load_args: tuple = (),
+                 intra_op_threads: Optional[int] = 1, inter_op_threads: Optional[int] = 1):
+        """
+        Initialize the pool.
+
+        Args:
+            predict_fn (Callable, optional): Serving function, required in 'thread' mode.
+            kind (str): 'thread' or 'process'.
+            num_workers (int): Number of forward passes that may run concurrently.
+            load_fn (Callable, optional): Picklable function returning a serving function,
+                called once in each worker process ('process' mode).
+            load_args (tuple): Arguments for load_fn.
+            intra_op_threads (int, optional): TensorFlow intra-op threads for each worker
+                process. None leaves TensorFlow unconfigured (and unimported).
+            inter_op_threads (int): TensorFlow inter-op threads for each worker process.
+        """
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1.")
+        self.kind = kind
+        self.num_workers = num_workers
+        # Bounds in-flight batches so the batcher blocks (and requests queue) while all workers are busy
+        self._slots = threading.Semaphore(num_workers)
+
+        if kind == "thread":
+            if predict_fn is None:
+                raise ValueError("Thread workers need a predict_fn.")
+            self._predict_fn = partial(_timed_predict, predict_fn)
+            self._executor = ThreadPoolExecutor(num_workers, thread_name_prefix="inference")
+        elif kind == "process":
+            if load_fn is None:
+                raise ValueError("Process workers need a load_fn.")
+            self._predict_fn = _process_worker_predict
+            self._executor = ProcessPoolExecutor(
+                num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=(load_fn, load_args, intra_op_threads, inter_op_threads),
+            )
+        else:
+            raise ValueError(f"Unknown worker kind '{kind}', expected 'thread' or 'process'.")
+        logger.info(f"Started {num_workers} {kind} inference worker(s).")
+
+    def submit(self, features: np.ndarray) -> Future:
+        """
+        Run a forward pass on a worker, blocking while all workers are busy.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the model outputs for the batch.
+        """
+        self._slots.acquire()
+        try:
+            inner = self._executor.submit(self._predict_fn, features)
+        except Exception:
+            self._slots.release()
+            raise
+        IN_FLIGHT_BATCHES.inc()
+        IN_FLIGHT_ROWS.inc(len(features))
+
+        # Stage timings are measured on the worker (also in worker processes) and
+        # recorded here, in the process that serves /metrics
+        future = Future()
+        def done(inner: Future):
+            self._slots.release()
+            IN_FLIGHT_BATCHES.dec()
+            IN_FLIGHT_ROWS.dec(len(features))
+            error = inner.exception()
+            if error is not None:
+                future.set_exception(error)
+                return
+            outputs, conversion_seconds, forward_seconds = inner.result()
+            if conversion_seconds is not None:
+                TENSOR_CONVERSION.observe(conversion_seconds)
+            FORWARD_PASS.observe(forward_seconds)
+            future.set_result(outputs)
+        inner.add_done_callback(done)
+        return future
+
+    def shutdown(self):
+        """
+        Stop the workers after the running forward passes complete.
+        """
+        self._executor.shutdown(wait=True)
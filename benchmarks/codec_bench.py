@@ -0,0 +1,93 @@
+import sys
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+import yaml
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.codec import decode_response, encode_ids, iter_records
+from benchmarks.run import prepare_data
+from data.loader import DataLoader
+from models.sklearn_logistic_model import LogisticRegressionModel
+from preprocess.numeric_preprocessor import NumericPreprocessor
+from scripts.replay import serve_in_process
+
+
+async def measure(client, request_ids, repeats: int, chunk_size: int) -> dict:
+    """
+    Median seconds per request of the JSON endpoint, the binary endpoint and the
+    streamed binary endpoint. The in-process transport buffers whole responses, so
+    the time to the first streamed record is only visible over HTTP.
+    """
+    ids = request_ids.tolist()
+    body = encode_ids(request_ids)
+    timings = {"json": [], "binary": [], "stream": []}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = await client.post("/predict/", json={"ids": ids})
+        response.json()
+        timings["json"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = await client.post("/predict/binary", content=body)
+        decode_response(response.content)
+        timings["binary"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = await client.post(f"/predict/binary?stream=true&chunk_size={chunk_size}", content=body)
+        list(iter_records([response.content]))
+        timings["stream"].append(time.perf_counter() - start)
+    return {name: float(np.median(values)) for name, values in timings.items()}
+
+
+def main(batch_sizes, num_companies, repeats, chunk_size):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = prepare_data(os.path.join(tmp_dir, "data"), num_companies * 20, num_companies, seed=0)
+        merged = DataLoader(**files).load_and_preprocess()
+        labels = merged.pop("IS_CUSTOMER").to_numpy()
+        preprocessor = NumericPreprocessor().fit(merged.drop(columns=["id"]))
+        model = LogisticRegressionModel(max_iter=1000)
+        model.train(preprocessor.transform(merged), labels)
+        model.save(os.path.join(tmp_dir, "model"))
+        preprocessor.save(os.path.join(tmp_dir, "model_preprocessor.json"))
+        config = {
+            "data": dict(files, cache_dir=None),
+            "serving": {
+                "logging": {"level": "WARNING"},
+                "model": {"name": "logistic_regression", "path": os.path.join(tmp_dir, "model.pkl")},
+                "prediction_cache": {"enabled": False},
+                "batching": {"max_queue_size": 0},
+            },
+        }
+        config_path = os.path.join(tmp_dir, "config.yaml")
+        with open(config_path, "w") as f:
+            yaml.safe_dump(config, f)
+        ids = merged["id"].to_numpy()
+
+        async def run():
+            async with serve_in_process(config_path) as client:
+                print(f"{len(ids)} served ids, median of {repeats} requests, stream chunks of {chunk_size} ids")
+                print(f"{'ids':>8} {'json (ms)':>10} {'binary (ms)':>12} {'speedup':>8} {'streamed (ms)':>14}")
+                rng = np.random.default_rng(0)
+                for size in batch_sizes:
+                    request_ids = rng.choice(ids, min(size, len(ids)), replace=False)
+                    t = await measure(client, request_ids, repeats, chunk_size)
+                    print(f"{len(request_ids):>8} {t['json'] * 1000:>10.1f} {t['binary'] * 1000:>12.1f} "
+                          f"{t['json'] / t['binary']:>8.1f} {t['stream'] * 1000:>14.1f}")
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the JSON and binary /predict endpoints by batch size.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 50_000])
+    parser.add_argument("--companies", type=int, default=100_000, help="Synthetic companies.")
+    parser.add_argument("--repeats", type=int, default=5, help="Requests per batch size and endpoint.")
+    parser.add_argument("--chunk-size", type=int, default=8192, help="Ids per streamed record.")
+    args = parser.parse_args()
+
+    main(args.batch_sizes, args.companies, args.repeats, args.chunk_size)
@@ -0,0 +1,81 @@
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.workers import cpu_limit
+from scripts.launch_workers import launch
+
+
+def run_worker(num_rows, num_features, batch_size, epochs, threads, result_path):
+    """
+    One worker of the benchmark cluster: train on synthetic data with the multi-worker
+    strategy, and on the chief, write the timing to result_path.
+    """
+    import numpy as np
+    from api.workers import configure_tf_threads
+    configure_tf_threads(threads, 1)
+    from models.tensorflow_model import TensorFlowModel
+
+    # Every worker builds the same data and trains on its own shard of it
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((num_rows, num_features), dtype=np.float32)
+    y = (X[:, :4].sum(axis=1) > 0).astype(np.int64)
+    model = TensorFlowModel(batch_size=batch_size, seed=0, strategy="multi_worker")
+    # Warm-up epoch: cluster setup, model build and tracing
+    model.train(X, y, X[:batch_size], y[:batch_size], epochs=1)
+    start = time.perf_counter()
+    model.train(X, y, X[:batch_size], y[:batch_size], epochs=epochs)
+    seconds = (time.perf_counter() - start) / epochs
+    if model.is_chief:
+        with open(result_path, "w") as f:
+            json.dump({"workers": model.num_workers, "epoch_seconds": seconds}, f)
+
+
+def main(worker_counts, num_rows, num_features, batch_size, epochs):
+    cpus = int(cpu_limit())
+    print(f"{num_rows} rows x {num_features} features, global batch size {batch_size}, {cpus} CPU(s)")
+    print(f"{'workers':>8} {'threads':>8} {'epoch (s)':>10} {'rows/s':>12} {'speedup':>8} {'efficiency':>10}")
+    baseline = None
+    for num_workers in worker_counts:
+        # Split the CPUs between the local workers, as separate pods would have their own
+        threads = max(1, cpus // num_workers)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result_path = os.path.join(tmp_dir, "result.json")
+            command = [sys.executable, os.path.abspath(__file__), "--worker", "--rows", str(num_rows),
+                       "--features", str(num_features), "--batch-size", str(batch_size),
+                       "--epochs", str(epochs), "--threads", str(threads), "--result", result_path]
+            codes = launch(command, num_workers, env={"TF_CPP_MIN_LOG_LEVEL": "2"})
+            if any(codes):
+                raise RuntimeError(f"Workers failed with exit codes {codes}.")
+            with open(result_path) as f:
+                seconds = json.load(f)["epoch_seconds"]
+        rows_per_second = num_rows / seconds
+        # Relative to the per-worker throughput of the first (smallest) run
+        baseline = baseline or rows_per_second / num_workers
+        speedup = rows_per_second / baseline
+        print(f"{num_workers:>8} {threads:>8} {seconds:>10.2f} {rows_per_second:>12,.0f} "
+              f"{speedup:>8.2f} {speedup / num_workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark multi-worker training throughput by worker count.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to run.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Training rows.")
+    parser.add_argument("--features", type=int, default=187, help="Feature columns.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Global training batch size.")
+    parser.add_argument("--epochs", type=int, default=2, help="Timed epochs, after one warm-up epoch.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--threads", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.rows, args.features, args.batch_size, args.epochs, args.threads, args.result)
+    else:
+        main(args.workers, args.rows, args.features, args.batch_size, args.epochs)
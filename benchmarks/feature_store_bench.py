@@ -0,0 +1,87 @@
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data.feature_store import FeatureStore
+
+
+def make_table(num_rows: int, num_features: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a synthetic merged table shaped like the DataLoader output.
+
+    Args:
+        num_rows (int): Number of company rows.
+        num_features (int): Number of feature columns.
+        seed (int): Random seed.
+
+    Returns:
+        pandas.DataFrame: Table with 'id', 'IS_CUSTOMER' and float feature columns.
+    """
+    rng = np.random.default_rng(seed)
+    table = pd.DataFrame(rng.random((num_rows, num_features)),
+                         columns=[f"F{i}" for i in range(num_features)])
+    table.insert(0, "id", rng.permutation(num_rows * 2)[:num_rows])
+    table["IS_CUSTOMER"] = rng.integers(0, 2, num_rows)
+    return table
+
+
+def time_calls(fn, requests) -> np.ndarray:
+    """
+    Time fn on every request and return latencies in microseconds.
+    """
+    latencies = np.empty(len(requests))
+    for i, ids in enumerate(requests):
+        start = time.perf_counter()
+        fn(ids)
+        latencies[i] = (time.perf_counter() - start) * 1e6
+    return latencies
+
+
+def isin_lookup(table: pd.DataFrame, ids):
+    """
+    The previous /predict lookup: scan the whole table for every request.
+    """
+    features = table[table["id"].isin(ids)].drop(columns=["id", "IS_CUSTOMER"])
+    return features.astype(np.float32).to_numpy()
+
+
+def main(sizes, num_features, ids_per_request, num_requests, missing_fraction):
+    rng = np.random.default_rng(1)
+    print(f"{'rows':>10} {'method':>8} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for num_rows in sizes:
+        table = make_table(num_rows, num_features)
+        store = FeatureStore.from_frame(table)
+        known = table["id"].to_numpy()
+
+        requests = []
+        for _ in range(num_requests):
+            ids = rng.choice(known, ids_per_request)
+            num_missing = int(ids_per_request * missing_fraction)
+            ids[:num_missing] = -1 - rng.integers(0, 1000, num_missing)
+            requests.append(ids.tolist())
+
+        methods = {"store": store.lookup, "isin": lambda ids: isin_lookup(table, ids)}
+        for name, fn in methods.items():
+            latencies = time_calls(fn, requests)
+            print(f"{num_rows:>10} {name:>8} {np.percentile(latencies, 50):>10.1f} "
+                  f"{np.percentile(latencies, 99):>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark feature lookup latency against table size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000],
+                        help="Table sizes (rows) to benchmark.")
+    parser.add_argument("--num-features", type=int, default=187, help="Number of feature columns.")
+    parser.add_argument("--ids-per-request", type=int, default=16, help="IDs requested per lookup.")
+    parser.add_argument("--num-requests", type=int, default=500, help="Lookups timed per table size.")
+    parser.add_argument("--missing-fraction", type=float, default=0.1,
+                        help="Fraction of requested IDs that are unknown.")
+    args = parser.parse_args()
+
+    main(args.sizes, args.num_features, args.ids_per_request, args.num_requests, args.missing_fraction)
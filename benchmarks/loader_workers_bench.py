@@ -0,0 +1,49 @@
+import sys
+import os
+import time
+import argparse
+import tempfile
+import pandas as pd
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data.loader import DataLoader
+from data.synthetic import generate_dataset
+
+
+def main(num_actions, num_companies, workers, chunksize, data_dir):
+    if data_dir is None:
+        data_dir = tempfile.mkdtemp(prefix="loader_bench_")
+    print(f"Generating {num_actions} actions for {num_companies} companies in {data_dir}...")
+    files = generate_dataset(data_dir, num_customers=num_companies // 5,
+                             num_noncustomers=num_companies - num_companies // 5,
+                             num_actions=num_actions)
+
+    baseline, baseline_time = None, None
+    print(f"{'workers':>8} {'wall (s)':>10} {'speedup':>8}")
+    for num_workers in workers:
+        loader = DataLoader(**files, chunksize=chunksize, num_workers=num_workers)
+        start = time.perf_counter()
+        merged_data = loader.load_and_preprocess()
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline, baseline_time = merged_data, elapsed
+        else:
+            pd.testing.assert_frame_equal(merged_data, baseline)
+        print(f"{num_workers:>8} {elapsed:>10.2f} {baseline_time / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DataLoader wall time across worker counts.")
+    parser.add_argument("--num-actions", type=int, default=5_000_000, help="Synthetic action rows.")
+    parser.add_argument("--num-companies", type=int, default=100_000, help="Synthetic companies.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Worker counts to compare; the first is the reference output.")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="Rows per actions chunk.")
+    parser.add_argument("--data-dir", type=str, default=None,
+                        help="Directory for the synthetic CSVs (default: a new temp directory).")
+    args = parser.parse_args()
+
+    main(args.num_actions, args.num_companies, args.workers, args.chunksize, args.data_dir)
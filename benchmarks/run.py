@@ -0,0 +1,343 @@
+"""
+Reproducible benchmark suite: DataLoader stages, NumericPreprocessor, model training
+throughput and /predict latency under concurrent load, on synthetic data with the
+customers/noncustomers/actions schema. Results are written as JSON, and two result
+files (e.g. of two commits) can be compared with --compare.
+
+    python benchmarks/run.py --actions 1000000 --output before.json
+    python benchmarks/run.py --actions 1000000 --output after.json --compare before.json
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import yaml
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.workers import cpu_limit
+from data.cache import FrameCache
+from data.loader import DataLoader
+from data.synthetic import generate_dataset
+from models.sklearn_logistic_model import LogisticRegressionModel
+from preprocess.numeric_preprocessor import NumericPreprocessor
+from scripts.replay import generate_requests, run_closed_loop, serve_in_process
+
+SUITES = ("loader", "preprocess", "train", "serving")
+# Above this many actions, the loader is benchmarked in its streaming mode by default
+STREAMING_ACTIONS = 10_000_000
+
+
+class Timer:
+    """
+    Collects named wall-time measurements, in seconds.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.results = {}
+
+    def __call__(self, name: str, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.results[f"{self.prefix}.{name}_s"] = round(time.perf_counter() - start, 6)
+        return result
+
+
+def environment() -> dict:
+    """
+    What the results were measured on: commit, library versions and machine.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": cpu_limit(),
+    }
+
+
+def prepare_data(data_dir: str, num_actions: int, num_companies: int, seed: int,
+                 num_workers: int = 1) -> Dict[str, str]:
+    """
+    Generate the synthetic CSVs in data_dir, or reuse them if they were generated with
+    the same parameters.
+    """
+    params = {"num_actions": num_actions, "num_companies": num_companies, "seed": seed}
+    params_path = os.path.join(data_dir, "benchmark_data.json")
+    files = {name: os.path.join(data_dir, f"{name.split('_')[0]}.csv")
+             for name in ("customers_file", "noncustomers_file", "actions_file")}
+    if os.path.exists(params_path):
+        with open(params_path) as f:
+            if json.load(f) == params and all(os.path.exists(path) for path in files.values()):
+                print(f"Reusing the synthetic data in {data_dir}.")
+                return files
+
+    print(f"Generating {num_actions} actions for {num_companies} companies in {data_dir}...")
+    start = time.perf_counter()
+    files = generate_dataset(data_dir, num_customers=num_companies // 5,
+                             num_noncustomers=num_companies - num_companies // 5,
+                             num_actions=num_actions, seed=seed, num_workers=num_workers)
+    print(f"Generated in {time.perf_counter() - start:.1f}s.")
+    with open(params_path, "w") as f:
+        json.dump(params, f)
+    return files
+
+
+def bench_loader(files: Dict[str, str], num_actions: int, chunksize: Optional[int],
+                 num_workers: int, work_dir: str):
+    """
+    Time the DataLoader stages, and writing and reading the merged frame cache.
+
+    Returns:
+        Tuple: (metrics, merged DataFrame)
+    """
+    timer = Timer("loader")
+    loader = DataLoader(**files, chunksize=chunksize, num_workers=num_workers)
+    start = time.perf_counter()
+    if chunksize or num_workers > 1:
+        customers, noncustomers = timer("load_companies", loader.load_companies)
+        aggregates = timer("aggregate_actions", loader.compute_aggregates, customers, noncustomers)
+        merged = timer("merge", loader.merge_aggregates, aggregates, customers, noncustomers)
+    else:
+        customers = timer("read_customers", pd.read_csv, files["customers_file"])
+        noncustomers = timer("read_noncustomers", pd.read_csv, files["noncustomers_file"])
+        actions = timer("read_actions", pd.read_csv, files["actions_file"])
+        customers = timer("preprocess_customers", loader.preprocess_customers, customers)
+        noncustomers = timer("preprocess_noncustomers", loader.preprocess_noncustomers, noncustomers)
+        actions = timer("preprocess_actions", loader.preprocess_actions, actions)
+        merged = timer("merge", loader.merge_datasets, customers, noncustomers, actions)
+        del actions
+    total = time.perf_counter() - start
+    timer.results["loader.total_s"] = round(total, 6)
+    timer.results["loader.actions_per_s"] = round(num_actions / total, 1)
+
+    cache = FrameCache(os.path.join(work_dir, "feature_cache"))
+    timer("cache_save", cache.save, "benchmark", merged)
+    timer("cache_load", cache.load, "benchmark")
+    timer.results["loader.companies"] = len(merged)
+    return timer.results, merged
+
+
+def bench_preprocess(merged: pd.DataFrame):
+    """
+    Time fitting the preprocessor and transforming DataFrames and arrays.
+
+    Returns:
+        Tuple: (metrics, fitted preprocessor, float32 features, labels)
+    """
+    timer = Timer("preprocess")
+    labels = merged["IS_CUSTOMER"].to_numpy()
+    features = merged.drop(columns=["IS_CUSTOMER", "id"])
+    preprocessor = timer("fit", NumericPreprocessor().fit, features)
+    X = timer("transform_frame", preprocessor.transform, features)
+    raw = features[preprocessor.get_required_features()].to_numpy(dtype=np.float32, na_value=np.nan)
+    timer("transform_array_inplace", preprocessor.transform, raw, copy=False)
+    seconds = timer.results["preprocess.transform_frame_s"]
+    timer.results["preprocess.transform_rows_per_s"] = round(len(X) / seconds, 1) if seconds else None
+    return timer.results, preprocessor, X, labels
+
+
+def bench_train(X: np.ndarray, y: np.ndarray, batch_size: int, steps: int, work_dir: str):
+    """
+    Time a logistic regression fit and TensorFlowModel training steps (if TensorFlow
+    is installed).
+
+    Returns:
+        Tuple: (metrics, path of the saved logistic regression model)
+    """
+    timer = Timer("train")
+    model = LogisticRegressionModel(max_iter=1000)
+    timer("logistic_regression_fit", model.train, X, y)
+    model_path = os.path.join(work_dir, "logistic_regression_model")
+    model.save(model_path)
+
+    try:
+        import tensorflow as tf
+        from models.tensorflow_model import TensorFlowModel, make_dataset
+    except ImportError:
+        print("TensorFlow is not installed; skipping the training step benchmark.")
+        return timer.results, model_path + ".pkl"
+    tf.keras.utils.set_random_seed(0)
+    keras_model = TensorFlowModel(input_shape=(X.shape[1],)).model
+    dataset = make_dataset(X, y, batch_size, shuffle=True, seed=0).repeat()
+    # Warm-up: tracing and the first pipeline fill
+    keras_model.fit(dataset, steps_per_epoch=min(steps, 20), epochs=1, verbose=0)
+    timer("tensorflow_steps", keras_model.fit, dataset, steps_per_epoch=steps, epochs=1, verbose=0)
+    seconds = timer.results["train.tensorflow_steps_s"]
+    timer.results["train.tensorflow_steps_per_s"] = round(steps / seconds, 1)
+    timer.results["train.tensorflow_rows_per_s"] = round(steps * batch_size / seconds, 1)
+    return timer.results, model_path + ".pkl"
+
+
+def bench_serving(files: Dict[str, str], model_path: str, preprocessor_path: str, ids: np.ndarray,
+                  concurrency: List[int], num_requests: int, ids_per_request: int, work_dir: str,
+                  seed: int) -> dict:
+    """
+    Measure /predict latency and throughput with an in-process ASGI client, so the
+    numbers cover the application (validation, lookup, batching, model) but not the
+    network or the HTTP server. The prediction cache is disabled. See scripts/replay.py
+    for load tests against a running server.
+    """
+    config = {
+        "data": dict(files, cache_dir=None),
+        "serving": {
+            "logging": {"level": "WARNING"},
+            "model": {"name": "logistic_regression", "path": model_path, "preprocessor_path": preprocessor_path},
+            "prediction_cache": {"enabled": False},
+        },
+    }
+    config_path = os.path.join(work_dir, "serving_config.yaml")
+    with open(config_path, "w") as f:
+        yaml.safe_dump(config, f)
+    requests = generate_requests(ids, num_requests, mean_size=ids_per_request, seed=seed)
+
+    async def run() -> dict:
+        results = {}
+        start = time.perf_counter()
+        async with serve_in_process(config_path) as client:
+            results["serving.startup_s"] = round(time.perf_counter() - start, 6)
+            await run_closed_loop(client, requests, 1, 20)
+            for level in concurrency:
+                step = await run_closed_loop(client, requests, level, num_requests)
+                name = f"serving.c{level}"
+                results.update({f"{name}.{key}": step[key] for key in ("p50_ms", "p90_ms", "p99_ms")})
+                results[f"{name}.requests_per_s"] = step["throughput_per_s"]
+                results[f"{name}.ids_per_s"] = step["ids_per_s"]
+                results[f"{name}.errors"] = step["requests"] - step["ok"]
+        return results
+
+    return asyncio.run(run())
+
+
+def run_suite(suites, num_actions: int, num_companies: int, data_dir: Optional[str] = None,
+              chunksize: Optional[int] = None, loader_workers: int = 1, batch_size: int = 256,
+              train_steps: int = 200, concurrency=(1, 8, 32), num_requests: int = 500,
+              ids_per_request: int = 10, seed: int = 0) -> dict:
+    """
+    Run the selected benchmark suites and return the results as a JSON-serializable dict.
+
+    Every suite works on the output of the one before it, so 'preprocess' needs
+    'loader', 'train' needs 'preprocess' and 'serving' needs 'train'; the prerequisites
+    run (and are reported) as well.
+
+    Returns:
+        dict: {'environment': ..., 'parameters': ..., 'results': {metric: value}}
+    """
+    suites = set(suites)
+    for suite, prerequisite in (("serving", "train"), ("train", "preprocess"), ("preprocess", "loader")):
+        if suite in suites:
+            suites.add(prerequisite)
+    if chunksize is None and num_actions > STREAMING_ACTIONS:
+        chunksize = 1_000_000
+    parameters = {"suites": sorted(suites), "num_actions": num_actions, "num_companies": num_companies,
+                  "chunksize": chunksize, "loader_workers": loader_workers, "batch_size": batch_size,
+                  "train_steps": train_steps, "concurrency": list(concurrency),
+                  "num_requests": num_requests, "ids_per_request": ids_per_request, "seed": seed}
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as work_dir:
+        files = prepare_data(data_dir or os.path.join(work_dir, "data"), num_actions, num_companies, seed,
+                             num_workers=loader_workers)
+        metrics, merged = bench_loader(files, num_actions, chunksize, loader_workers, work_dir)
+        results.update(metrics)
+        if "preprocess" in suites:
+            metrics, preprocessor, X, y = bench_preprocess(merged)
+            results.update(metrics)
+        if "train" in suites:
+            metrics, model_path = bench_train(X, y, batch_size, train_steps, work_dir)
+            results.update(metrics)
+        if "serving" in suites:
+            preprocessor_path = os.path.join(work_dir, "preprocessor.json")
+            preprocessor.save(preprocessor_path)
+            results.update(bench_serving(files, model_path, preprocessor_path, merged["id"].to_numpy(),
+                                         concurrency, num_requests, ids_per_request, work_dir, seed))
+    return {"environment": environment(), "parameters": parameters, "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> List[str]:
+    """
+    Compare the results of two runs and print every shared metric with its change.
+
+    Metrics ending in _s or _ms are better when lower, those ending in _per_s when
+    higher; others (counts) are only listed.
+
+    Returns:
+        List[str]: Metrics that got worse by more than threshold (a fraction).
+    """
+    regressions = []
+    changed = sorted(key for key in current["parameters"]
+                     if baseline.get("parameters", {}).get(key) != current["parameters"][key])
+    if changed:
+        print(f"Warning: the runs used different parameters ({', '.join(changed)}).")
+    print(f"{'metric':<42} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, value in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None or value is None or not isinstance(value, (int, float)):
+            continue
+        change = (value - before) / before if before else 0.0
+        if name.endswith("_per_s"):
+            worse = change < -threshold
+        elif name.endswith("_s") or name.endswith("_ms"):
+            worse = change > threshold
+        else:
+            worse = False
+        if worse:
+            regressions.append(name)
+        print(f"{name:<42} {before:>12.4g} {value:>12.4g} {change:>+8.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and write the results as JSON.")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES), help="Suites to run.")
+    parser.add_argument("--actions", type=int, default=1_000_000, help="Synthetic action rows (10^6 to 10^8).")
+    parser.add_argument("--companies", type=int, default=50_000, help="Synthetic companies.")
+    parser.add_argument("--data-dir", type=str, default=None,
+                        help="Directory for the synthetic CSVs, reused across runs with the same sizes.")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help=f"Loader chunk rows (default: 1000000 above {STREAMING_ACTIONS} actions).")
+    parser.add_argument("--loader-workers", type=int, default=1, help="Loader (and data generation) processes.")
+    parser.add_argument("--batch-size", type=int, default=256, help="TensorFlow training batch size.")
+    parser.add_argument("--train-steps", type=int, default=200, help="Timed TensorFlow training steps.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrent clients.")
+    parser.add_argument("--requests", type=int, default=500, help="/predict requests per concurrency level.")
+    parser.add_argument("--ids-per-request", type=int, default=10, help="Ids per /predict request.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the data and the request mix.")
+    parser.add_argument("--output", type=str, default="benchmark.json", help="Where to write the JSON results.")
+    parser.add_argument("--compare", type=str, default=None, help="Earlier results to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change reported as a regression.")
+    args = parser.parse_args()
+
+    report = run_suite(args.suites, args.actions, args.companies, args.data_dir, args.chunksize,
+                       args.loader_workers, args.batch_size, args.train_steps, args.concurrency,
+                       args.requests, args.ids_per_request, args.seed)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}.")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}.")
+            sys.exit(1)
+    else:
+        print(json.dumps(report["results"], indent=2))
@@ -0,0 +1,93 @@
+import sys
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.tensorflow_model import EVAL_BATCH_SIZE, TensorFlowModel, make_dataset
+
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    """
+    Record the wall time of every training epoch.
+    """
+
+    def on_train_begin(self, logs=None):
+        self.times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.times.append(time.perf_counter() - self._start)
+
+
+def make_data(num_rows: int, num_features: int, seed: int = 0):
+    """
+    Synthetic standardized features with a learnable binary label.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((num_rows, num_features), dtype=np.float32)
+    y = (X[:, :4].sum(axis=1) > 0).astype(np.int64)
+    return X, y
+
+
+def time_epochs(fit, epochs: int) -> float:
+    """
+    Median epoch time, including validation, leaving out the first epoch (tracing and warm-up).
+    """
+    timer = EpochTimer()
+    fit(timer, epochs + 1)
+    return float(np.median(timer.times[1:]))
+
+
+def main(num_rows, num_features, batch_size, epochs):
+    X, y = make_data(num_rows, num_features)
+    X_val, y_val = make_data(num_rows // 4, num_features, seed=1)
+    columns = [f"F{i}" for i in range(num_features)]
+    frame, frame_val = pd.DataFrame(X, columns=columns), pd.DataFrame(X_val, columns=columns)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "X.npy")
+        np.save(path, X)
+        X_disk = np.load(path, mmap_mode="r")
+        val_data = make_dataset(X_val, y_val, EVAL_BATCH_SIZE)
+
+        def keras_model():
+            tf.keras.utils.set_random_seed(0)
+            return TensorFlowModel(input_shape=(num_features,))._build_model((num_features,), 2)
+
+        methods = {
+            # The previous TensorFlowModel.train: Keras converts the DataFrame itself
+            "dataframe": lambda timer, n: keras_model().fit(
+                frame, y, validation_data=(frame_val, y_val), batch_size=batch_size, epochs=n,
+                callbacks=[timer], verbose=0),
+            "tf.data": lambda timer, n: keras_model().fit(
+                make_dataset(X, y, batch_size, shuffle=True), validation_data=val_data, epochs=n,
+                callbacks=[timer], verbose=0),
+            "tf.data (mmap)": lambda timer, n: keras_model().fit(
+                make_dataset(X_disk, y, batch_size, shuffle=True), validation_data=val_data, epochs=n,
+                callbacks=[timer], verbose=0),
+        }
+        print(f"{num_rows} rows x {num_features} features (+{len(X_val)} validation), batch size {batch_size}")
+        print(f"{'input':>16} {'epoch (s)':>10} {'rows/s':>12}")
+        for name, fit in methods.items():
+            seconds = time_epochs(fit, epochs)
+            print(f"{name:>16} {seconds:>10.2f} {num_rows / seconds:>12,.0f}")
+        del X_disk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark TensorFlowModel epoch time by input pipeline.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Training rows.")
+    parser.add_argument("--features", type=int, default=187, help="Feature columns.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Training batch size.")
+    parser.add_argument("--epochs", type=int, default=3, help="Timed epochs, after one warm-up epoch.")
+    args = parser.parse_args()
+
+    main(args.rows, args.features, args.batch_size, args.epochs)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable, Sequence
+import logging
+logger = logging.getLogger(__name__)
+
+# Columns of the joined company/action rows that are never averaged
+NON_AGGREGATED_COLUMNS = ("id", "MRR")
+
+
+class ActionAggregates:
+    """
+    Per-id running sums and non-null counts of the numeric columns of the joined
+    company/action rows. Partial aggregates over disjoint sets of rows can be combined,
+    and sums / counts reproduces groupby('id').mean() over all of those rows.
+    """
+
+    def __init__(self, sums: pd.DataFrame, counts: pd.DataFrame):
+        """
+        Initialize from aligned per-id sums and counts.
+
+        Args:
+            sums (pandas.DataFrame): float64 column sums, indexed by id.
+            counts (pandas.DataFrame): int64 non-null counts, same index and columns.
+        """
+        self.sums = sums
+        self.counts = counts
+
+    @classmethod
+    def from_rows(cls, rows: pd.DataFrame, id_column: str = "id",
+                  exclude_columns: Sequence[str] = NON_AGGREGATED_COLUMNS) -> "ActionAggregates":
+        """
+        Aggregate joined company/action rows by id.
+
+        Args:
+            rows (pandas.DataFrame): Joined rows, as built by DataLoader.join_actions.
+            id_column (str): Name of the id column.
+            exclude_columns (Sequence[str]): Numeric columns that are not aggregated.
+
+        Returns:
+            ActionAggregates: Sums and counts of every remaining numeric column.
+        """
+        columns = rows.drop(columns=list(exclude_columns)).select_dtypes(include="number").columns
+        grouped = rows.groupby(id_column)[columns]
+        return cls(grouped.sum().astype(np.float64), grouped.count().astype(np.int64))
+
+    @classmethod
+    def concat(cls, parts: Iterable["ActionAggregates"]) -> "ActionAggregates":
+        """
+        Combine partial aggregates, which may share ids.
+        """
+        parts = list(parts)
+        if len(parts) == 1:
+            return parts[0]
+        sums = pd.concat([part.sums for part in parts], sort=False)
+        counts = pd.concat([part.counts for part in parts], sort=False)
+        return cls(sums.groupby(level=0, sort=True).sum().astype(np.float64),
+                   counts.groupby(level=0, sort=True).sum().astype(np.int64))
+
+    def combine(self, other: "ActionAggregates") -> "ActionAggregates":
+        """
+        Combine with the aggregates of another, disjoint set of rows.
+        """
+        return ActionAggregates.concat([self, other])
+
+    def __len__(self) -> int:
+        return len(self.sums)
+
+    def means(self) -> pd.DataFrame:
+        """
+        Per-id means, equivalent to groupby('id').mean() over all aggregated rows.
+
+        Returns:
+            pandas.DataFrame: Means indexed by id; NaN where a column had no values.
+        """
+        return self.sums / self.counts
@@ -0,0 +1,139 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Iterable, Optional
+import logging
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+
+def file_digest(path: str, block_size: int = 1 << 22) -> str:
+    """
+    SHA-256 of a file's content, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FrameCache:
+    """
+    On-disk cache of DataFrames in a columnar binary layout: one .npy file per column
+    plus a JSON manifest, stored under a directory named by the cache key. Cached
+    columns are memory-mapped (copy-on-write) on load instead of being parsed again,
+    and the loaded frame keeps each column in its own block backed by the map, so rows
+    are only read from disk when they are used. Operations that consolidate the frame
+    (e.g. DataFrame.to_numpy() over all columns) read it into memory.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str): Directory holding one subdirectory per cache key.
+        """
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def make_key(files: Iterable[str], version: str) -> str:
+        """
+        Build a cache key from the content of the input files and a version string,
+        so the entry is invalidated when either changes.
+
+        Args:
+            files (Iterable[str]): Input files the cached frame is derived from.
+            version (str): Version of the code producing the frame.
+
+        Returns:
+            str: Hex digest identifying the cache entry.
+        """
+        digest = hashlib.sha256(f"version={version}".encode())
+        for path in files:
+            digest.update(f"\n{os.path.basename(path)}={file_digest(path)}".encode())
+        return digest.hexdigest()[:32]
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Load a cached frame.
+
+        Args:
+            key (str): Cache key from make_key.
+
+        Returns:
+            pandas.DataFrame or None: The cached frame, or None on a cache miss.
+        """
+        entry_dir = self._entry_dir(key)
+        manifest_path = os.path.join(entry_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+
+        columns = []
+        for column in manifest["columns"]:
+            path = os.path.join(entry_dir, column["file"])
+            if column["dtype"] == "object":
+                values = np.load(path, allow_pickle=True)
+            else:
+                values = np.load(path, mmap_mode="c")
+            columns.append(pd.Series(values, name=column["name"], copy=False))
+        logger.info(f"Loaded {manifest['rows']} cached rows from {entry_dir}")
+        if not columns:
+            return pd.DataFrame(index=pd.RangeIndex(manifest["rows"]))
+        # One block per column, backed by its memory map: pd.DataFrame(dict) would
+        # consolidate same-dtype columns into one block and read them all into memory
+        return pd.concat(columns, axis=1, copy=False)
+
+    def save(self, key: str, df: pd.DataFrame):
+        """
+        Write a frame to the cache. The entry is written to a temporary directory and
+        renamed into place, so readers never see a partially written entry.
+
+        Args:
+            key (str): Cache key from make_key.
+            df (pandas.DataFrame): Frame to cache. Columns must have unique names.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key}-", dir=self.cache_dir)
+        try:
+            manifest = {"rows": len(df), "columns": []}
+            for i, name in enumerate(df.columns):
+                values = df[name].to_numpy()
+                file_name = f"col_{i:05d}.npy"
+                np.save(os.path.join(tmp_dir, file_name), values, allow_pickle=values.dtype == object)
+                manifest["columns"].append({"name": name, "dtype": str(values.dtype), "file": file_name})
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f)
+
+            try:
+                os.rename(tmp_dir, self._entry_dir(key))
+            except OSError:
+                # Another process already wrote this entry
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"Cached {len(df)} rows in {self._entry_dir(key)}")
+
+    def prune(self, keep_key: str):
+        """
+        Remove all cache entries except those whose key starts with keep_key.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if not name.startswith(keep_key) and not name.startswith("."):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
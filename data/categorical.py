@@ -0,0 +1,154 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Mapping, Optional
+import logging
+logger = logging.getLogger(__name__)
+
+# Company columns one-hot encoded by DataLoader.company_dummies, and their column prefixes
+COMPANY_CATEGORIES = {"INDUSTRY": "INDUSTRY", "EMPLOYEE_RANGE": "EM"}
+
+# Category that missing values are filled with, and that unseen values are counted as
+UNKNOWN = "Unknown"
+
+
+def _category_values(values: pd.Series) -> pd.Series:
+    """
+    Values as category names: strings, with missing values filled with 'Unknown'.
+    """
+    return values.fillna(UNKNOWN).astype(str)
+
+
+class CategoricalEncoder:
+    """
+    One-hot encoder with a vocabulary frozen by fit(). Every column always encodes to
+    the same indicator columns, in the same order: one per category seen in fit(),
+    sorted as pandas.get_dummies sorts them, plus an '<prefix>_Unknown' column that
+    values outside the vocabulary are counted as. Training and serving therefore get
+    the same feature layout from different data, as long as they share the vocabulary
+    (save() it with the model and load() it for serving).
+
+    Values are mapped to integer codes and scattered into a single preallocated uint8
+    matrix, instead of building one object-backed column per category.
+    """
+
+    def __init__(self, columns: Mapping[str, str] = COMPANY_CATEGORIES):
+        """
+        Initialize the encoder.
+
+        Args:
+            columns (Mapping[str, str]): Columns to encode, mapped to the prefix of their
+                indicator columns.
+        """
+        self.columns = dict(columns)
+        self.vocabulary: Optional[Dict[str, List[str]]] = None
+
+    def fit(self, df: pd.DataFrame) -> "CategoricalEncoder":
+        """
+        Learn the categories of every column. Missing values count as 'Unknown'.
+
+        Returns:
+            CategoricalEncoder: self
+        """
+        vocabulary = {}
+        for column in self.columns:
+            vocabulary[column] = sorted(set(_category_values(df[column]).unique()) | {UNKNOWN})
+        self._set_vocabulary(vocabulary)
+        logger.info(f"Fitted categories of {len(self.columns)} columns ({len(self.feature_names)} indicator columns).")
+        return self
+
+    def _set_vocabulary(self, vocabulary: Mapping[str, List[str]]):
+        self.vocabulary = {column: list(vocabulary[column]) for column in self.columns}
+        self._categories = {column: pd.Index(values) for column, values in self.vocabulary.items()}
+        offsets = np.cumsum([0] + [len(values) for values in self.vocabulary.values()])
+        self._offsets = dict(zip(self.vocabulary, offsets[:-1].tolist()))
+        self._unknown = {column: self._offsets[column] + values.index(UNKNOWN)
+                         for column, values in self.vocabulary.items()}
+        self.feature_names = [f"{self.columns[column]}_{value}"
+                              for column, values in self.vocabulary.items() for value in values]
+
+    def _check_fitted(self):
+        if self.vocabulary is None:
+            raise RuntimeError("CategoricalEncoder.fit() must be called before transform().")
+
+    def codes(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Indicator column index of every value, as an int64 (rows, columns) matrix.
+        Unseen and missing values get the index of their column's 'Unknown' indicator.
+        """
+        self._check_fitted()
+        codes = np.empty((len(df), len(self.columns)), dtype=np.int64)
+        for i, column in enumerate(self.columns):
+            column_codes = self._categories[column].get_indexer(_category_values(df[column]))
+            codes[:, i] = np.where(column_codes >= 0, column_codes + self._offsets[column], self._unknown[column])
+        return codes
+
+    def transform(self, df: pd.DataFrame, sparse: bool = False):
+        """
+        One-hot encode the columns.
+
+        Args:
+            df (pandas.DataFrame): Frame with the encoded columns.
+            sparse (bool): Return a scipy.sparse CSR matrix instead of a dense one.
+
+        Returns:
+            numpy.ndarray or scipy.sparse.csr_matrix: uint8 (rows, len(feature_names))
+                indicators, with exactly one 1 per encoded column and row.
+        """
+        codes = self.codes(df)
+        num_rows, num_columns = codes.shape
+        if sparse:
+            from scipy.sparse import csr_matrix
+            return csr_matrix((np.ones(codes.size, dtype=np.uint8), codes.ravel(),
+                               np.arange(0, codes.size + 1, num_columns)),
+                              shape=(num_rows, len(self.feature_names)))
+        matrix = np.zeros((num_rows, len(self.feature_names)), dtype=np.uint8)
+        np.put_along_axis(matrix, codes, 1, axis=1)
+        return matrix
+
+    def transform_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        One-hot encode the columns into a frame with the feature_names columns, backed
+        by the single uint8 matrix of transform().
+        """
+        return pd.DataFrame(self.transform(df), columns=self.feature_names, index=df.index, copy=False)
+
+    def unseen(self, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Number of values of every column that are not in the vocabulary and are counted
+        as 'Unknown', e.g. to log how many rows were bucketed.
+        """
+        self._check_fitted()
+        return {column: int((self._categories[column].get_indexer(_category_values(df[column])) < 0).sum())
+                for column in self.columns}
+
+    def fingerprint(self) -> str:
+        """
+        Short digest of the vocabulary, for cache keys of encoded data.
+        """
+        self._check_fitted()
+        payload = json.dumps({"columns": self.columns, "vocabulary": self.vocabulary}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def save(self, filepath: str):
+        """
+        Save the columns and vocabulary as JSON, written to a temporary file and renamed
+        into place.
+        """
+        self._check_fitted()
+        with open(filepath + ".tmp", "w") as f:
+            json.dump({"columns": self.columns, "vocabulary": self.vocabulary}, f)
+        os.replace(filepath + ".tmp", filepath)
+
+    @classmethod
+    def load(cls, filepath: str) -> "CategoricalEncoder":
+        """
+        Load an encoder saved with save().
+        """
+        with open(filepath) as f:
+            params = json.load(f)
+        encoder = cls(params["columns"])
+        encoder._set_vocabulary(params["vocabulary"])
+        return encoder
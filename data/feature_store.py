@@ -0,0 +1,270 @@
+import copy
+import numpy as np
+import pandas as pd
+from typing import List, NamedTuple, Optional, Sequence
+import logging
+logger = logging.getLogger(__name__)
+
+# Columns of the DataLoader output that are not model features
+NON_FEATURE_COLUMNS = ("id", "IS_CUSTOMER")
+
+
+class FeatureLookup(NamedTuple):
+    """
+    Result of a FeatureStore lookup.
+
+    Attributes:
+        ids: IDs that were found, in request order.
+        features: float32 matrix with one row per found ID.
+        missing_ids: IDs that are not present in the store, in request order.
+    """
+    ids: np.ndarray
+    features: np.ndarray
+    missing_ids: List[int]
+
+
+class FeatureStore:
+    """
+    In-memory feature store holding the merged company features as a contiguous
+    float32 matrix with a precomputed id -> row index.
+
+    A store is never modified after construction; updates produce a new store with a
+    higher version, which callers swap in atomically. Versions made by update_rows()
+    share the feature matrix of the previous version and keep the replaced rows in a
+    small sorted patch, so an update copies the rows it touches rather than the matrix.
+
+    Attributes:
+        ids (numpy.ndarray): Integer id for each row.
+        features (numpy.ndarray): Contiguous float32 feature matrix. On a patched
+            version it is materialized (and cached) on first access.
+    """
+
+    # Use a direct-address index while the id range is at most this many times the row count
+    DENSE_INDEX_FACTOR = 4
+
+    # Fold the patch into a new feature matrix once it holds this fraction of the rows
+    COMPACT_FRACTION = 1 / 16
+
+    def __init__(self, ids: np.ndarray, features: np.ndarray, feature_names: Sequence[str],
+                 version: int = 0):
+        """
+        Initialize the store from aligned ids and feature rows.
+
+        Args:
+            ids (numpy.ndarray): Integer id for each row, must be unique.
+            features (numpy.ndarray): Feature matrix of shape (len(ids), len(feature_names)).
+            feature_names (Sequence[str]): Column names of the feature matrix.
+            version (int): Snapshot version, incremented on every update.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if features.ndim != 2 or features.shape[0] != ids.shape[0]:
+            raise ValueError(f"Features shape {features.shape} does not match {len(ids)} ids.")
+        if features.shape[1] != len(feature_names):
+            raise ValueError(f"Expected {features.shape[1]} feature names, got {len(feature_names)}.")
+
+        self.ids = ids
+        self._base = features
+        self._patch_rows = np.empty(0, dtype=np.int64)
+        self._patch = features[:0]
+        self._features = features
+        self.feature_names = list(feature_names)
+        self.version = version
+        self._build_index()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, id_column: str = "id",
+                   exclude_columns: Sequence[str] = NON_FEATURE_COLUMNS) -> "FeatureStore":
+        """
+        Build a store from the DataLoader.load_and_preprocess() output.
+
+        Args:
+            df (pandas.DataFrame): Merged data with one row per id.
+            id_column (str): Name of the id column.
+            exclude_columns (Sequence[str]): Columns that are not model features.
+
+        Returns:
+            FeatureStore: Store with the remaining columns as features, in frame order.
+        """
+        feature_names = [col for col in df.columns if col not in exclude_columns]
+        features = df[feature_names].to_numpy(dtype=np.float32)
+        store = cls(df[id_column].to_numpy(), features, feature_names)
+        logger.info(f"Built feature store with {len(store)} ids and {len(feature_names)} features.")
+        return store
+
+    def _build_index(self):
+        """
+        Precompute the id -> row index. A direct-address array is used when the ids are
+        compact, otherwise a sorted copy of the ids is searched with numpy.searchsorted.
+        """
+        if len(np.unique(self.ids)) != len(self.ids):
+            raise ValueError("Feature store ids must be unique.")
+
+        self._dense_index = None
+        self._sorted_ids = None
+        self._sorted_rows = None
+        if len(self.ids) == 0:
+            return
+
+        min_id, max_id = int(self.ids.min()), int(self.ids.max())
+        if min_id >= 0 and max_id < self.DENSE_INDEX_FACTOR * len(self.ids) + 1024:
+            self._dense_index = np.full(max_id + 1, -1, dtype=np.int64)
+            self._dense_index[self.ids] = np.arange(len(self.ids), dtype=np.int64)
+        else:
+            self._sorted_rows = np.argsort(self.ids, kind="stable")
+            self._sorted_ids = self.ids[self._sorted_rows]
+
+    def replace_features(self, features: np.ndarray, ids: Optional[np.ndarray] = None) -> "FeatureStore":
+        """
+        Create the next version of the store with new feature rows.
+
+        Args:
+            features (numpy.ndarray): New float32 feature matrix.
+            ids (numpy.ndarray, optional): New ids when rows were added. Without it the
+                rows must match the current ids and the id index is shared, not rebuilt.
+
+        Returns:
+            FeatureStore: New store with version + 1.
+        """
+        if ids is not None:
+            return FeatureStore(ids, features, self.feature_names, version=self.version + 1)
+        if features.shape != self._base.shape:
+            raise ValueError(f"Expected features of shape {self._base.shape}, got {features.shape}.")
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        return self._next_version(features, features[:0], np.empty(0, dtype=np.int64))
+
+    def update_rows(self, rows: np.ndarray, features: np.ndarray) -> "FeatureStore":
+        """
+        Create the next version of the store with some feature rows replaced.
+
+        The new version shares the feature matrix of this one and holds the replaced
+        rows (together with the rows already patched since the last compaction) in a
+        patch, so the cost is proportional to the patched rows, not to the store. Once
+        the patch reaches COMPACT_FRACTION of the rows it is folded into a new matrix.
+
+        Args:
+            rows (numpy.ndarray): Unique row positions to replace.
+            features (numpy.ndarray): New feature rows, aligned with rows.
+
+        Returns:
+            FeatureStore: New store with version + 1.
+        """
+        rows = np.asarray(rows, dtype=np.int64).ravel()
+        features = np.asarray(features, dtype=np.float32)
+        if features.shape != (len(rows), self.num_features):
+            raise ValueError(f"Expected features of shape {(len(rows), self.num_features)}, got {features.shape}.")
+        if len(rows) and (rows.min() < 0 or rows.max() >= len(self)):
+            raise ValueError("Rows to update must be positions in the store.")
+
+        # Merge into the sorted patch; rows of the update win over earlier patched rows
+        keep = ~np.isin(self._patch_rows, rows)
+        patch_rows = np.concatenate([self._patch_rows[keep], rows])
+        patch = np.concatenate([self._patch[keep], features])
+        order = np.argsort(patch_rows, kind="stable")
+        patch_rows, patch = patch_rows[order], patch[order]
+
+        if len(patch_rows) > self.COMPACT_FRACTION * len(self):
+            base = self._base.copy()
+            base[patch_rows] = patch
+            return self._next_version(base, base[:0], np.empty(0, dtype=np.int64))
+        return self._next_version(self._base, patch, patch_rows)
+
+    def _next_version(self, base: np.ndarray, patch: np.ndarray, patch_rows: np.ndarray) -> "FeatureStore":
+        """
+        Copy of the store (sharing ids and the id index) with a new matrix and patch.
+        """
+        store = copy.copy(self)
+        store._base, store._patch, store._patch_rows = base, patch, patch_rows
+        store._features = base if len(patch_rows) == 0 else None
+        store.version = self.version + 1
+        return store
+
+    @property
+    def features(self) -> np.ndarray:
+        if self._features is None:
+            features = self._base.copy()
+            features[self._patch_rows] = self._patch
+            self._features = features
+        return self._features
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_features(self) -> int:
+        return self._base.shape[1]
+
+    def row_index(self, ids) -> np.ndarray:
+        """
+        Map ids to row positions in the feature matrix.
+
+        Args:
+            ids: Sequence or array of integer ids.
+
+        Returns:
+            numpy.ndarray: int64 row position for each id, -1 where the id is unknown.
+        """
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        rows = np.full(ids.shape, -1, dtype=np.int64)
+        if len(self.ids) == 0 or len(ids) == 0:
+            return rows
+
+        if self._dense_index is not None:
+            in_range = (ids >= 0) & (ids < len(self._dense_index))
+            rows[in_range] = self._dense_index[ids[in_range]]
+        else:
+            pos = np.searchsorted(self._sorted_ids, ids)
+            pos_clipped = np.minimum(pos, len(self._sorted_ids) - 1)
+            hit = self._sorted_ids[pos_clipped] == ids
+            rows[hit] = self._sorted_rows[pos_clipped[hit]]
+        return rows
+
+    def lookup(self, ids, out: np.ndarray = None) -> FeatureLookup:
+        """
+        Gather the feature rows for the given ids.
+
+        Args:
+            ids: Sequence or array of integer ids. Order and duplicates are preserved.
+            out (numpy.ndarray, optional): Preallocated float32 buffer with at least as many
+                rows as found ids; the gathered rows are written into its leading rows.
+
+        Returns:
+            FeatureLookup: Found ids, their feature rows and the ids that are missing.
+        """
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        rows = self.row_index(ids)
+        found = rows >= 0
+
+        if found.all():
+            found_ids, found_rows, missing_ids = ids, rows, []
+        else:
+            found_ids, found_rows = ids[found], rows[found]
+            missing_ids = ids[~found].tolist()
+
+        return FeatureLookup(found_ids, self.take_rows(found_rows, out), missing_ids)
+
+    def take_rows(self, rows: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Gather feature rows by row position.
+
+        Args:
+            rows (numpy.ndarray): int64 row positions, e.g. from row_index().
+            out (numpy.ndarray, optional): Preallocated float32 buffer with at least
+                len(rows) rows; the gathered rows are written into its leading rows.
+
+        Returns:
+            numpy.ndarray: float32 matrix with one row per position.
+        """
+        if out is not None:
+            out = out[:len(rows)]
+            np.take(self._base, rows, axis=0, out=out)
+            features = out
+        else:
+            features = self._base.take(rows, axis=0)
+
+        if len(self._patch_rows) and len(rows):
+            pos = np.minimum(np.searchsorted(self._patch_rows, rows), len(self._patch_rows) - 1)
+            patched = self._patch_rows[pos] == rows
+            if patched.any():
+                features[patched] = self._patch[pos[patched]]
+        return features
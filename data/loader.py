@@ -1,15 +1,61 @@
+import multiprocessing
 import pandas as pd
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from data.cache import FrameCache
+from data.aggregation import ActionAggregates
+from data.categorical import CategoricalEncoder
+from data.window_features import WindowFeatureBuilder
 import logging
 logger = logging.getLogger(__name__)
+
+# Bump whenever a change alters the output of load_and_preprocess, so cached frames are rebuilt
+LOADER_VERSION = "2"
+
+# State of a partition worker process, set once by _init_partition_worker
+_worker_state = {}
+
+def _init_partition_worker(loader, customers, noncustomers):
+    _worker_state.update(loader=loader, customers=customers, noncustomers=noncustomers)
+
+def _aggregate_partition(actions: pd.DataFrame) -> ActionAggregates:
+    """
+    Preprocess one partition of the actions data and aggregate it by id.
+    """
+    return _worker_state["loader"].aggregate_actions(
+        _worker_state["customers"], _worker_state["noncustomers"], actions)
+
+
 class DataLoader:
-    def __init__(self, customers_file: str, noncustomers_file: str, actions_file: str):
+    def __init__(self, customers_file: str, noncustomers_file: str, actions_file: str,
+                 cache_dir: Optional[str] = None, chunksize: Optional[int] = None,
+                 num_workers: int = 1, encoder: Optional[CategoricalEncoder] = None,
+                 window_features: Optional[dict] = None):
         """
         Initialize the DataLoader with file paths for the datasets.
+
+        Args:
+            cache_dir (str, optional): Directory for caching the merged DataFrame. The cache
+                is keyed by the content of the three files and LOADER_VERSION.
+            chunksize (int, optional): Read and aggregate the actions file in chunks of this
+                many rows instead of loading it whole (see merge_streaming).
+            num_workers (int): Number of processes aggregating hash partitions of the
+                actions data (see merge_parallel). 1 aggregates in this process.
+            encoder (CategoricalEncoder, optional): Frozen vocabulary of the company dummy
+                columns, e.g. the one saved with a trained model. Without one, it is fitted
+                on the company tables on first use and kept in self.encoder.
+            window_features (dict, optional): Keyword arguments of a WindowFeatureBuilder.
+                When set, its time-windowed and recency-weighted action features are
+                added to the merged data (see add_window_features).
         """
         self.customers_file = customers_file
         self.noncustomers_file = noncustomers_file
         self.actions_file = actions_file
+        self.cache = FrameCache(cache_dir) if cache_dir else None
+        self.chunksize = chunksize
+        self.num_workers = num_workers
+        self.encoder = encoder
+        self.window_features = window_features
 
     def load_data(self) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """
@@ -62,55 +108,252 @@ class DataLoader:
         df.fillna(0, inplace=True)  # Fill all missing values with 0
         return df
 
-    def merge_datasets(self, customers: pd.DataFrame, noncustomers: pd.DataFrame, actions: pd.DataFrame) -> pd.DataFrame:
+    def flag_companies(self, customers: pd.DataFrame, noncustomers: pd.DataFrame):
         """
-        Merge customers and noncustomers with the actions dataset on the 'id' column.
-        
-        Returns:
-            Merged DataFrame.
+        Add the IS_CUSTOMER flag to both company tables and a zero MRR to noncustomers.
         """
-        # Add a flag to distinguish customers from noncustomers
         customers['IS_CUSTOMER'] = 1
         noncustomers['IS_CUSTOMER'] = 0
         noncustomers['MRR'] = 0
-        # Combine customers and noncustomers into one dataset
+
+    def join_actions(self, customers: pd.DataFrame, noncustomers: pd.DataFrame, actions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Join the flagged company tables with (a chunk of) the actions dataset on 'id'.
+        Customer actions are kept only if they happened before CLOSEDATE.
+
+        Returns:
+            DataFrame with one row per company action.
+        """
         customer_f = customers.merge(actions, left_on='id', right_on='id')
         customer_f = customer_f[customer_f.CLOSEDATE>customer_f.WHEN_TIMESTAMP]
         noncustomer_f = noncustomers.merge(actions, left_on='id', right_on='id')
-        customers_full = pd.concat([noncustomers, customers.drop(columns=['CLOSEDATE'])])
-        c = pd.concat([customers_full['id'], pd.get_dummies(customers_full['INDUSTRY'], prefix = 'INDUSTRY'),\
-            pd.get_dummies(customers_full['EMPLOYEE_RANGE'], prefix = 'EM')], axis=1)
-        
-        all_customers = pd.concat([customer_f.drop(columns=['CLOSEDATE']), noncustomer_f], ignore_index=True)
+        return pd.concat([customer_f.drop(columns=['CLOSEDATE']), noncustomer_f], ignore_index=True)
 
-        # Create dummy variables for 'INDUSTRY'
-        
-        #industry_dummies = pd.get_dummies(all_customers['INDUSTRY'], prefix='INDUSTRY')
-        # industry_dummies_non = pd.get_dummies(noncustomer_f['INDUSTRY'], prefix='INDUSTRY')
+    def company_dummies(self, customers: pd.DataFrame, noncustomers: pd.DataFrame) -> pd.DataFrame:
+        """
+        Build dummy variables for 'INDUSTRY' and 'EMPLOYEE_RANGE' for every company, with
+        the columns of self.encoder's vocabulary. Values outside of it are counted in the
+        'INDUSTRY_Unknown' / 'EM_Unknown' columns.
 
+        Returns:
+            DataFrame with 'id' and one uint8 column per industry / employee range.
+        """
+        customers_full = pd.concat([noncustomers, customers.drop(columns=['CLOSEDATE'])], ignore_index=True)
+        if self.encoder is None:
+            self.encoder = CategoricalEncoder().fit(customers_full)
+        unseen = {column: count for column, count in self.encoder.unseen(customers_full).items() if count}
+        if unseen:
+            logger.warning(f"Values outside the category vocabulary counted as Unknown: {unseen}")
+        dummies = self.encoder.transform_frame(customers_full)
+        dummies.insert(0, 'id', customers_full['id'].to_numpy())
+        return dummies
 
-        # # Add dummy variables to the DataFrame
-        # customer_f = pd.concat([customer_f, industry_dummies], axis=1)
-        # noncustomer_f = pd.concat([noncustomer_f, industry_dummies_non], axis=1)
+    def merge_datasets(self, customers: pd.DataFrame, noncustomers: pd.DataFrame, actions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Merge customers and noncustomers with the actions dataset on the 'id' column.
+        
+        Returns:
+            Merged DataFrame.
+        """
+        # Add a flag to distinguish customers from noncustomers
+        self.flag_companies(customers, noncustomers)
+        # Combine customers and noncustomers into one dataset
+        all_customers = self.join_actions(customers, noncustomers, actions)
 
         # Select numeric columns including the new dummy variables; # Merge with actions
         numeric_columns = all_customers.drop(columns=['id', 'MRR']).select_dtypes(include='number').columns
 
         # Group by 'id' and take the mean
-        #
         companies = all_customers.groupby('id')[numeric_columns].mean().reset_index()
-        companies_f = companies.merge(c, left_on= 'id', right_on ='id', how='left')
-        # companies_f = pd.concat([customer_f, industry_dummies], axis=1)
+        return self.finalize(companies, customers, noncustomers, actions)
+
+    def add_window_features(self, companies: pd.DataFrame, customers: pd.DataFrame, noncustomers: pd.DataFrame,
+                            actions: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Attach the WindowFeatureBuilder features to the per-id action means. Without the
+        preprocessed actions, the actions file is read again in chunks of self.chunksize
+        rows (spilled to disk by id partition if the builder has a spill_dir).
 
+        These columns are computed over the full log: FeatureRefresher.apply_actions keeps
+        them as they are until the next full load.
+        """
+        builder = WindowFeatureBuilder(**self.window_features)
+        if actions is not None:
+            builder.add(actions)
+        else:
+            builder.add_file(self.actions_file, self.chunksize or 1_000_000)
+        return companies.merge(builder.compute(customers, noncustomers), on='id', how='left')
+
+    def finalize(self, companies: pd.DataFrame, customers: pd.DataFrame, noncustomers: pd.DataFrame,
+                 actions: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Attach the window features, if enabled, and the company dummy variables to the
+        per-id action means.
+        """
+        if self.window_features is not None:
+            companies = self.add_window_features(companies, customers, noncustomers, actions)
+        c = self.company_dummies(customers, noncustomers)
+        companies_f = companies.merge(c, left_on= 'id', right_on ='id', how='left')
         return companies_f
 
+    def load_companies(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Load, preprocess and flag the customers and noncustomers tables.
+
+        Returns:
+            Tuple of pandas DataFrames: (customers, noncustomers)
+        """
+        customers = self.preprocess_customers(pd.read_csv(self.customers_file))
+        noncustomers = self.preprocess_noncustomers(pd.read_csv(self.noncustomers_file))
+        self.flag_companies(customers, noncustomers)
+        return customers, noncustomers
+
+    def aggregate_actions(self, customers: pd.DataFrame, noncustomers: pd.DataFrame,
+                          actions: pd.DataFrame) -> ActionAggregates:
+        """
+        Preprocess raw action rows, join them with the flagged company tables and reduce
+        them to per-id sums and counts.
+        """
+        actions = self.preprocess_actions(actions)
+        return ActionAggregates.from_rows(self.join_actions(customers, noncustomers, actions))
+
+    def aggregate_streaming(self, customers: pd.DataFrame, noncustomers: pd.DataFrame) -> ActionAggregates:
+        """
+        Aggregate the actions file in chunks of self.chunksize rows. Each chunk is joined
+        with the (small) company tables and reduced to per-id sums and counts, which are
+        combined as they arrive. Peak memory is bounded by the company tables plus one
+        chunk rather than the full actions log.
+        """
+        aggregates = None
+        num_actions = 0
+        logger.info(f"Streaming actions data from {self.actions_file} in chunks of {self.chunksize} rows")
+        for chunk in pd.read_csv(self.actions_file, chunksize=self.chunksize):
+            num_actions += len(chunk)
+            partial = self.aggregate_actions(customers, noncustomers, chunk)
+            aggregates = partial if aggregates is None else aggregates.combine(partial)
+        logger.info(f"Aggregated {num_actions} action records for {len(aggregates)} companies.")
+        return aggregates
+
+    def aggregate_parallel(self, customers: pd.DataFrame, noncustomers: pd.DataFrame) -> ActionAggregates:
+        """
+        Aggregate the actions file with self.num_workers processes. The actions data (read
+        whole, or in chunks of self.chunksize rows) is hash-partitioned by id, and each
+        partition is preprocessed, joined and aggregated in a worker process.
+        """
+        if self.chunksize:
+            chunks = pd.read_csv(self.actions_file, chunksize=self.chunksize)
+        else:
+            chunks = [pd.read_csv(self.actions_file)]
+
+        num_actions = 0
+        pending, parts = [], []
+        logger.info(f"Aggregating actions data from {self.actions_file} with {self.num_workers} workers")
+        with ProcessPoolExecutor(self.num_workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_partition_worker,
+                                 initargs=(self, customers, noncustomers)) as pool:
+            for chunk in chunks:
+                num_actions += len(chunk)
+                partition = pd.util.hash_pandas_object(chunk['id'], index=False).to_numpy() % self.num_workers
+                for _, part in chunk.groupby(partition, sort=False):
+                    pending.append(pool.submit(_aggregate_partition, part))
+                # Keep at most two chunks in flight to bound memory
+                while len(pending) > 2 * self.num_workers:
+                    parts.append(pending.pop(0).result())
+            parts.extend(future.result() for future in pending)
+
+        aggregates = ActionAggregates.concat(parts)
+        logger.info(f"Aggregated {num_actions} action records for {len(aggregates)} companies.")
+        return aggregates
+
+    def compute_aggregates(self, customers: pd.DataFrame, noncustomers: pd.DataFrame) -> ActionAggregates:
+        """
+        Aggregate the full actions file, streaming and/or in parallel as configured.
+        """
+        if self.num_workers > 1:
+            return self.aggregate_parallel(customers, noncustomers)
+        if self.chunksize:
+            return self.aggregate_streaming(customers, noncustomers)
+        logger.info(f"Loading actions data from {self.actions_file}")
+        return self.aggregate_actions(customers, noncustomers, pd.read_csv(self.actions_file))
+
+    def load_aggregates(self, customers: pd.DataFrame, noncustomers: pd.DataFrame) -> ActionAggregates:
+        """
+        Per-id sums and counts over the full actions file, cached next to the merged
+        DataFrame when a cache directory is set. Used to apply new actions incrementally.
+        """
+        if self.cache is None:
+            return self.compute_aggregates(customers, noncustomers)
+
+        key = self._cache_key()
+        sums = self.cache.load(f"{key}-sums")
+        counts = self.cache.load(f"{key}-counts")
+        if sums is not None and counts is not None:
+            return ActionAggregates(sums.set_index('id'), counts.set_index('id'))
+
+        aggregates = self.compute_aggregates(customers, noncustomers)
+        self.cache.save(f"{key}-sums", aggregates.sums.rename_axis('id').reset_index())
+        self.cache.save(f"{key}-counts", aggregates.counts.rename_axis('id').reset_index())
+        self.cache.prune(keep_key=key)
+        return aggregates
+
+    def merge_aggregates(self, aggregates: ActionAggregates, customers: pd.DataFrame,
+                         noncustomers: pd.DataFrame) -> pd.DataFrame:
+        """
+        Build the merged DataFrame from per-id aggregates. Identical to merge_datasets
+        over the same action rows.
+        """
+        companies = aggregates.means().rename_axis('id').reset_index()
+        return self.finalize(companies, customers, noncustomers)
+
+    def fit_encoder(self) -> CategoricalEncoder:
+        """
+        Fit self.encoder on the company tables, unless it is set already.
+        """
+        if self.encoder is None:
+            customers, noncustomers = self.load_companies()
+            self.company_dummies(customers, noncustomers)
+        return self.encoder
+
+    def _cache_key(self) -> str:
+        return FrameCache.make_key(
+            [self.customers_file, self.noncustomers_file, self.actions_file], LOADER_VERSION)
+
     def load_and_preprocess(self) -> pd.DataFrame:
         """
         Load and preprocess all datasets, then merge them into a single DataFrame.
+        With a cache directory, a cached result for the same input files and category
+        vocabulary is reused.
         
         Returns:
             Final merged and cleaned DataFrame.
         """
+        if self.cache is None:
+            return self._build()
+
+        # Entries of the same files share the key prefix, so prune() keeps the aggregates too
+        key = self._cache_key()
+        entry = f"{key}-{self.fit_encoder().fingerprint()}"
+        if self.window_features is not None:
+            entry += "-" + WindowFeatureBuilder(**self.window_features).fingerprint()
+        merged_data = self.cache.load(entry)
+        if merged_data is not None:
+            return merged_data
+
+        logger.info("No cached merged data for the current input files, rebuilding.")
+        merged_data = self._build()
+        self.cache.save(entry, merged_data)
+        self.cache.prune(keep_key=key)
+        return merged_data
+
+    def _build(self) -> pd.DataFrame:
+        """
+        Run the full load, preprocess and merge pipeline.
+        """
+        if self.chunksize or self.num_workers > 1:
+            customers, noncustomers = self.load_companies()
+            aggregates = self.compute_aggregates(customers, noncustomers)
+            return self.merge_aggregates(aggregates, customers, noncustomers)
+
         customers, noncustomers, actions = self.load_data()
         customers = self.preprocess_customers(customers)
         noncustomers = self.preprocess_noncustomers(noncustomers)
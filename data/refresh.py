@@ -0,0 +1,169 @@
+import os
+import glob
+import threading
+import numpy as np
+import pandas as pd
+from data.loader import DataLoader
+from data.feature_store import FeatureStore
+import logging
+logger = logging.getLogger(__name__)
+
+
+class FeatureRefresher:
+    """
+    Keeps the per-id running sums and counts behind the groupby('id').mean() features,
+    so batches of new action rows can be applied without reloading the full actions log.
+    Every update produces a new FeatureStore version that is swapped in atomically.
+    """
+
+    def __init__(self, loader: DataLoader):
+        """
+        Initialize the refresher.
+
+        Args:
+            loader (DataLoader): Loader for the company tables and the initial actions log.
+        """
+        self.loader = loader
+        self.store = None
+        self._lock = threading.Lock()
+
+    def build(self) -> FeatureStore:
+        """
+        Load the company tables and the aggregates of the full actions log, and build the
+        initial store. The store matches FeatureStore.from_frame(loader.load_and_preprocess()).
+
+        Returns:
+            FeatureStore: The initial store, also available as self.store.
+        """
+        customers, noncustomers = self.loader.load_companies()
+        aggregates = self.loader.load_aggregates(customers, noncustomers)
+        store = FeatureStore.from_frame(self.loader.merge_aggregates(aggregates, customers, noncustomers))
+
+        # Aggregated columns that are model features, and their positions in the feature matrix
+        self._columns = [col for col in aggregates.sums.columns if col in store.feature_names]
+        self._feature_index = np.array([store.feature_names.index(col) for col in self._columns], dtype=np.int64)
+
+        rows = store.row_index(aggregates.sums.index)
+        self._sums = np.zeros((len(store), len(self._columns)))
+        self._counts = np.zeros((len(store), len(self._columns)), dtype=np.int64)
+        self._sums[rows] = aggregates.sums[self._columns].to_numpy()
+        self._counts[rows] = aggregates.counts[self._columns].to_numpy()
+
+        # Company-level columns (dummies), used for companies that get their first actions later
+        dummies = self.loader.company_dummies(customers, noncustomers).drop_duplicates('id').set_index('id')
+        self._static_columns = [col for col in store.feature_names if col in dummies.columns]
+        self._static_index = np.array([store.feature_names.index(col) for col in self._static_columns], dtype=np.int64)
+        self._static = dummies[self._static_columns]
+
+        self._customers, self._noncustomers = customers, noncustomers
+        self.store = store
+        return store
+
+    def apply_actions(self, actions: pd.DataFrame) -> FeatureStore:
+        """
+        Apply a batch of new action rows. Only the ids in the batch are recomputed, and
+        the new store shares the feature matrix of the previous one (see
+        FeatureStore.update_rows), so the cost follows the batch, not the store. Ids seen
+        for the first time are appended to the store, which rebuilds its matrix. The
+        running aggregates are committed after the new store is swapped in, so a batch
+        that fails leaves the refresher as it was.
+
+        Args:
+            actions (pandas.DataFrame): New rows with the schema of the actions file.
+
+        Returns:
+            FeatureStore: The new store version, also available as self.store.
+        """
+        if self.store is None:
+            raise RuntimeError("FeatureRefresher.build() must be called before applying actions.")
+
+        with self._lock:
+            delta = self.loader.aggregate_actions(self._customers, self._noncustomers, actions.copy())
+            store = self.store
+            if len(delta) == 0:
+                return store
+
+            delta_ids = delta.sums.index.to_numpy(dtype=np.int64)
+            delta_sums = delta.sums.reindex(columns=self._columns, fill_value=0).to_numpy()
+            delta_counts = delta.counts.reindex(columns=self._columns, fill_value=0).to_numpy()
+
+            rows = store.row_index(delta_ids)
+            new = rows < 0
+
+            # Aggregates of the touched ids only; committed once the new store is swapped in
+            sums = np.zeros((len(rows), len(self._columns)))
+            counts = np.zeros((len(rows), len(self._columns)), dtype=np.int64)
+            sums[~new], counts[~new] = self._sums[rows[~new]], self._counts[rows[~new]]
+            sums += delta_sums
+            counts += delta_counts
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = sums / counts
+
+            features = np.zeros((len(rows), store.num_features), dtype=np.float32)
+            features[~new] = store.take_rows(rows[~new])
+            if new.any():
+                features[np.ix_(new, self._static_index)] = self._static.reindex(delta_ids[new]).to_numpy(np.float32)
+            features[:, self._feature_index] = means
+
+            if new.any():
+                # First actions of some companies: the ids and their index change, so the
+                # matrix is rebuilt, once per new company
+                num_new = int(new.sum())
+                matrix = np.concatenate([store.features, features[new]])
+                matrix[rows[~new]] = features[~new]
+                self.store = store.replace_features(matrix, np.concatenate([store.ids, delta_ids[new]]))
+                rows[new] = np.arange(len(store), len(store) + num_new)
+                self._sums = np.concatenate([self._sums, np.zeros((num_new, self._sums.shape[1]))])
+                self._counts = np.concatenate([self._counts, np.zeros((num_new, self._counts.shape[1]), dtype=np.int64)])
+            else:
+                self.store = store.update_rows(rows, features)
+            self._sums[rows], self._counts[rows] = sums, counts
+
+        logger.info(f"Applied {len(actions)} action records to {len(delta_ids)} ids "
+                    f"({int(new.sum())} new), feature store version {self.store.version}.")
+        return self.store
+
+
+class ActionFileWatcher:
+    """
+    Polls a directory for new action CSV files and applies them through a FeatureRefresher.
+    Files are processed in name order and renamed with a '.done' (or '.failed') suffix.
+    """
+
+    def __init__(self, refresher: FeatureRefresher, watch_dir: str, interval_seconds: float = 60.0):
+        self.refresher = refresher
+        self.watch_dir = watch_dir
+        self.interval_seconds = interval_seconds
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start polling in a background thread.
+        """
+        os.makedirs(self.watch_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="action-file-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.watch_dir} for new action files every {self.interval_seconds}s.")
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self):
+        """
+        Apply all pending action files once.
+        """
+        for path in sorted(glob.glob(os.path.join(self.watch_dir, "*.csv"))):
+            try:
+                self.refresher.apply_actions(pd.read_csv(path))
+                os.rename(path, path + ".done")
+            except Exception as e:
+                logger.error(f"Failed to apply action file {path}: {e}")
+                os.rename(path, path + ".failed")
+
+    def _run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            self.poll()
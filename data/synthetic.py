@@ -0,0 +1,136 @@
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+import logging
+logger = logging.getLogger(__name__)
+
+# Numeric usage columns of the actions dataset
+ACTION_COLUMNS = [
+    "ACTIONS_CRM_CONTACTS", "ACTIONS_CRM_COMPANIES", "ACTIONS_CRM_DEALS", "ACTIONS_EMAIL",
+    "USERS_CRM_CONTACTS", "USERS_CRM_COMPANIES", "USERS_CRM_DEALS", "USERS_EMAIL",
+]
+EMPLOYEE_RANGES = ["1", "2 to 5", "6 to 10", "11 to 25", "26 to 50", "51 to 200",
+                   "201 to 1000", "1001 to 10000", "10001 or more"]
+START_DATE = pd.Timestamp("2019-01-01")
+PERIOD_DAYS = 730
+
+
+def generate_companies(num_customers: int, num_noncustomers: int, num_industries: int = 30,
+                       seed: int = 0):
+    """
+    Generate customers and noncustomers tables with the schema DataLoader expects.
+    Customer ids come first, followed by noncustomer ids. Some INDUSTRY, EMPLOYEE_RANGE,
+    ALEXA_RANK and CLOSEDATE values are left missing, as in the real exports.
+
+    Returns:
+        Tuple of pandas DataFrames: (customers, noncustomers)
+    """
+    rng = np.random.default_rng(seed)
+    industries = np.array([f"INDUSTRY_{i:03d}" for i in range(num_industries)], dtype=object)
+
+    def company_columns(n):
+        industry = industries[rng.integers(0, num_industries, n)]
+        industry[rng.random(n) < 0.05] = None
+        employee_range = np.array(EMPLOYEE_RANGES, dtype=object)[rng.integers(0, len(EMPLOYEE_RANGES), n)]
+        employee_range[rng.random(n) < 0.05] = None
+        alexa_rank = rng.integers(1, 16_000_000, n).astype(np.float64)
+        alexa_rank[rng.random(n) < 0.1] = np.nan
+        return {"ALEXA_RANK": alexa_rank, "EMPLOYEE_RANGE": employee_range, "INDUSTRY": industry}
+
+    close_dates = START_DATE + pd.to_timedelta(rng.integers(30, PERIOD_DAYS, num_customers), unit="D")
+    close_dates = pd.Series(close_dates).mask(rng.random(num_customers) < 0.02)
+    customers = pd.DataFrame({
+        "id": np.arange(num_customers),
+        "CLOSEDATE": close_dates.dt.strftime("%Y-%m-%d"),
+        "MRR": np.round(rng.gamma(2.0, 200.0, num_customers), 2),
+        **company_columns(num_customers),
+    })
+    noncustomers = pd.DataFrame({
+        "id": np.arange(num_customers, num_customers + num_noncustomers),
+        **company_columns(num_noncustomers),
+    })
+    return customers, noncustomers
+
+
+def format_timestamps(seconds: np.ndarray) -> np.ndarray:
+    """
+    Format seconds since START_DATE as 'YYYY-MM-DD HH:MM:SS' strings. The date part is
+    looked up per day and the time digits are computed, which is several times faster
+    than strftime for millions of rows.
+    """
+    days, time_of_day = np.divmod(seconds, 86400)
+    dates = (START_DATE + pd.to_timedelta(np.arange(days.max() + 1), unit="D")).strftime("%Y-%m-%d ")
+    text = np.empty((len(seconds), 19), dtype=np.uint8)
+    text[:, :11] = np.array(dates, dtype="S11").view(np.uint8).reshape(-1, 11)[days]
+    hours, rest = np.divmod(time_of_day, 3600)
+    minutes, secs = np.divmod(rest, 60)
+    for column, value in ((11, hours), (14, minutes), (17, secs)):
+        text[:, column] = ord("0") + value // 10
+        text[:, column + 1] = ord("0") + value % 10
+    text[:, 13] = text[:, 16] = ord(":")
+    return text.view("S19").ravel().astype("U19")
+
+
+def generate_actions(num_actions: int, num_companies: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate action records for ids in [0, num_companies). Activity is skewed so that
+    a few companies produce most of the actions.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.minimum(rng.zipf(1.3, num_actions) - 1, num_companies - 1)
+    ids = rng.permutation(num_companies)[ids]
+    timestamps = format_timestamps(rng.integers(0, PERIOD_DAYS * 86400, num_actions))
+    actions = pd.DataFrame({"id": ids, "WHEN_TIMESTAMP": timestamps})
+    for column in ACTION_COLUMNS:
+        actions[column] = rng.poisson(3.0, num_actions)
+    return actions
+
+
+def _actions_csv(num_actions: int, num_companies: int, seed: int, header: bool) -> bytes:
+    return generate_actions(num_actions, num_companies, seed).to_csv(index=False, header=header).encode()
+
+
+def generate_dataset(output_dir: str, num_customers: int = 200, num_noncustomers: int = 800,
+                     num_actions: int = 10_000, num_industries: int = 30, seed: int = 0,
+                     chunk_rows: int = 1_000_000, num_workers: int = 1) -> Dict[str, str]:
+    """
+    Write synthetic customers.csv, noncustomers.csv and actions.csv to output_dir.
+    Actions are generated and appended in chunks, so large logs (10^8 rows and more)
+    never sit in memory. With num_workers > 1, chunks are generated and encoded by
+    worker processes and appended in order; the output does not depend on num_workers.
+
+    Returns:
+        dict: Paths keyed by 'customers_file', 'noncustomers_file' and 'actions_file'.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        "customers_file": os.path.join(output_dir, "customers.csv"),
+        "noncustomers_file": os.path.join(output_dir, "noncustomers.csv"),
+        "actions_file": os.path.join(output_dir, "actions.csv"),
+    }
+    customers, noncustomers = generate_companies(num_customers, num_noncustomers, num_industries, seed)
+    customers.to_csv(paths["customers_file"], index=False)
+    noncustomers.to_csv(paths["noncustomers_file"], index=False)
+
+    num_companies = num_customers + num_noncustomers
+    chunks = [(min(chunk_rows, num_actions - start), num_companies, seed + 1 + index, start == 0)
+              for index, start in enumerate(range(0, num_actions, chunk_rows))]
+    with open(paths["actions_file"], "wb") as f:
+        if num_workers > 1:
+            with ProcessPoolExecutor(num_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                pending = []
+                for chunk in chunks:
+                    pending.append(pool.submit(_actions_csv, *chunk))
+                    # Keep at most two chunks per worker in flight to bound memory
+                    while len(pending) > 2 * num_workers:
+                        f.write(pending.pop(0).result())
+                for future in pending:
+                    f.write(future.result())
+        else:
+            for chunk in chunks:
+                f.write(_actions_csv(*chunk))
+    logger.info(f"Wrote {num_companies} companies and {num_actions} actions to {output_dir}")
+    return paths
@@ -0,0 +1,274 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Sequence
+import logging
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+# Cutoff of ids none of whose actions count; far enough from int64's limits to shift by a window
+EXCLUDED = -(2 ** 62)
+
+
+def segment_starts(sorted_ids: np.ndarray) -> np.ndarray:
+    """
+    Start positions of the runs of equal ids in a sorted id array.
+    """
+    if len(sorted_ids) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.concatenate(([True], sorted_ids[1:] != sorted_ids[:-1])))
+
+
+class SortedActions:
+    """
+    Action rows sorted by (id, timestamp), with a composite int64 key
+    segment * span + (seconds - origin) that is increasing over all rows. Any
+    "rows of id i before time t" boundary is then one numpy.searchsorted, for all ids
+    at once, instead of a per-group filter.
+    """
+
+    def __init__(self, ids: np.ndarray, seconds: np.ndarray, values: np.ndarray):
+        """
+        Sort the rows.
+
+        Args:
+            ids (numpy.ndarray): int64 id of every row.
+            seconds (numpy.ndarray): int64 timestamp of every row, in seconds.
+            values (numpy.ndarray): (rows, columns) numeric action values.
+        """
+        order = np.lexsort((seconds, ids))
+        self.ids = ids[order]
+        self.seconds = seconds[order]
+        self.values = values[order]
+        self.starts = segment_starts(self.ids)
+        self.ends = np.append(self.starts[1:], len(self.ids)).astype(np.int64)
+        self.unique_ids = self.ids[self.starts]
+
+        self.origin = int(self.seconds.min()) if len(self.seconds) else 0
+        self.span = (int(self.seconds.max()) - self.origin + 1) if len(self.seconds) else 1
+        if len(self.starts) * self.span >= 2 ** 62:
+            raise ValueError("Too many ids and too long a time range for one partition; use more partitions.")
+        segments = np.repeat(np.arange(len(self.starts), dtype=np.int64), self.ends - self.starts)
+        self.key = segments * self.span + (self.seconds - self.origin)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position(self, seconds: np.ndarray) -> np.ndarray:
+        """
+        For every id (in unique_ids order), the position of its first row at or after
+        seconds[i]: rows [starts[i], position) are the ones before seconds[i].
+        """
+        offset = np.clip(seconds, self.origin, self.origin + self.span) - self.origin
+        query = np.arange(len(self.starts), dtype=np.int64) * self.span + offset
+        return np.searchsorted(self.key, query, side="left")
+
+
+class WindowFeatureBuilder:
+    """
+    Time-windowed and recency-weighted action features per id, as of a cutoff time per
+    id: a customer's CLOSEDATE (only actions before it count, as in
+    DataLoader.join_actions) and a common as_of time for the other companies.
+
+    For every window of windows_days days before the cutoff, the number of actions and
+    the sums of every action column; for every half-life, the exponentially decayed
+    average of every action column; and the days from the first and last action to the
+    cutoff.
+
+    Action chunks are added with add(). With a spill directory, their (id, timestamp,
+    values) arrays are appended to num_partitions files by id, so the full log is never
+    in memory: features are computed one partition at a time, each sorted once.
+    """
+
+    def __init__(self, windows_days: Sequence[int] = (7, 30, 90), half_lives_days: Sequence[float] = (30,),
+                 columns: Optional[Sequence[str]] = None, as_of: Optional[str] = None,
+                 spill_dir: Optional[str] = None, num_partitions: int = 16):
+        """
+        Initialize the builder.
+
+        Args:
+            windows_days (Sequence[int]): Window lengths in days.
+            half_lives_days (Sequence[float]): Half-lives of the decayed averages in days.
+            columns (Sequence[str], optional): Action columns to aggregate. Defaults to the
+                numeric columns of the first chunk, except 'id'.
+            as_of (str, optional): Cutoff time of companies without a CLOSEDATE. Defaults to
+                one second after the last action.
+            spill_dir (str, optional): Directory for the partition files. None keeps the
+                added chunks in memory, as a single partition.
+            num_partitions (int): Number of id partitions spilled to disk.
+        """
+        self.windows_days = [int(days) for days in windows_days]
+        self.half_lives_days = [float(days) for days in half_lives_days]
+        self.columns = list(columns) if columns is not None else None
+        self.as_of = as_of
+        self.spill_dir = spill_dir
+        self.num_partitions = num_partitions if spill_dir else 1
+        self.num_rows = 0
+        self.max_seconds = None
+        self._chunks = []
+        self._partition_dir = None
+
+    @property
+    def feature_names(self) -> List[str]:
+        """
+        Names of the computed features, in column order.
+        """
+        names = [f"NUM_ACTIONS_{days}D" for days in self.windows_days]
+        names += [f"{column}_SUM_{days}D" for days in self.windows_days for column in self.columns]
+        names += [f"{column}_DECAY_{days:g}D" for days in self.half_lives_days for column in self.columns]
+        return names + ["DAYS_SINCE_FIRST_ACTION", "DAYS_SINCE_LAST_ACTION"]
+
+    def fingerprint(self) -> str:
+        """
+        Short digest of the feature parameters, for cache keys.
+        """
+        payload = json.dumps({"windows_days": self.windows_days, "half_lives_days": self.half_lives_days,
+                              "columns": self.columns, "as_of": self.as_of})
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def add(self, actions: pd.DataFrame):
+        """
+        Add a chunk of action rows with the schema of the actions file. Rows without a
+        valid WHEN_TIMESTAMP are skipped; missing values count as 0.
+        """
+        if self.columns is None:
+            self.columns = [column for column in actions.drop(columns=["id"]).select_dtypes(include="number").columns]
+        timestamps = pd.to_datetime(actions["WHEN_TIMESTAMP"], errors="coerce")
+        valid = timestamps.notna().to_numpy()
+        ids = actions["id"].to_numpy(dtype=np.int64)[valid]
+        seconds = timestamps.to_numpy(dtype="datetime64[s]").astype(np.int64)[valid]
+        values = actions[self.columns].to_numpy(dtype=np.float32, na_value=0)[valid]
+        if len(ids) == 0:
+            return
+        self.num_rows += len(ids)
+        self.max_seconds = int(seconds.max()) if self.max_seconds is None else max(self.max_seconds, int(seconds.max()))
+
+        if self.spill_dir is None:
+            self._chunks.append((ids, seconds, values))
+            return
+        if self._partition_dir is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._partition_dir = tempfile.mkdtemp(prefix="window-", dir=self.spill_dir)
+        partition = ids % self.num_partitions
+        order = np.argsort(partition, kind="stable")
+        bounds = np.searchsorted(partition[order], np.arange(self.num_partitions + 1))
+        for p in range(self.num_partitions):
+            rows = order[bounds[p]:bounds[p + 1]]
+            if len(rows) == 0:
+                continue
+            for name, array in (("ids", ids), ("seconds", seconds), ("values", values)):
+                with open(self._spill_path(p, name), "ab") as f:
+                    array[rows].tofile(f)
+
+    def add_file(self, actions_file: str, chunksize: int = 1_000_000):
+        """
+        Add every row of an actions CSV file, read in chunks of chunksize rows.
+        """
+        for chunk in pd.read_csv(actions_file, chunksize=chunksize):
+            self.add(chunk)
+
+    def _spill_path(self, partition: int, name: str) -> str:
+        return os.path.join(self._partition_dir, f"part-{partition:04d}-{name}.bin")
+
+    def _partitions(self) -> Iterable[SortedActions]:
+        if self.spill_dir is None:
+            if self._chunks:
+                ids, seconds, values = (np.concatenate(arrays) for arrays in zip(*self._chunks))
+                yield SortedActions(ids, seconds, values)
+            return
+        for p in range(self.num_partitions):
+            if self._partition_dir is None or not os.path.exists(self._spill_path(p, "ids")):
+                continue
+            ids = np.fromfile(self._spill_path(p, "ids"), dtype=np.int64)
+            seconds = np.fromfile(self._spill_path(p, "seconds"), dtype=np.int64)
+            values = np.fromfile(self._spill_path(p, "values"), dtype=np.float32).reshape(len(ids), -1)
+            yield SortedActions(ids, seconds, values)
+
+    def cutoffs(self, customers: pd.DataFrame, noncustomers: pd.DataFrame) -> pd.Series:
+        """
+        Cutoff time of every company, in seconds: CLOSEDATE for customers (missing
+        CLOSEDATEs exclude all of a customer's actions, as in DataLoader.join_actions),
+        as_of for noncustomers. Customers win for ids in both tables.
+        """
+        if self.as_of is not None:
+            as_of = int(pd.Timestamp(self.as_of).value // 10 ** 9)
+        else:
+            as_of = self.max_seconds + 1 if self.max_seconds is not None else 0
+        closedates = pd.to_datetime(customers["CLOSEDATE"], errors="coerce")
+        customer_cutoffs = np.where(closedates.isna(), EXCLUDED,
+                                    closedates.to_numpy(dtype="datetime64[s]").astype(np.int64))
+        cutoffs = pd.concat([pd.Series(customer_cutoffs, index=customers["id"].to_numpy()),
+                             pd.Series(as_of, index=noncustomers["id"].to_numpy(), dtype=np.int64)])
+        return cutoffs[~cutoffs.index.duplicated(keep="first")]
+
+    def compute(self, customers: pd.DataFrame, noncustomers: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute the features of every company with actions before its cutoff, then
+        remove the spilled partitions.
+
+        Returns:
+            pandas.DataFrame: 'id' and the feature_names columns (float32).
+        """
+        if self.columns is None:
+            raise RuntimeError("WindowFeatureBuilder.add() must be called before compute().")
+        cutoffs = self.cutoffs(customers, noncustomers)
+        try:
+            parts = [self._partition_features(actions, cutoffs) for actions in self._partitions()]
+        finally:
+            self.clear()
+        ids = np.concatenate([part[0] for part in parts]) if parts else np.empty(0, dtype=np.int64)
+        features = np.concatenate([part[1] for part in parts]) if parts \
+            else np.empty((0, len(self.feature_names)), dtype=np.float32)
+        frame = pd.DataFrame(features, columns=self.feature_names)
+        frame.insert(0, "id", ids)
+        logger.info(f"Computed {len(self.feature_names)} window features for {len(frame)} ids "
+                    f"from {self.num_rows} action records.")
+        return frame.sort_values("id", ignore_index=True)
+
+    def _partition_features(self, actions: SortedActions, cutoffs: pd.Series):
+        """
+        Features of the ids of one partition that have actions before their cutoff.
+        """
+        # Actions of ids that are not companies never count
+        cutoff = cutoffs.reindex(actions.unique_ids, fill_value=EXCLUDED).to_numpy(dtype=np.int64)
+        end = actions.position(cutoff)
+        keep = end > actions.starts
+        starts = actions.starts
+
+        columns = []
+        cumulative = np.zeros((len(actions) + 1, len(self.columns)))
+        np.cumsum(actions.values, axis=0, dtype=np.float64, out=cumulative[1:])
+        window_starts = [actions.position(cutoff - days * SECONDS_PER_DAY) for days in self.windows_days]
+        columns.extend(end - start for start in window_starts)
+        for start in window_starts:
+            columns.extend((cumulative[end] - cumulative[start]).T)
+
+        # Rows at or after the cutoff get weight 0
+        valid = np.arange(len(actions)) < np.repeat(end, actions.ends - starts)
+        age_days = (np.repeat(cutoff, actions.ends - starts) - actions.seconds) / SECONDS_PER_DAY
+        for half_life in self.half_lives_days:
+            weights = np.where(valid, np.exp2(-np.maximum(age_days, 0) / half_life), 0.0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                decayed = np.add.reduceat(actions.values * weights[:, None], starts, axis=0) \
+                    / np.add.reduceat(weights, starts)[:, None]
+            columns.extend(decayed.T)
+
+        last = actions.seconds[np.maximum(end - 1, 0)]
+        columns.append((cutoff - actions.seconds[starts]) / SECONDS_PER_DAY)
+        columns.append((cutoff - last) / SECONDS_PER_DAY)
+        features = np.column_stack(columns).astype(np.float32)
+        return actions.unique_ids[keep], features[keep]
+
+    def clear(self):
+        """
+        Drop the added rows and remove the spilled partitions.
+        """
+        self._chunks = []
+        if self._partition_dir is not None:
+            shutil.rmtree(self._partition_dir, ignore_errors=True)
+            self._partition_dir = None
@@ -0,0 +1,117 @@
+"""
+Lightweight inference runtime for the dense Keras models of this framework.
+
+export_keras() turns a trained Keras model into a single .npz artifact: float32 weights
+plus a JSON layer spec. NumpyMLP runs that artifact with NumPy only, so the serving
+image and process do not need to import TensorFlow.
+"""
+import json
+from typing import Callable, Dict, List
+import numpy as np
+
+SPEC_VERSION = 1
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0, out=x)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    # exp(-logaddexp(0, -x)) is 1 / (1 + exp(-x)) without overflow for large |x|
+    np.logaddexp(0, -x, out=x)
+    np.negative(x, out=x)
+    return np.exp(x, out=x)
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    x -= x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+
+ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "linear": lambda x: x,
+    "relu": _relu,
+    "sigmoid": _sigmoid,
+    "tanh": lambda x: np.tanh(x, out=x),
+    "softmax": _softmax,
+}
+
+
+def export_keras(model, path: str) -> List[dict]:
+    """
+    Export a Keras model made of Dense layers (plus InputLayer/Dropout, which are no-ops
+    at inference) to a NumpyMLP artifact.
+
+    Args:
+        model (tf.keras.Model): Trained Keras model.
+        path (str): Output .npz file.
+
+    Returns:
+        List[dict]: The layer spec that was written.
+
+    Raises:
+        ValueError: If the model contains a layer or activation the runtime cannot run.
+    """
+    spec, arrays = [], {}
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind in ("InputLayer", "Dropout"):
+            continue
+        if kind != "Dense":
+            raise ValueError(f"Layer {layer.name} ({kind}) is not supported by the NumPy runtime.")
+        activation = layer.get_config()["activation"]
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Activation '{activation}' of layer {layer.name} is not supported by the NumPy runtime.")
+        weights = layer.get_weights()
+        index = len(spec)
+        arrays[f"kernel_{index}"] = weights[0].astype(np.float32)
+        if layer.use_bias:
+            arrays[f"bias_{index}"] = weights[1].astype(np.float32)
+        spec.append({"type": "dense", "units": int(weights[0].shape[1]), "activation": activation,
+                     "use_bias": bool(layer.use_bias)})
+
+    with open(path, "wb") as f:
+        np.savez(f, spec=np.array(json.dumps({"version": SPEC_VERSION, "layers": spec})), **arrays)
+    return spec
+
+
+class NumpyMLP:
+    """
+    Runs an artifact written by export_keras(). Exposes the same convert()/forward()
+    stages as models.tensorflow_model.ServingFunction.
+    """
+
+    def __init__(self, path: str):
+        """
+        Load the artifact.
+
+        Args:
+            path (str): .npz file written by export_keras().
+        """
+        with np.load(path) as artifact:
+            spec = json.loads(str(artifact["spec"]))
+            if spec["version"] != SPEC_VERSION:
+                raise ValueError(f"Unsupported NumPy runtime artifact version {spec['version']}.")
+            self.layers = []
+            for index, layer in enumerate(spec["layers"]):
+                kernel = np.ascontiguousarray(artifact[f"kernel_{index}"])
+                bias = artifact[f"bias_{index}"] if layer["use_bias"] else None
+                self.layers.append((kernel, bias, ACTIVATIONS[layer["activation"]]))
+        self.num_features = self.layers[0][0].shape[0]
+
+    def convert(self, features) -> np.ndarray:
+        return np.ascontiguousarray(features, dtype=np.float32)
+
+    def forward(self, inputs: np.ndarray) -> np.ndarray:
+        x = inputs
+        for kernel, bias, activation in self.layers:
+            x = x @ kernel
+            if bias is not None:
+                x += bias
+            x = activation(x)
+        return x
+
+    def __call__(self, features) -> np.ndarray:
+        return self.forward(self.convert(features))
@@ -1,9 +1,16 @@
-from models.tensorflow_model import TensorFlowModel
 #from models.huggingface_model import HuggingFaceModel
 from models.sklearn_logistic_model import LogisticRegressionModel
 
+def _tensorflow_model(**kwargs):
+    """
+    Import TensorFlow only when a TensorFlow model is requested, so processes that
+    only use other models (e.g. serving logistic regression) do not load it.
+    """
+    from models.tensorflow_model import TensorFlowModel
+    return TensorFlowModel(**kwargs)
+
 MODEL_REGISTRY = {
-    "tensorflow": TensorFlowModel,
+    "tensorflow": _tensorflow_model,
    # "huggingface": HuggingFaceModel,
     "logistic_regression": LogisticRegressionModel,
 }
@@ -14,4 +21,16 @@ def get_model(model_name, **kwargs):
     """
     if model_name not in MODEL_REGISTRY:
         raise ValueError(f"Model {model_name} not found in registry.")
-    return MODEL_REGISTRY[model_name](**kwargs)
\ No newline at end of file
+    return MODEL_REGISTRY[model_name](**kwargs)
+
+def load_model(model_name, filepath, **kwargs):
+    """
+    Create a model from the registry and load its trained weights.
+
+    Args:
+        model_name (str): Name of the model in the registry.
+        filepath (str): Artifact path without extension, as passed to save().
+    """
+    model = get_model(model_name, **kwargs)
+    model.load(filepath)
+    return model
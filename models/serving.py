@@ -0,0 +1,256 @@
+"""
+One inference interface for every servable model.
+
+A serving function maps a float32 (rows, features) batch of merged features to class
+probabilities. It is split into two stages, convert() (preprocessing into the model's
+input) and forward() (the model itself), so the serving path can time them separately.
+load_serving_model() builds one from a registry model and its saved preprocessor.
+"""
+import os
+import json
+import time
+import shutil
+from typing import Optional
+import numpy as np
+import logging
+from data.cache import file_digest
+from models.numpy_runtime import ACTIVATIONS
+from preprocess.numeric_preprocessor import NumericPreprocessor
+logger = logging.getLogger(__name__)
+
+RUNTIMES = ("keras", "numpy")
+MANIFEST_FILE = "manifest.json"
+
+
+class LinearServingFunction:
+    """
+    Logistic regression as a single float32 matrix product plus sigmoid (binary and
+    one-vs-rest) or softmax (multinomial). Feature scaling is folded into the weights.
+    """
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, multinomial: bool = False,
+                 fill_value: Optional[float] = None):
+        """
+        Initialize the function.
+
+        Args:
+            coef (numpy.ndarray): (classes or 1, features) coefficients.
+            intercept (numpy.ndarray): (classes or 1,) intercepts.
+            multinomial (bool): Softmax over classes instead of per-class sigmoids.
+            fill_value (float, optional): Value that replaces missing features.
+        """
+        self.weights = np.ascontiguousarray(np.asarray(coef, dtype=np.float32).T)
+        self.bias = np.asarray(intercept, dtype=np.float32)
+        self.multinomial = multinomial
+        self.fill_value = fill_value
+
+    @classmethod
+    def from_estimator(cls, estimator) -> "LinearServingFunction":
+        """
+        Build the function from a fitted sklearn LogisticRegression.
+        """
+        multi_class = getattr(estimator, "multi_class", "auto")
+        multinomial = len(estimator.classes_) > 2 and (
+            multi_class == "multinomial" or (multi_class == "auto" and estimator.solver != "liblinear"))
+        return cls(estimator.coef_, estimator.intercept_, multinomial)
+
+    def with_standardization(self, mean: np.ndarray, scale: np.ndarray, fill_value: float) -> "LinearServingFunction":
+        """
+        Fold (x - mean) / scale into the weights, so scaled inputs cost nothing at serving time.
+        """
+        weights = self.weights.astype(np.float64) / scale[:, None]
+        bias = self.bias - mean @ weights
+        return LinearServingFunction(weights.T, bias, self.multinomial, fill_value)
+
+    def convert(self, features) -> np.ndarray:
+        inputs = np.asarray(features, dtype=np.float32)
+        if self.fill_value is not None:
+            missing = np.isnan(inputs)
+            if missing.any():
+                inputs = np.where(missing, np.float32(self.fill_value), inputs)
+        return inputs
+
+    def forward(self, inputs: np.ndarray) -> np.ndarray:
+        scores = inputs @ self.weights
+        scores += self.bias
+        if self.multinomial:
+            return ACTIVATIONS["softmax"](scores)
+        if scores.shape[1] == 1:
+            probabilities = np.empty((len(scores), 2), dtype=np.float32)
+            probabilities[:, 1:] = ACTIVATIONS["sigmoid"](scores)
+            np.subtract(1, probabilities[:, 1], out=probabilities[:, 0])
+            return probabilities
+        # One-vs-rest, normalized as sklearn does
+        probabilities = ACTIVATIONS["sigmoid"](scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities
+
+    def __call__(self, features) -> np.ndarray:
+        return self.forward(self.convert(features))
+
+
+class StandardizedServingFunction:
+    """
+    Applies the fitted preprocessor (NaN fill and standard scaling, in one float32 pass)
+    in convert(), then hands the scaled batch to a model's serving function.
+    """
+
+    def __init__(self, function, preprocessor):
+        self.function = function
+        self.preprocessor = preprocessor
+
+    def convert(self, features):
+        # Copy: the batch may be a view of the feature store
+        return self.function.convert(self.preprocessor.transform(features, copy=True))
+
+    def forward(self, inputs):
+        return self.function.forward(inputs)
+
+    def __call__(self, features) -> np.ndarray:
+        return self.forward(self.convert(features))
+
+
+def preprocessor_path_for(model_path: str) -> str:
+    """
+    Where scripts/model_train.py saves the fitted preprocessor of a model artifact.
+    """
+    return os.path.splitext(model_path)[0] + "_preprocessor.json"
+
+
+def categories_path_for(model_path: str) -> str:
+    """
+    Where scripts/model_train.py saves the category vocabulary of a model artifact.
+    """
+    return os.path.splitext(model_path)[0] + "_categories.json"
+
+
+def load_preprocessor(path: str) -> NumericPreprocessor:
+    """
+    Load a fitted preprocessor saved by scripts/model_train.py.
+    """
+    return NumericPreprocessor.load(path)
+
+
+def model_input_width(model_path: str) -> Optional[int]:
+    """
+    Number of input features of a saved model, read from the artifact without
+    building the model: the input layer of a Keras .h5 file, the first kernel of a
+    NumPy runtime .npz file, or the fitted width of a pickled sklearn estimator.
+
+    Returns:
+        int or None: The width, or None if the artifact does not record it.
+    """
+    extension = os.path.splitext(model_path)[1]
+    try:
+        if extension == ".h5":
+            import h5py
+            with h5py.File(model_path, "r") as f:
+                config = json.loads(f.attrs["model_config"])
+            layers = config["config"]["layers"]
+            shape = layers[0]["config"].get("batch_input_shape") if layers else None
+            return int(shape[-1]) if shape and shape[-1] is not None else None
+        if extension == ".npz":
+            with np.load(model_path) as artifact:
+                return int(artifact["kernel_0"].shape[0])
+        if extension == ".pkl":
+            import pickle
+            with open(model_path, "rb") as f:
+                estimator = pickle.load(f)
+            # Estimators pickled by older sklearn versions only have coef_
+            width = getattr(estimator, "n_features_in_", None)
+            if width is None and hasattr(estimator, "coef_"):
+                width = estimator.coef_.shape[1]
+            return int(width) if width is not None else None
+    except (ImportError, KeyError, IndexError, TypeError, ValueError) as e:
+        logger.warning(f"Could not read the input width of {model_path}: {e!r}")
+    return None
+
+
+def read_manifest(path: str) -> dict:
+    """
+    Read a model manifest written by publish_version().
+
+    Returns:
+        dict: 'version', and 'model_path', 'preprocessor_path' and 'categories_path'
+            (None if there is none), resolved against the manifest's directory.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    preprocessor_path = manifest.get("preprocessor_path")
+    categories_path = manifest.get("categories_path")
+    return {
+        "version": str(manifest["version"]),
+        "model_path": os.path.join(base_dir, manifest["model_path"]),
+        "preprocessor_path": os.path.join(base_dir, preprocessor_path) if preprocessor_path else None,
+        "categories_path": os.path.join(base_dir, categories_path) if categories_path else None,
+    }
+
+
+def publish_version(publish_dir: str, model_path: str, preprocessor_path: Optional[str] = None,
+                    keep_versions: int = 5, categories_path: Optional[str] = None) -> str:
+    """
+    Copy a model artifact (and its preprocessor and category vocabulary) into a new version directory of
+    publish_dir, then point publish_dir/manifest.json at it. The manifest is replaced
+    atomically after the copies are complete, so a server watching it never sees a
+    partial version. Only the newest keep_versions version directories are kept.
+
+    Returns:
+        str: The new version, '<UTC time>-<model digest>'.
+    """
+    version = time.strftime("%Y%m%d-%H%M%S", time.gmtime()) + "-" + file_digest(model_path)[:8]
+    version_dir = os.path.join(publish_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    manifest = {"version": version, "model_path": os.path.join(version, os.path.basename(model_path))}
+    shutil.copy2(model_path, os.path.join(publish_dir, manifest["model_path"]))
+    if preprocessor_path is not None:
+        manifest["preprocessor_path"] = os.path.join(version, os.path.basename(preprocessor_path))
+        shutil.copy2(preprocessor_path, os.path.join(publish_dir, manifest["preprocessor_path"]))
+    if categories_path is not None:
+        manifest["categories_path"] = os.path.join(version, os.path.basename(categories_path))
+        shutil.copy2(categories_path, os.path.join(publish_dir, manifest["categories_path"]))
+
+    manifest_path = os.path.join(publish_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    logger.info(f"Published model version {version} to {publish_dir}")
+
+    versions = sorted(name for name in os.listdir(publish_dir) if os.path.isdir(os.path.join(publish_dir, name)))
+    for name in versions[:-keep_versions]:
+        if name != version:
+            shutil.rmtree(os.path.join(publish_dir, name), ignore_errors=True)
+    return version
+
+
+def load_serving_model(model_name: str, model_path: str, runtime: str = "keras",
+                       preprocessor_path: Optional[str] = None):
+    """
+    Load a trained model through the registry, with its preprocessor, as a serving function.
+
+    Args:
+        model_name (str): Model name in the registry, e.g. 'tensorflow' or 'logistic_regression'.
+        model_path (str): Model artifact, with extension (.h5, .pkl, or .npz for the numpy runtime).
+        runtime (str): For TensorFlow models, 'keras' or 'numpy' (an artifact exported
+            with scripts/export_model.py, run without importing TensorFlow).
+        preprocessor_path (str, optional): Fitted preprocessor applied before the model.
+
+    Returns:
+        Callable: Serving function with convert() and forward() stages, mapping a float32
+            (rows, features) batch to class probabilities.
+    """
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Unknown runtime '{runtime}', expected one of {RUNTIMES}.")
+    if model_name == "tensorflow" and runtime == "numpy":
+        from models.numpy_runtime import NumpyMLP
+        function = NumpyMLP(model_path)
+    else:
+        from models.registry import load_model
+        function = load_model(model_name, os.path.splitext(model_path)[0]).serving_function()
+
+    if preprocessor_path is None:
+        return function
+    preprocessor = load_preprocessor(preprocessor_path)
+    if isinstance(function, LinearServingFunction):
+        return function.with_standardization(preprocessor.mean_, preprocessor.scale_, preprocessor.fill_value)
+    return StandardizedServingFunction(function, preprocessor)
@@ -1,3 +1,4 @@
+import os
 import pickle
 from sklearn.linear_model import LogisticRegression
 from models.base_model import BaseModel
@@ -28,12 +29,28 @@ class LogisticRegressionModel(BaseModel):
         """
         return self.model.predict(X)
 
+    def predict_proba(self, X, **kwargs):
+        """
+        Class probabilities for new data.
+        """
+        return self.model.predict_proba(X)
+
+    def serving_function(self):
+        """
+        Vectorized float32 scoring function for serving (see models.serving), which
+        skips the per-call input validation of predict_proba().
+        """
+        from models.serving import LinearServingFunction
+        return LinearServingFunction.from_estimator(self.model)
+
     def save(self, filepath):
         """
-        Save the model to a file using pickle.
+        Save the model to a file using pickle, written to a temporary file and renamed
+        into place.
         """
-        with open(f"{filepath}.pkl", "wb") as f:
+        with open(f"{filepath}.pkl.tmp", "wb") as f:
             pickle.dump(self.model, f)
+        os.replace(f"{filepath}.pkl.tmp", f"{filepath}.pkl")
 
     def load(self, filepath):
         """
@@ -1,14 +1,251 @@
+import os
+import shutil
+import numpy as np
 import tensorflow as tf
-from typing import Tuple
+from typing import Optional, Tuple, Union
+from models.base_model import BaseModel
 
-class TensorFlowModel:
-    def __init__(self, input_shape: Tuple[int], num_classes: int):
-        self.model = self._build_model(input_shape, num_classes)
+# Rows read from a memory-mapped matrix per step when streaming from disk
+STREAM_BLOCK_ROWS = 65536
+# Batch size for validation and evaluate(), which need no gradients
+EVAL_BATCH_SIZE = 8192
+
+
+def make_dataset(X, y=None, batch_size: int = 32, shuffle: bool = False, seed: Optional[int] = None,
+                 shard: Optional[Tuple[int, int]] = None, block_rows: int = STREAM_BLOCK_ROWS,
+                 generator: Optional[tf.random.Generator] = None) -> tf.data.Dataset:
+    """
+    Build a batched, prefetched tf.data pipeline over a feature matrix.
+
+    In-memory arrays (and DataFrames) are converted to tensors once. Every epoch, a
+    fresh permutation of the row indices is drawn in a single op and the batches are
+    gathered from it, so shuffling costs no per-row work in the pipeline.
+
+    Memory-mapped arrays (np.load(..., mmap_mode='r'), e.g. the matrices written by
+    scripts/model_train.py with data.stream_dir) are streamed instead: contiguous
+    blocks of block_rows rows are read in parallel, in a random block order with the
+    rows shuffled within each block, and split into batches. Only a few blocks are
+    held in memory at a time.
+
+    All shuffling draws from one tf.random.Generator, whose state lives in a variable:
+    every iteration (epoch) is shuffled anew, also when a global seed is set, and a
+    checkpoint of the generator resumes the same sequence of shuffles.
+
+    Args:
+        X (numpy.ndarray or pandas.DataFrame): (rows, features) feature matrix.
+        y (numpy.ndarray, optional): Labels. Without labels, the dataset yields features only.
+        batch_size (int): Rows per batch.
+        shuffle (bool): Reshuffle the rows every epoch.
+        seed (int, optional): Shuffle seed, if no generator is given.
+        shard (Tuple[int, int], optional): (num_shards, index): keep only the index-th of
+            num_shards equal, contiguous row ranges, for multi-worker training. The last
+            rows % num_shards rows are left out, so every worker runs the same number of steps.
+        block_rows (int): Rows read per step when streaming a memory-mapped array.
+        generator (tf.random.Generator, optional): Source of the shuffles.
+
+    Returns:
+        tf.data.Dataset: Batches of float32 features, with int64 labels if y is given.
+    """
+    num_shards, index = shard or (1, 0)
+    shard_rows = len(X) // num_shards
+    rows = (index * shard_rows, (index + 1) * shard_rows)
+    if shuffle and generator is None:
+        generator = tf.random.Generator.from_seed(seed) if seed is not None \
+            else tf.random.Generator.from_non_deterministic_state()
+    if not shuffle:
+        generator = None
+    if isinstance(X, np.memmap):
+        dataset = _stream_blocks(X, y, rows, batch_size, generator, block_rows)
+    else:
+        dataset = _in_memory(np.asarray(X, dtype=np.float32), y, rows, batch_size, generator)
+    if shard is None:
+        # The batch count is known; Keras needs it to resume training in the middle of an epoch
+        dataset = dataset.apply(tf.data.experimental.assert_cardinality(-(-shard_rows // batch_size)))
+    else:
+        # tf.distribute splits every batch of a shard into per-replica batches, which the
+        # worker runs as separate steps. Keras would take an asserted batch count as
+        # steps_per_epoch and stop every epoch after 1/num_shards of the rows, so the count
+        # is left unknown: a restored mid-epoch backup then replays that epoch from its start.
+        # Already sharded by row; keep tf.distribute from sharding again
+        options = tf.data.Options()
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+        dataset = dataset.with_options(options)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def _epoch_order(num: int, first: int, generator: Optional[tf.random.Generator]) -> tf.data.Dataset:
+    # A single element, range(first, first + num), permuted on every iteration when shuffling
+    order = tf.data.Dataset.from_tensors(tf.range(first, first + num, dtype=tf.int64))
+    if generator is None:
+        return order
+    return order.map(lambda order: tf.random.experimental.stateless_shuffle(
+        order, seed=generator.make_seeds(1)[:, 0]))
+
+
+def _in_memory(X: np.ndarray, y, rows: Tuple[int, int], batch_size: int,
+               generator: Optional[tf.random.Generator]) -> tf.data.Dataset:
+    features = tf.convert_to_tensor(X)
+    labels = tf.convert_to_tensor(np.asarray(y, dtype=np.int64)) if y is not None else None
+    num_rows = rows[1] - rows[0]
+    num_full = num_rows // batch_size * batch_size
+
+    def epoch_batches(order):
+        # One reshape into (batches, batch_size) index rows, plus the remainder
+        batches = tf.data.Dataset.from_tensor_slices(tf.reshape(order[:num_full], (-1, batch_size)))
+        if num_full < num_rows:
+            batches = batches.concatenate(tf.data.Dataset.from_tensors(order[num_full:]))
+        return batches
+
+    dataset = _epoch_order(num_rows, rows[0], generator).flat_map(epoch_batches)
+    if labels is None:
+        return dataset.map(lambda idx: tf.gather(features, idx), num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.map(lambda idx: (tf.gather(features, idx), tf.gather(labels, idx)),
+                       num_parallel_calls=tf.data.AUTOTUNE)
+
+
+def _stream_blocks(X: np.memmap, y, rows: Tuple[int, int], batch_size: int,
+                   generator: Optional[tf.random.Generator], block_rows: int) -> tf.data.Dataset:
+    labels = np.asarray(y, dtype=np.int64) if y is not None else None
+    # Whole batches per block, so only the last block yields a partial batch
+    block_rows = max(batch_size, block_rows // batch_size * batch_size)
+    first_row, end_row = rows
+    num_blocks = -(-(end_row - first_row) // block_rows)
+
+    def read_block(block, seed):
+        start = first_row + block * block_rows
+        stop = min(start + block_rows, end_row)
+        order = slice(start, stop)
+        if generator is not None:
+            order = start + np.random.default_rng(int(seed) % (1 << 63)).permutation(stop - start)
+        x = np.asarray(X[order], dtype=np.float32)
+        return (x, labels[order]) if labels is not None else x
+
+    output_types = (tf.float32, tf.int64) if labels is not None else tf.float32
+
+    def load(block, seed):
+        outputs = tf.numpy_function(read_block, [block, seed], output_types, stateful=False)
+        if labels is None:
+            return tf.ensure_shape(outputs, (None, X.shape[1]))
+        return tf.ensure_shape(outputs[0], (None, X.shape[1])), tf.ensure_shape(outputs[1], (None,))
+
+    def with_seeds(blocks):
+        # A seed per block for shuffling its rows, drawn with the block order
+        if generator is None:
+            seeds = tf.zeros_like(blocks)
+        else:
+            seeds = tf.random.stateless_uniform(tf.shape(blocks), seed=generator.make_seeds(1)[:, 0],
+                                                minval=None, maxval=None, dtype=tf.int64)
+        return tf.data.Dataset.from_tensor_slices((blocks, seeds))
+
+    dataset = _epoch_order(num_blocks, 0, generator).flat_map(with_seeds)
+    dataset = dataset.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=generator is None)
+    return dataset.rebatch(batch_size)
+
+
+STRATEGIES = ("default", "mirrored", "multi_worker")
+
+
+def make_strategy(name: Optional[str] = None) -> tf.distribute.Strategy:
+    """
+    Create a tf.distribute strategy.
+
+    Args:
+        name (str, optional): 'default' (or None) for the current process and device,
+            'mirrored' for all local devices, or 'multi_worker' for synchronous training
+            across the workers listed in the TF_CONFIG environment variable. The
+            multi-worker strategy must be created before TensorFlow runs any other op.
+
+    Returns:
+        tf.distribute.Strategy: The strategy.
+    """
+    if name in (None, "default"):
+        return tf.distribute.get_strategy()
+    if name == "mirrored":
+        return tf.distribute.MirroredStrategy()
+    if name == "multi_worker":
+        # Ring all-reduce: the collective implementation for CPU workers
+        return tf.distribute.MultiWorkerMirroredStrategy(
+            communication_options=tf.distribute.experimental.CommunicationOptions(
+                implementation=tf.distribute.experimental.CommunicationImplementation.RING))
+    raise ValueError(f"Unknown distribution strategy '{name}', expected one of {STRATEGIES}.")
+
+
+class TensorFlowModel(BaseModel):
+    def __init__(self, input_shape: Optional[Tuple[int]] = None, num_classes: int = 2,
+                 hidden_units: int = 128, epochs: int = 10, batch_size: int = 32,
+                 early_stopping_patience: Optional[int] = None, seed: Optional[int] = None,
+                 strategy: Optional[str] = None, checkpoint_dir: Optional[str] = None,
+                 checkpoint_every: Union[str, int] = "epoch"):
+        """
+        Initialize the model. Without an input_shape, the network is built on the first
+        call to train() from the shape of the training data, or replaced by load().
+
+        Args:
+            input_shape (Tuple[int], optional): Shape of one input row.
+            num_classes (int): Number of output classes.
+            hidden_units (int): Units of the hidden layer.
+            epochs (int): Default number of training epochs.
+            batch_size (int): Default training batch size.
+            early_stopping_patience (int, optional): Stop training after this many epochs
+                without improvement of the validation loss, and restore the best weights.
+            seed (int, optional): Seed for shuffling the training data.
+            strategy (str, optional): tf.distribute strategy to train with; see make_strategy().
+                With 'multi_worker', every worker trains on its own shard of the rows.
+            checkpoint_dir (str, optional): Directory for training checkpoints (weights,
+                optimizer state, epoch and step, shuffle state). train() resumes from the
+                latest one, e.g. after the pod was preempted.
+            checkpoint_every (str or int): 'epoch', or a number of training steps.
+        """
+        self.num_classes = num_classes
+        self.hidden_units = hidden_units
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.early_stopping_patience = early_stopping_patience
+        self.seed = seed
+        self.strategy = make_strategy(strategy)
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.model = None
+        if input_shape is not None:
+            with self.strategy.scope():
+                self.model = self._build_model(input_shape, num_classes)
+        self._predict_fn = None
+
+    @property
+    def num_workers(self) -> int:
+        """
+        Number of worker processes training together.
+        """
+        resolver = getattr(self.strategy, "cluster_resolver", None)
+        if resolver is None:
+            return 1
+        cluster = resolver.cluster_spec().as_dict()
+        return max(1, len(cluster.get("chief", [])) + len(cluster.get("worker", [])))
+
+    @property
+    def worker_index(self) -> int:
+        """
+        Index of this worker among num_workers; the chief, if any, is 0.
+        """
+        resolver = getattr(self.strategy, "cluster_resolver", None)
+        if resolver is None or resolver.task_type in (None, "chief"):
+            return 0
+        return resolver.task_id + len(resolver.cluster_spec().as_dict().get("chief", []))
+
+    @property
+    def is_chief(self) -> bool:
+        """
+        Whether this worker writes the artifacts of a multi-worker run.
+        """
+        return self.worker_index == 0
+
+    def _shard(self) -> Optional[Tuple[int, int]]:
+        return (self.num_workers, self.worker_index) if self.num_workers > 1 else None
 
     def _build_model(self, input_shape: Tuple[int], num_classes: int):
         model = tf.keras.Sequential([
             tf.keras.layers.InputLayer(input_shape=input_shape),
-            tf.keras.layers.Dense(128, activation='relu'),
+            tf.keras.layers.Dense(self.hidden_units, activation='relu'),
             tf.keras.layers.Dense(num_classes, activation='softmax')
         ])
         model.compile(
@@ -18,16 +255,140 @@ class TensorFlowModel:
         )
         return model
 
-    def train(self, X_train, y_train, X_val, y_val, epochs=10, batch_size=32):
+    def train(self, X_train, y_train, X_val, y_val, epochs=None, batch_size=None, callbacks=None):
+        """
+        Train on a tf.data pipeline built by make_dataset(). Memory-mapped feature
+        matrices are streamed from disk rather than loaded. With a multi-worker strategy,
+        every worker must call this with the same data; batch_size is the global batch.
+
+        With a checkpoint_dir, the training state is backed up every checkpoint_every
+        and a restarted run continues from the latest backup instead of from scratch.
+        The backup is kept until clear_checkpoint() is called, after the final model
+        has been saved. callbacks are extra Keras callbacks passed to fit().
+        """
+        if self.model is None:
+            with self.strategy.scope():
+                self.model = self._build_model((X_train.shape[1],), self.num_classes)
+        generator = getattr(self.model, "_shuffle_generator", None)
+        if generator is None:
+            generator = tf.random.Generator.from_seed(self.seed) if self.seed is not None \
+                else tf.random.Generator.from_non_deterministic_state()
+            # Tracked by the Keras model, so its checkpoints include the shuffle state
+            self.model._shuffle_generator = generator
+        train_data = make_dataset(X_train, y_train, batch_size or self.batch_size, shuffle=True,
+                                  shard=self._shard(), generator=generator)
+        val_data = make_dataset(X_val, y_val, EVAL_BATCH_SIZE, shard=self._shard())
+        callbacks = list(callbacks or [])
+        if self.checkpoint_dir is not None:
+            callbacks.append(tf.keras.callbacks.BackupAndRestore(
+                self._backup_dir(), save_freq=self.checkpoint_every, delete_checkpoint=False))
+        if self.early_stopping_patience is not None:
+            callbacks.append(tf.keras.callbacks.EarlyStopping(
+                monitor="val_loss", patience=self.early_stopping_patience, restore_best_weights=True))
         self.model.fit(
-            X_train, y_train,
-            validation_data=(X_val, y_val),
-            epochs=epochs,
-            batch_size=batch_size
+            train_data,
+            validation_data=val_data,
+            epochs=epochs or self.epochs,
+            callbacks=callbacks
         )
+        self._predict_fn = None
+
+    def _backup_dir(self) -> str:
+        return os.path.join(self.checkpoint_dir, "backup")
+
+    def clear_checkpoint(self):
+        """
+        Delete the training checkpoint once the trained model is saved, so the next
+        run starts from scratch instead of resuming a finished one.
+        """
+        if self.checkpoint_dir is not None:
+            shutil.rmtree(self._backup_dir(), ignore_errors=True)
+
+    def evaluate(self, X, y, **kwargs):
+        """
+        Evaluate the model on validation/test data.
+        """
+        loss, accuracy = self.model.evaluate(make_dataset(X, y, EVAL_BATCH_SIZE, shard=self._shard()), verbose=0)
+        return {"loss": loss, "accuracy": accuracy}
+
+    def predict_proba(self, X, batch_size: int = 65536) -> np.ndarray:
+        """
+        Class probabilities, computed with the compiled serving function in batches of
+        batch_size rows.
+        """
+        if self._predict_fn is None:
+            self._predict_fn = make_predict_fn(self.model)
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) <= batch_size:
+            return self._predict_fn(X)
+        return np.concatenate([self._predict_fn(X[start:start + batch_size])
+                               for start in range(0, len(X), batch_size)])
+
+    def predict(self, X, **kwargs):
+        """
+        Make predictions on new data.
+        """
+        return np.argmax(self.predict_proba(X, **kwargs), axis=1)
+
+    def serving_function(self) -> "ServingFunction":
+        """
+        Compiled forward pass for serving.
+        """
+        return make_predict_fn(self.model)
 
     def save(self, filepath: str):
         """
-        Save the model to the specified filepath in H5 format.
+        Save the model to the specified filepath in H5 format. The file is written
+        next to the target and renamed into place, so it is never seen half written.
+        """
+        self.model.save(f"{filepath}.h5.tmp", save_format="h5")
+        os.replace(f"{filepath}.h5.tmp", f"{filepath}.h5")
+
+    def load(self, filepath: str):
         """
-        self.model.save(f"{filepath}.h5")
+        Load the model from an H5 file saved by save().
+        """
+        with self.strategy.scope():
+            self.model = tf.keras.models.load_model(f"{filepath}.h5")
+        self._predict_fn = None
+
+
+class ServingFunction:
+    """
+    Compiled forward pass of a Keras model for serving, split into its two stages so
+    callers can time them separately: converting the numpy batch to a tensor, and
+    running the model.
+    """
+
+    def __init__(self, model: tf.keras.Model):
+        num_features = model.inputs[0].shape[-1]
+
+        # Traced once for any batch size; calling the model directly avoids the
+        # per-call setup cost of model.predict()
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, num_features), dtype=tf.float32)])
+        def forward(x):
+            return model(x, training=False)
+
+        self._forward = forward
+
+    def convert(self, features) -> tf.Tensor:
+        return tf.convert_to_tensor(features, dtype=tf.float32)
+
+    def forward(self, inputs: tf.Tensor):
+        return self._forward(inputs).numpy()
+
+    def __call__(self, features):
+        return self.forward(self.convert(features))
+
+
+def make_predict_fn(model: tf.keras.Model) -> ServingFunction:
+    """
+    Wrap a Keras model in a compiled forward pass for serving.
+
+    Args:
+        model (tf.keras.Model): Trained Keras model.
+
+    Returns:
+        ServingFunction: Maps a float32 numpy batch to a numpy array of model outputs.
+    """
+    return ServingFunction(model)
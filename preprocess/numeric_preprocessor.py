@@ -1,46 +1,95 @@
 # preprocess/numeric_preprocessor.py
 
+import os
+import json
 from preprocess.base_preprocessor import BasePreprocessor
-from sklearn.preprocessing import StandardScaler
 import pandas as pd
 import numpy as np
 
 class NumericPreprocessor(BasePreprocessor):
     """
     Preprocessor for models that require numerical features, such as Logistic Regression.
+
+    Missing values are filled with fill_value, then features are standardized with the
+    mean and standard deviation learned by fit(), as sklearn's StandardScaler does.
     """
 
+    # Value that replaces missing features before scaling
+    fill_value = -1
+
     def __init__(self):
         """
         Initialize the preprocessor.
         """
-        self.scaler = StandardScaler()
         self.numerical_features = None
+        self.mean_ = None
+        self.scale_ = None
 
-    def preprocess(self, data):
+    def fit(self, data):
         """
-        Scale numerical features using StandardScaler.
+        Learn the numerical features, in order, and their mean and standard deviation.
 
         Args:
             data (pandas.DataFrame): The raw input data.
 
         Returns:
-            numpy.ndarray: The preprocessed numerical data.
+            NumericPreprocessor: self
+        """
+        # Selecting on an empty slice, so the (possibly memory-mapped) columns are not copied
+        features = data.iloc[:0].select_dtypes(include=[np.number]).columns.tolist()
+        mean = np.empty(len(features))
+        scale = np.empty(len(features))
+        # Column by column, so fitting never holds a float64 copy of the whole table
+        for i, name in enumerate(features):
+            column = data[name].to_numpy(dtype=np.float64, na_value=np.nan)
+            column = np.where(np.isnan(column), self.fill_value, column)
+            mean[i] = column.mean()
+            scale[i] = column.std()
+        # Constant features are left unscaled, like StandardScaler does
+        scale[scale == 0] = 1.0
+        self._set_params(features, mean, scale)
+        return self
+
+    def transform(self, data, copy: bool = True) -> np.ndarray:
+        """
+        Fill missing values and standardize, as one vectorized float32 pass:
+        (x - mean) * inv_std.
+
+        Args:
+            data (pandas.DataFrame or numpy.ndarray): Raw features. Arrays must hold the
+                numerical features in the fitted order.
+            copy (bool): With copy=False, a C-contiguous float32 array is transformed in place.
+
+        Returns:
+            numpy.ndarray: float32 (rows, features) standardized data.
         """
-        # Infer numerical features if not already done
-        if self.numerical_features is None:
-            self.numerical_features = data.select_dtypes(include=[np.number]).columns.tolist()
-        print(self.numerical_features)
-        # Not allowing Nan
-        data = data.fillna(-1)
-        # Select numerical features
+        if self.mean_ is None:
+            raise RuntimeError("NumericPreprocessor.fit() must be called before transform().")
+        if isinstance(data, pd.DataFrame):
+            x = data[self.numerical_features].to_numpy(dtype=np.float32, na_value=np.nan)
+        elif copy or data.dtype != np.float32 or not data.flags["C_CONTIGUOUS"] or not data.flags["WRITEABLE"]:
+            x = np.array(data, dtype=np.float32, order="C")
+        else:
+            x = data
+        if x.shape[1] != len(self.numerical_features):
+            raise ValueError(f"Expected {len(self.numerical_features)} features, got {x.shape[1]}.")
 
-        numerical_data = data[self.numerical_features]
-        
-        # Fit and transform the data
-        scaled_data = self.scaler.fit_transform(numerical_data)
+        np.copyto(x, self._fill32, where=np.isnan(x))
+        x -= self._mean32
+        x *= self._inv_scale32
+        return x
 
-        return scaled_data
+    def preprocess(self, data):
+        """
+        Fit on the data and standardize it.
+
+        Args:
+            data (pandas.DataFrame): The raw input data.
+
+        Returns:
+            numpy.ndarray: The preprocessed numerical data.
+        """
+        return self.fit(data).transform(data)
 
     def get_required_features(self):
         """
@@ -49,5 +98,40 @@ class NumericPreprocessor(BasePreprocessor):
         Returns:
             List[str]: List of numerical feature names.
         """
-        # Since features are inferred during preprocessing, return them here
+        # Since features are inferred during fitting, return them here
         return self.numerical_features if self.numerical_features else []
+
+    def save(self, filepath: str):
+        """
+        Save the fitted feature order and scaling parameters as JSON, written to a
+        temporary file and renamed into place.
+        """
+        with open(filepath + ".tmp", "w") as f:
+            json.dump({
+                "features": self.numerical_features,
+                "mean": self.mean_.tolist(),
+                "scale": self.scale_.tolist(),
+                "fill_value": self.fill_value,
+            }, f)
+        os.replace(filepath + ".tmp", filepath)
+
+    @classmethod
+    def load(cls, filepath: str) -> "NumericPreprocessor":
+        """
+        Load a preprocessor saved with save().
+        """
+        with open(filepath) as f:
+            params = json.load(f)
+        preprocessor = cls()
+        preprocessor.fill_value = params["fill_value"]
+        preprocessor._set_params(params["features"], np.array(params["mean"]), np.array(params["scale"]))
+        return preprocessor
+
+    def _set_params(self, features, mean: np.ndarray, scale: np.ndarray):
+        self.numerical_features = list(features)
+        self.mean_ = mean.astype(np.float64)
+        self.scale_ = scale.astype(np.float64)
+        # float32 copies used by transform()
+        self._fill32 = np.float32(self.fill_value)
+        self._mean32 = self.mean_.astype(np.float32)
+        self._inv_scale32 = (1.0 / self.scale_).astype(np.float32)
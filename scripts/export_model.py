@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.numpy_runtime import NumpyMLP, export_keras
+
+
+def export_model(model_path: str, output_path: str, num_check_rows: int = 1024,
+                 tolerance: float = 1e-5, seed: int = 0) -> float:
+    """
+    Export a trained Keras model to the NumPy runtime and check that both produce the
+    same outputs on random inputs.
+
+    Args:
+        model_path (str): Saved Keras model (.h5).
+        output_path (str): Output .npz artifact.
+        num_check_rows (int): Random rows used for the numeric check.
+        tolerance (float): Maximum allowed absolute difference between the outputs.
+        seed (int): Seed for the random check inputs.
+
+    Returns:
+        float: Maximum absolute difference between Keras and NumPy outputs.
+
+    Raises:
+        ValueError: If the outputs differ by more than the tolerance.
+    """
+    from tensorflow.keras.models import load_model
+    model = load_model(model_path)
+    spec = export_keras(model, output_path)
+    print(f"Exported {len(spec)} layers to {output_path} ({os.path.getsize(output_path) / 1024:.1f} KiB).")
+
+    runtime = NumpyMLP(output_path)
+    inputs = np.random.default_rng(seed).normal(size=(num_check_rows, runtime.num_features)).astype(np.float32)
+    expected = model(inputs, training=False).numpy()
+    start = time.perf_counter()
+    actual = runtime(inputs)
+    elapsed = time.perf_counter() - start
+
+    # Models with NaN weights produce NaN in both runtimes; compare those positions as equal
+    if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+        raise ValueError("Keras and NumPy outputs differ in NaN positions.")
+    finite = ~np.isnan(expected)
+    max_diff = float(np.abs(expected[finite] - actual[finite]).max()) if finite.any() else 0.0
+    if finite.sum() < expected.size:
+        print(f"Warning: the model produces NaN for {expected.size - finite.sum()} of {expected.size} outputs.")
+    print(f"Max absolute difference to Keras on {num_check_rows} rows: {max_diff:.2e} "
+          f"(NumPy forward pass: {elapsed * 1000:.2f} ms).")
+    if max_diff > tolerance:
+        raise ValueError(f"NumPy runtime outputs differ from Keras by {max_diff:.2e} (> {tolerance:.0e}).")
+    return max_diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a Keras model to the NumPy serving runtime.")
+    parser.add_argument("--model-path", type=str, default="artifacts/tf_model.h5", help="Saved Keras model.")
+    parser.add_argument("--output", type=str, default="artifacts/tf_model.npz", help="Output artifact.")
+    parser.add_argument("--tolerance", type=float, default=1e-5, help="Maximum allowed output difference.")
+    args = parser.parse_args()
+
+    export_model(args.model_path, args.output, tolerance=args.tolerance)
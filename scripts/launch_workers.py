@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import socket
+import argparse
+import subprocess
+from typing import Dict, List, Optional
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+MODEL_TRAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_train.py")
+
+
+def free_ports(count: int) -> List[int]:
+    """
+    Ports on localhost that are free right now.
+    """
+    sockets = []
+    try:
+        for _ in range(count):
+            s = socket.socket()
+            s.bind(("localhost", 0))
+            sockets.append(s)
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def tf_config(workers: List[str], index: int) -> str:
+    """
+    TF_CONFIG of worker index in a cluster of workers, for MultiWorkerMirroredStrategy.
+
+    Args:
+        workers (List[str]): host:port of every worker, in index order.
+        index (int): Index of this worker; worker 0 acts as the chief.
+
+    Returns:
+        str: The JSON value of the TF_CONFIG environment variable.
+    """
+    return json.dumps({"cluster": {"worker": list(workers)}, "task": {"type": "worker", "index": index}})
+
+
+def launch(command: List[str], num_workers: int, env: Optional[Dict[str, str]] = None) -> List[int]:
+    """
+    Run command as num_workers processes on localhost, each with the TF_CONFIG of one
+    worker of a local cluster, and wait for all of them. If one fails, the others are
+    stopped, since the remaining workers would wait for it forever.
+
+    Args:
+        command (List[str]): Command of every worker, e.g. scripts/model_train.py
+            with --strategy multi_worker.
+        num_workers (int): Number of worker processes.
+        env (Dict[str, str], optional): Extra environment variables.
+
+    Returns:
+        List[int]: Exit codes of the workers, in index order.
+    """
+    workers = [f"localhost:{port}" for port in free_ports(num_workers)]
+    processes = []
+    for index in range(num_workers):
+        worker_env = dict(os.environ, **(env or {}), TF_CONFIG=tf_config(workers, index))
+        processes.append(subprocess.Popen(command, env=worker_env))
+
+    codes = [None] * num_workers
+    try:
+        while None in codes:
+            for index, process in enumerate(processes):
+                if codes[index] is not None:
+                    continue
+                try:
+                    codes[index] = process.wait(timeout=0.5)
+                except subprocess.TimeoutExpired:
+                    continue
+                if codes[index] != 0:
+                    print(f"Worker {index} exited with code {codes[index]}; stopping the others.")
+                    for other in processes:
+                        if other.poll() is None:
+                            other.terminate()
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+    return [process.wait() for process in processes]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run multi-worker training as several processes on localhost. By default every "
+                    "worker runs scripts/model_train.py with --strategy multi_worker; pass another "
+                    "worker command after '--'.")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes.")
+    parser.add_argument("--config", type=str, default="config.yaml", help="Configuration for model_train.py.")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Worker command, after '--'.")
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    command = command or [
+        sys.executable, MODEL_TRAIN, "--config", args.config, "--strategy", "multi_worker"]
+    codes = launch(command, args.workers)
+    print(f"Worker exit codes: {codes}")
+    sys.exit(0 if all(code == 0 for code in codes) else 1)
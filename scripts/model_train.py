@@ -21,45 +21,97 @@ sys.path.append(parent_dir)
 from preprocess.registry import get_preprocessor
 from models.registry import get_model
 from data.loader import DataLoader
+from data.categorical import CategoricalEncoder
+from models.serving import categories_path_for, publish_version
+
+def write_matrix(preprocessor, data, rows, path: str, chunk_rows: int = 65536) -> np.ndarray:
+    """
+    Preprocess the given rows of the data chunk by chunk into a .npy file, and return
+    it memory-mapped. Models that stream (TensorFlowModel) then read it from disk
+    instead of holding the whole matrix in memory.
+    """
+    num_features = len(preprocessor.get_required_features())
+    matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(len(rows), num_features))
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        matrix[start:start + len(chunk)] = preprocessor.transform(data.iloc[chunk])
+    matrix.flush()
+    del matrix
+    return np.load(path, mmap_mode="r")
+
+def make_loader(data_config: dict) -> DataLoader:
+    """
+    Data loader for the configured files. With data.categories_path set, the company
+    dummy columns follow that frozen vocabulary; otherwise it is fitted on the data.
+    """
+    categories_path = data_config.get("categories_path")
+    return DataLoader(
+        customers_file=data_config.get("customers_file", "data/customers.csv"),
+        noncustomers_file=data_config.get("noncustomers_file", "data/noncustomers.csv"),
+        actions_file=data_config.get("actions_file", "data/actions.csv"),
+        cache_dir=data_config.get("cache_dir"),
+        chunksize=data_config.get("chunksize"),
+        num_workers=data_config.get("num_workers", 1),
+        encoder=CategoricalEncoder.load(categories_path) if categories_path else None,
+        window_features=data_config.get("window_features"),
+    )
 
-def main(config_path):
-    # Load configuration
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
+def load_training_data(config: dict, loader: DataLoader = None):
+    """
+    Load the merged data, fit the model's preprocessor, and split the preprocessed
+    features into training and validation sets. The loader (make_loader() by default)
+    holds the category vocabulary of the data afterwards.
+
+    With data.stream_dir set, the preprocessed sets are written to .npy files in that
+    directory and returned memory-mapped, for data that does not fit in memory. Merged
+    data loaded from the feature cache is memory-mapped too, and is read chunk by chunk.
 
+    Returns:
+        Tuple: (X_train, X_val, y_train, y_val, preprocessor)
+    """
     model_name = config["model"]["name"]
-    model_params = config["model"].get("params", {})
     preprocessor_params = config["preprocessor"].get("params", {})
+    data_config = config.get("data", {})
 
     # Load and preprocess data
     print("Loading data...")
-    loader = DataLoader(
-        customers_file="data/customers.csv",
-        noncustomers_file="data/noncustomers.csv",
-        actions_file="data/actions.csv"
-    )
+    loader = loader or make_loader(data_config)
     data = loader.load_and_preprocess()
-    labels = data["IS_CUSTOMER"]  # Assuming 'IS_CUSTOMER' is the target variable
-    data.drop(columns=["IS_CUSTOMER", "id"], inplace=True)  # Remove non-feature columns
+    # Remove non-feature columns; pop() keeps the other columns' blocks, while drop()
+    # would consolidate them (and read a memory-mapped cached frame into memory)
+    labels = data.pop("IS_CUSTOMER")  # Assuming 'IS_CUSTOMER' is the target variable
+    data.pop("id")
 
     # Get the appropriate preprocessor
     print(f"Initializing preprocessor for model '{model_name}'...")
     preprocessor = get_preprocessor(model_name, **preprocessor_params)
-    print("Preprocessing data...")
-    processed_data = preprocessor.preprocess(data)
+    print("Fitting the preprocessor...")
+    preprocessor.fit(data)
 
-# Get required features after preprocessing
+    # Get required features after fitting
     required_features = preprocessor.get_required_features()
-    print(f"Required features: {required_features}")
+    print(f"Required features: {len(required_features)}")
 
     # Validate that all required features are present
     missing_features = set(required_features) - set(data.columns)
     if missing_features:
         raise ValueError(f"Missing required features: {missing_features}")
 
+    matrix_dir = data_config.get("stream_dir")
+    if matrix_dir:
+        # Split the row indices (the same split as below) and preprocess each set into a file
+        os.makedirs(matrix_dir, exist_ok=True)
+        print(f"Preprocessing data into {matrix_dir}...")
+        train_rows, val_rows = train_test_split(np.arange(len(data)), test_size=0.2, random_state=42)
+        X_train = write_matrix(preprocessor, data, train_rows, os.path.join(matrix_dir, "X_train.npy"))
+        X_val = write_matrix(preprocessor, data, val_rows, os.path.join(matrix_dir, "X_val.npy"))
+        labels = labels.to_numpy()
+        return X_train, X_val, labels[train_rows], labels[val_rows], preprocessor
+
     # Preprocess the data
     print("Preprocessing data...")
-    processed_data = preprocessor.preprocess(data[required_features])
+    processed_data = preprocessor.transform(data)
+    del data
 
     # Split data into training and validation sets
     print("Splitting data into training and validation sets...")
@@ -70,8 +122,15 @@ def main(config_path):
     # Convert labels to appropriate format if necessary
     y_train = np.array(y_train)
     y_val = np.array(y_val)
+    return X_train, X_val, y_train, y_val, preprocessor
 
-    # Initialize and train the model
+def train_and_evaluate(model_name, model_params, X_train, y_train, X_val, y_val):
+    """
+    Train a model from the registry and evaluate it on the validation set.
+
+    Returns:
+        Tuple: (model, evaluation_metrics)
+    """
     print(f"Initializing model '{model_name}' with parameters: {model_params}")
     model = get_model(model_name, **model_params)
     print("Training the model...")
@@ -81,11 +140,67 @@ def main(config_path):
     print("Evaluating the model on the validation set...")
     evaluation_metrics = model.evaluate(X_val, y_val)
     print(f"Evaluation metrics: {evaluation_metrics}")
+    return model, evaluation_metrics
 
-    # Save the trained model
+def main(config_path, strategy=None):
+    # Load configuration
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+
+    model_name = config["model"]["name"]
+    model_params = config["model"].get("params", {})
+    training_config = config.get("training") or {}
+    training_params = {}
+    strategy = strategy or training_config.get("strategy")
+    if strategy not in (None, "default"):
+        training_params["strategy"] = strategy
+    if training_config.get("checkpoint_dir"):
+        # Resumes from the latest checkpoint in the directory, if a previous run was interrupted
+        training_params["checkpoint_dir"] = training_config["checkpoint_dir"]
+        training_params["checkpoint_every"] = training_config.get("checkpoint_every", "epoch")
+    if training_params:
+        if model_name != "tensorflow":
+            raise ValueError(f"Training options {sorted(training_params)} are only supported for the tensorflow model.")
+        model_params = dict(model_params, **training_params)
+
+    loader = make_loader(config.get("data", {}))
+    X_train, X_val, y_train, y_val, preprocessor = load_training_data(config, loader)
+
+    # Initialize, train and evaluate the model
+    model, evaluation_metrics = train_and_evaluate(model_name, model_params, X_train, y_train, X_val, y_val)
+
+    # In multi-worker training, every worker holds the same weights; only the chief writes them
+    if not getattr(model, "is_chief", True):
+        print("Training complete (worker, artifacts are written by the chief).")
+        return
+
+    # Save the fitted preprocessor and the category vocabulary next to the model, so serving
+    # builds the same feature columns and applies the same scaling. All files are replaced
+    # atomically, the model last: a new model file means a complete run.
     model_artifact_path = os.path.join("artifacts", model_name + "_model")
+    preprocessor_path = model_artifact_path + "_preprocessor.json"
+    print(f"Saving the preprocessor to '{preprocessor_path}'...")
+    preprocessor.save(preprocessor_path)
+    categories_path = categories_path_for(model_artifact_path)
+    print(f"Saving the category vocabulary to '{categories_path}'...")
+    loader.encoder.save(categories_path)
+
+    # Save the trained model
     print(f"Saving the model to '{model_artifact_path}'...")
     model.save(model_artifact_path)
+
+    # The run is complete; the next one starts from scratch
+    if hasattr(model, "clear_checkpoint"):
+        model.clear_checkpoint()
+
+    # Publish a versioned copy for servers that watch the manifest (serving.model.manifest)
+    publish_dir = training_config.get("publish_dir")
+    if publish_dir:
+        model_file = next(model_artifact_path + ext for ext in (".h5", ".pkl")
+                          if os.path.exists(model_artifact_path + ext))
+        version = publish_version(publish_dir, model_file, preprocessor_path,
+                                  training_config.get("keep_versions", 5), categories_path)
+        print(f"Published model version {version} to '{publish_dir}'.")
     print("Training complete.")
 
 if __name__ == "__main__":
@@ -96,6 +211,12 @@ if __name__ == "__main__":
         default="config.yaml",
         help="Path to the configuration file."
     )
+    parser.add_argument(
+        "--strategy",
+        type=str,
+        default=None,
+        help="tf.distribute strategy (default | mirrored | multi_worker), overriding training.strategy."
+    )
     args = parser.parse_args()
 
-    main(args.config)
+    main(args.config, args.strategy)
@@ -0,0 +1,444 @@
+"""
+Replay a JSONL request log against the API to measure latency, throughput, errors
+and the load at which a single server saturates.
+
+Each line of a request log is {"t": arrival time in seconds, "path": "/predict/",
+"body": {"ids": [...]}}; "t" and "path" are optional, and a bare {"ids": [...]} line
+is a /predict/ payload. Recorded logs hold Unix times and generated logs offsets from
+the first request; only their differences are used. Logs are recorded from live
+traffic (serving.record in config.yaml) or generated from the served ids:
+
+    python scripts/replay.py generate --config config.yaml --output artifacts/requests.jsonl \\
+        --requests 10000 --sizes lognormal --mean-size 10
+    python scripts/replay.py run artifacts/requests.jsonl --url http://localhost:8000 --concurrency 1 8 32
+    python scripts/replay.py run artifacts/requests.jsonl --in-process --config config.yaml --rates 50 100 200
+
+With --concurrency, each level runs closed-loop: that many clients send requests
+back to back. With --rates, each rate runs open-loop: requests arrive as a Poisson
+process regardless of how fast the server answers, and latency is measured from the
+scheduled arrival, so queueing in an overloaded server shows up in the percentiles.
+--recorded replays the log's own arrival times, scaled by --speed.
+"""
+import sys
+import os
+import json
+import math
+import time
+import asyncio
+import argparse
+import importlib
+from contextlib import asynccontextmanager
+from typing import List, Optional, Sequence
+import numpy as np
+import yaml
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+PREDICT_PATH = "/predict/"
+SIZE_DISTRIBUTIONS = ("fixed", "uniform", "geometric", "lognormal")
+# Status recorded for requests that failed without an HTTP response, or were never sent
+CONNECTION_ERROR = -1
+DROPPED = 0
+
+
+def read_requests(path: str) -> List[dict]:
+    """
+    Read a JSONL request log.
+
+    Returns:
+        List[dict]: {'t': float or None, 'path': str, 'body': dict} per request.
+    """
+    requests = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "body" not in record:
+                if "ids" not in record:
+                    raise ValueError(f"{path}:{number}: expected a 'body' or an 'ids' field.")
+                record = {"body": record}
+            requests.append({"t": record.get("t"), "path": record.get("path", PREDICT_PATH),
+                             "body": record["body"]})
+    return requests
+
+
+def write_requests(path: str, requests: Sequence[dict]):
+    """
+    Write requests as a JSONL request log.
+    """
+    with open(path, "w") as f:
+        for request in requests:
+            f.write(json.dumps({key: value for key, value in request.items() if value is not None}) + "\n")
+
+
+def request_sizes(num_requests: int, distribution: str = "fixed", mean_size: float = 10,
+                  max_size: int = 1000, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Number of ids in each of num_requests requests.
+
+    Args:
+        distribution (str): 'fixed' (always mean_size), 'uniform' (1 to 2 * mean_size - 1),
+            'geometric', or 'lognormal' (sigma 1, a long tail of large requests).
+        mean_size (float): Mean request size.
+        max_size (int): Sizes are clipped to [1, max_size].
+    """
+    rng = rng or np.random.default_rng()
+    if distribution == "fixed":
+        sizes = np.full(num_requests, round(mean_size))
+    elif distribution == "uniform":
+        sizes = rng.integers(1, max(2, round(2 * mean_size)), num_requests)
+    elif distribution == "geometric":
+        sizes = rng.geometric(min(1.0, 1.0 / mean_size), num_requests)
+    elif distribution == "lognormal":
+        # exp(mu + sigma^2 / 2) == mean_size with sigma = 1
+        sizes = np.ceil(rng.lognormal(math.log(mean_size) - 0.5, 1.0, num_requests))
+    else:
+        raise ValueError(f"Unknown size distribution '{distribution}', expected one of {SIZE_DISTRIBUTIONS}.")
+    return np.clip(sizes, 1, max_size).astype(np.int64)
+
+
+def generate_requests(ids: np.ndarray, num_requests: int, distribution: str = "fixed", mean_size: float = 10,
+                      max_size: int = 1000, rate: Optional[float] = None, seed: int = 0) -> List[dict]:
+    """
+    Generate /predict/ requests for random ids.
+
+    Args:
+        ids (numpy.ndarray): Ids to draw from, e.g. the ids of the served feature store.
+        rate (float, optional): Also assign Poisson arrival times at this many requests
+            per second, for replaying with --recorded.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = np.minimum(request_sizes(num_requests, distribution, mean_size, max_size, rng), len(ids))
+    arrivals = np.cumsum(rng.exponential(1.0 / rate, num_requests)) if rate else [None] * num_requests
+    return [{"t": None if t is None else round(float(t), 6), "path": PREDICT_PATH,
+             "body": {"ids": rng.choice(ids, size, replace=False).tolist()}}
+            for size, t in zip(sizes, arrivals)]
+
+
+def load_app(config_path: str):
+    """
+    (Re)import api.app with the given configuration file, which it reads at import
+    time. Returns the module; the app's startup has not run yet.
+    """
+    previous = os.environ.get("CONFIG_PATH")
+    os.environ["CONFIG_PATH"] = config_path
+    try:
+        return importlib.reload(sys.modules["api.app"]) if "api.app" in sys.modules \
+            else importlib.import_module("api.app")
+    finally:
+        if previous is None:
+            del os.environ["CONFIG_PATH"]
+        else:
+            os.environ["CONFIG_PATH"] = previous
+
+
+@asynccontextmanager
+async def serve_in_process(config_path: str, timeout: float = 600):
+    """
+    Start api.app with the given configuration in this process and yield an
+    httpx.AsyncClient that calls it directly through ASGI (no network, no HTTP server).
+    """
+    import httpx
+
+    app_module = load_app(config_path)
+    await app_module.app.router.startup()
+    try:
+        if not await asyncio.to_thread(app_module.startup.wait, timeout):
+            raise RuntimeError(f"The app did not become ready: {app_module.startup.status()}")
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            yield client
+    finally:
+        await app_module.app.router.shutdown()
+
+
+async def _send(client, request: dict) -> int:
+    try:
+        response = await client.post(request["path"], json=request["body"])
+        return response.status_code
+    except Exception:
+        return CONNECTION_ERROR
+
+
+async def run_closed_loop(client, requests: Sequence[dict], concurrency: int, num_requests: int) -> dict:
+    """
+    Send num_requests requests (cycling through the log) from concurrency clients,
+    each sending its next request as soon as the previous one is answered.
+    """
+    latencies = np.empty(num_requests)
+    statuses = np.empty(num_requests, dtype=np.int64)
+    sizes = np.empty(num_requests, dtype=np.int64)
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < num_requests:
+            i = next_index
+            next_index += 1
+            request = requests[i % len(requests)]
+            start = time.perf_counter()
+            statuses[i] = await _send(client, request)
+            latencies[i] = time.perf_counter() - start
+            sizes[i] = len(request["body"].get("ids", ()))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, sizes, time.perf_counter() - start)
+
+
+def arrival_offsets(times: Sequence[float]) -> np.ndarray:
+    """
+    Arrival offsets of a log's requests from its first one. Where the times go
+    backwards (e.g. logs recorded with per-process offsets, appended by several server
+    processes), the later requests are moved to follow the earlier ones, one mean
+    interval apart, instead of arriving all at once.
+    """
+    intervals = np.diff(np.asarray(times, dtype=np.float64))
+    backwards = intervals < 0
+    if backwards.any():
+        intervals[backwards] = intervals[~backwards].mean() if not backwards.all() else 0.0
+    return np.concatenate([[0.0], np.cumsum(intervals)])
+
+
+async def run_open_loop(client, requests: Sequence[dict], num_requests: int, rate: Optional[float] = None,
+                        speed: float = 1.0, max_in_flight: int = 1000, seed: int = 0) -> dict:
+    """
+    Send num_requests requests (cycling through the log) at their arrival times, without
+    waiting for earlier responses: Poisson arrivals at rate requests per second, or the
+    log's recorded arrival offsets divided by speed. Latency is measured from the
+    scheduled arrival. Arrivals while max_in_flight requests are outstanding are dropped.
+    """
+    if rate:
+        arrivals = np.cumsum(np.random.default_rng(seed).exponential(1.0 / rate, num_requests))
+    else:
+        if any(request["t"] is None for request in requests):
+            raise ValueError("Replaying recorded arrivals needs a 't' on every request of the log.")
+        recorded = arrival_offsets([request["t"] for request in requests])
+        # Cycling through the log repeats its arrival pattern
+        period = recorded[-1] + (recorded[-1] / max(1, len(recorded) - 1))
+        index = np.arange(num_requests)
+        arrivals = (recorded[index % len(requests)] + period * (index // len(requests))) / speed
+
+    latencies = np.full(num_requests, np.nan)
+    statuses = np.full(num_requests, DROPPED, dtype=np.int64)
+    sizes = np.empty(num_requests, dtype=np.int64)
+    in_flight = 0
+
+    async def send(i, request, scheduled):
+        nonlocal in_flight
+        statuses[i] = await _send(client, request)
+        latencies[i] = time.perf_counter() - scheduled
+        in_flight -= 1
+
+    tasks = []
+    start = time.perf_counter()
+    for i, arrival in enumerate(arrivals):
+        request = requests[i % len(requests)]
+        sizes[i] = len(request["body"].get("ids", ()))
+        delay = start + arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if in_flight >= max_in_flight:
+            continue
+        in_flight += 1
+        tasks.append(asyncio.create_task(send(i, request, start + arrival)))
+    await asyncio.gather(*tasks)
+    report = summarize(latencies, statuses, sizes, time.perf_counter() - start)
+    report["offered_per_s"] = round(num_requests / arrivals[-1], 1) if arrivals[-1] > 0 else None
+    return report
+
+
+def summarize(latencies: np.ndarray, statuses: np.ndarray, sizes: np.ndarray, elapsed: float) -> dict:
+    """
+    Latency percentiles (in ms, of the requests answered with 2xx), throughput and
+    error counts of one load level.
+    """
+    ok = (statuses >= 200) & (statuses < 300)
+    codes, counts = np.unique(statuses[~ok], return_counts=True)
+    ok_latencies = latencies[ok] * 1000
+    p50, p90, p99 = np.percentile(ok_latencies, [50, 90, 99]) if ok.any() else (None, None, None)
+    return {
+        "requests": len(statuses),
+        "ok": int(ok.sum()),
+        "errors": {("dropped" if code == DROPPED else "connection" if code == CONNECTION_ERROR else str(code)):
+                   int(count) for code, count in zip(codes, counts)},
+        "error_rate": round(float(1 - ok.mean()), 4),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(ok.sum() / elapsed, 1),
+        "ids_per_s": round(sizes[ok].sum() / elapsed, 1),
+        "p50_ms": None if p50 is None else round(float(p50), 3),
+        "p90_ms": None if p90 is None else round(float(p90), 3),
+        "p99_ms": None if p99 is None else round(float(p99), 3),
+        "max_ms": round(float(ok_latencies.max()), 3) if ok.any() else None,
+    }
+
+
+def find_saturation(steps: List[dict], p99_slo_ms: Optional[float] = None,
+                    max_error_rate: float = 0.01) -> Optional[int]:
+    """
+    Index of the first load level at which the server is saturated, or None.
+
+    A level is saturated if its error rate exceeds max_error_rate, its p99 latency
+    exceeds p99_slo_ms, or (open loop) it completes less than 90% of the offered rate,
+    or (closed loop) it adds less than 5% throughput over the previous level.
+    """
+    for index, step in enumerate(steps):
+        if step["error_rate"] > max_error_rate:
+            return index
+        if p99_slo_ms is not None and (step["p99_ms"] is None or step["p99_ms"] > p99_slo_ms):
+            return index
+        if step.get("offered_per_s") and step["throughput_per_s"] < 0.9 * step["offered_per_s"]:
+            return index
+        if "concurrency" in step and index > 0 and \
+                step["throughput_per_s"] < 1.05 * steps[index - 1]["throughput_per_s"]:
+            return index
+    return None
+
+
+async def replay(client, requests: Sequence[dict], concurrency: Sequence[int] = (), rates: Sequence[float] = (),
+                 recorded: bool = False, speed: float = 1.0, num_requests: Optional[int] = None,
+                 max_in_flight: int = 1000, warmup: int = 20, seed: int = 0) -> List[dict]:
+    """
+    Run the log at every closed-loop concurrency level, then at every open-loop rate
+    (and at its recorded arrival times, if recorded), after warmup requests.
+
+    Returns:
+        List[dict]: The summary of every load level, in the order run.
+    """
+    num_requests = num_requests or len(requests)
+    if warmup:
+        await run_closed_loop(client, requests, 1, min(warmup, num_requests))
+    steps = []
+    for level in concurrency:
+        steps.append(dict(concurrency=level, **await run_closed_loop(client, requests, level, num_requests)))
+        print_step(steps[-1])
+    for rate in rates:
+        steps.append(dict(rate=rate, **await run_open_loop(client, requests, num_requests, rate,
+                                                           max_in_flight=max_in_flight, seed=seed)))
+        print_step(steps[-1])
+    if recorded:
+        steps.append(dict(speed=speed, **await run_open_loop(client, requests, num_requests, speed=speed,
+                                                             max_in_flight=max_in_flight)))
+        print_step(steps[-1])
+    return steps
+
+
+def print_step(step: dict):
+    if "concurrency" in step:
+        load = f"concurrency {step['concurrency']}"
+    elif "rate" in step:
+        load = f"rate {step['rate']}/s"
+    else:
+        load = f"recorded x{step['speed']}"
+    latency = " ".join(f"{name} {step[name + '_ms']}" for name in ("p50", "p90", "p99"))
+    print(f"{load:<18} {step['throughput_per_s']:>9.1f} req/s  {step['ids_per_s']:>10.1f} ids/s  "
+          f"ms: {latency}  errors {step['error_rate']:.2%} {step['errors'] or ''}")
+
+
+def served_ids(config: dict) -> np.ndarray:
+    """
+    Ids of the feature store the API serves with this configuration.
+    """
+    from data.loader import DataLoader
+    data_config = config.get("data") or {}
+    loader = DataLoader(data_config["customers_file"], data_config["noncustomers_file"],
+                        data_config["actions_file"], cache_dir=data_config.get("cache_dir"),
+                        chunksize=data_config.get("chunksize"), num_workers=data_config.get("num_workers", 1))
+    return loader.load_and_preprocess()["id"].to_numpy()
+
+
+def main_run(args):
+    requests = read_requests(args.log)
+    if not requests:
+        raise ValueError(f"{args.log} holds no requests.")
+    if not (args.concurrency or args.rates or args.recorded):
+        args.concurrency = [1, 8, 32]
+
+    async def run():
+        if args.in_process:
+            context = serve_in_process(os.path.abspath(args.config))
+        else:
+            import httpx
+            limits = httpx.Limits(max_connections=max([args.max_in_flight] + list(args.concurrency)))
+            context = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+        async with context as client:
+            return await replay(client, requests, args.concurrency, args.rates, args.recorded, args.speed,
+                                args.requests, args.max_in_flight, args.warmup, args.seed)
+
+    target = "in process" if args.in_process else args.url
+    print(f"Replaying {len(requests)} requests from {args.log} against {target}")
+    steps = asyncio.run(run())
+    saturated = find_saturation(steps, args.p99_slo_ms, args.max_error_rate)
+    # Highest throughput within the limits: the capacity of one server
+    healthy = steps[:saturated] if saturated is not None else steps
+    capacity = max((step["throughput_per_s"] for step in healthy), default=None)
+    report = {"log": args.log, "target": target, "steps": steps,
+              "saturated_step": saturated, "capacity_per_s": capacity}
+    if saturated is None:
+        print("No saturation within the load levels run.")
+    else:
+        print(f"Saturated at step {saturated + 1}; capacity {capacity} req/s per server.")
+    if args.target_rate and capacity:
+        # Keep every replica below 70% of its capacity
+        replicas = math.ceil(args.target_rate / (0.7 * capacity))
+        report["replicas"] = replicas
+        print(f"{replicas} replicas for {args.target_rate} req/s at 70% utilization.")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}.")
+
+
+def main_generate(args):
+    with open(args.config) as f:
+        config = yaml.safe_load(f) or {}
+    ids = served_ids(config)
+    requests = generate_requests(ids, args.requests, args.sizes, args.mean_size, args.max_size,
+                                 args.rate, args.seed)
+    write_requests(args.output, requests)
+    sizes = np.array([len(request["body"]["ids"]) for request in requests])
+    print(f"Wrote {len(requests)} requests ({sizes.mean():.1f} ids on average, at most {sizes.max()}) "
+          f"for {len(ids)} ids to {args.output}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate or replay /predict request logs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Generate a request log from the served ids.")
+    generate.add_argument("--config", type=str, default="config.yaml", help="Configuration of the served data.")
+    generate.add_argument("--output", type=str, required=True, help="JSONL file to write.")
+    generate.add_argument("--requests", type=int, default=10_000, help="Number of requests.")
+    generate.add_argument("--sizes", choices=SIZE_DISTRIBUTIONS, default="fixed", help="Request size distribution.")
+    generate.add_argument("--mean-size", type=float, default=10, help="Mean ids per request.")
+    generate.add_argument("--max-size", type=int, default=1000, help="Largest request.")
+    generate.add_argument("--rate", type=float, default=None,
+                          help="Record Poisson arrival times at this rate, for run --recorded.")
+    generate.add_argument("--seed", type=int, default=0)
+    generate.set_defaults(handler=main_generate)
+
+    run = commands.add_parser("run", help="Replay a request log against the API.")
+    run.add_argument("log", type=str, help="JSONL request log.")
+    target = run.add_mutually_exclusive_group()
+    target.add_argument("--url", type=str, default="http://localhost:8000", help="Base URL of a running server.")
+    target.add_argument("--in-process", action="store_true", help="Start the app in this process instead.")
+    run.add_argument("--config", type=str, default="config.yaml", help="Configuration for --in-process.")
+    run.add_argument("--concurrency", type=int, nargs="+", default=[], help="Closed-loop client counts.")
+    run.add_argument("--rates", type=float, nargs="+", default=[], help="Open-loop arrival rates (requests/s).")
+    run.add_argument("--recorded", action="store_true", help="Replay the log's recorded arrival times.")
+    run.add_argument("--speed", type=float, default=1.0, help="Time compression of --recorded.")
+    run.add_argument("--requests", type=int, default=None, help="Requests per load level (default: the log).")
+    run.add_argument("--max-in-flight", type=int, default=1000, help="Open loop: drop arrivals beyond this.")
+    run.add_argument("--warmup", type=int, default=20, help="Requests sent before measuring.")
+    run.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds.")
+    run.add_argument("--p99-slo-ms", type=float, default=None, help="p99 latency above this counts as saturated.")
+    run.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate above this counts as saturated.")
+    run.add_argument("--target-rate", type=float, default=None, help="Peak traffic to size replicas for.")
+    run.add_argument("--output", type=str, default=None, help="Write the report as JSON.")
+    run.add_argument("--seed", type=int, default=0)
+    run.set_defaults(handler=main_run)
+
+    args = parser.parse_args()
+    args.handler(args)
@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import hashlib
+import time
+import argparse
+from typing import Optional
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import yaml
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.workers import configure_tf_threads, cpu_limit, thread_counts
+from data.cache import file_digest
+from data.feature_store import NON_FEATURE_COLUMNS
+from data.loader import DataLoader
+from models.registry import load_model
+from models.serving import categories_path_for, load_preprocessor, preprocessor_path_for
+from scripts.model_train import make_loader
+
+MODEL_EXTENSIONS = {"tensorflow": ".h5", "logistic_regression": ".pkl"}
+SCORING_VERSION = "1"
+
+
+def shard_path(output_dir: str, shard: int) -> str:
+    return os.path.join(output_dir, f"part-{shard:05d}.npz")
+
+
+def prepare_features(loader: DataLoader, model_name: str, preprocess: bool = True,
+                     preprocessor_path: Optional[str] = None):
+    """
+    Build the merged feature matrix for every id.
+
+    With preprocess, features are standardized with the preprocessor saved next to the
+    model (preprocessor_path). Otherwise the raw merged features are used. A preprocessor
+    is never fitted on the data being scored: the model would then see inputs scaled
+    differently from the ones it was trained on.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray]: ids (int64) and C-contiguous float32 features.
+
+    Raises:
+        FileNotFoundError: If preprocess is set and there is no saved preprocessor.
+    """
+    if preprocess and preprocessor_path is None:
+        raise FileNotFoundError(f"No saved preprocessor for the '{model_name}' model; score the raw "
+                                f"features (--raw-features) if it was trained on them.")
+    data = loader.load_and_preprocess()
+    ids = data["id"].to_numpy(dtype=np.int64)
+    data = data.drop(columns=[col for col in NON_FEATURE_COLUMNS if col in data.columns])
+    if not preprocess:
+        return ids, np.ascontiguousarray(data.to_numpy(dtype=np.float32))
+    return ids, load_preprocessor(preprocessor_path).transform(data)
+
+
+def write_manifest(output_dir: str, manifest: dict, overwrite: bool = False):
+    """
+    Write the run's manifest, or check it against the one of the run being resumed.
+    Resuming is only allowed with the same model, data and shard layout.
+    """
+    path = os.path.join(output_dir, "manifest.json")
+    if os.path.exists(path) and not overwrite:
+        with open(path) as f:
+            existing = json.load(f)
+        if existing != manifest:
+            raise ValueError(f"{output_dir} holds scores of a different run; use --overwrite to replace them.")
+        return
+    for name in os.listdir(output_dir):
+        if name.startswith("part-"):
+            os.remove(os.path.join(output_dir, name))
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def score_shard(model, ids: np.ndarray, features: np.ndarray, output_dir: str, shard: int,
+                shard_rows: int, batch_size: int) -> int:
+    """
+    Score one shard of rows in fixed-size batches and write it atomically.
+
+    Returns:
+        int: Number of rows scored.
+    """
+    rows = slice(shard * shard_rows, min((shard + 1) * shard_rows, len(ids)))
+    shard_features = features[rows]
+    probabilities = np.concatenate([
+        model.predict_proba(shard_features[start:start + batch_size])
+        for start in range(0, len(shard_features), batch_size)
+    ]).astype(np.float32)
+
+    path = shard_path(output_dir, shard)
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, id=ids[rows], prediction=np.argmax(probabilities, axis=1).astype(np.int8),
+                 probability=probabilities)
+    os.replace(path + ".tmp", path)
+    return len(probabilities)
+
+
+# State of each worker process: the model and the memory-mapped inputs
+_worker_state = {}
+
+
+def _init_worker(model_name: str, model_path: str, output_dir: str, threads: int):
+    if model_name == "tensorflow":
+        configure_tf_threads(threads, 1)
+    _worker_state["model"] = load_model(model_name, model_path)
+    _worker_state["ids"] = np.load(os.path.join(output_dir, "ids.npy"), mmap_mode="r")
+    _worker_state["features"] = np.load(os.path.join(output_dir, "features.npy"), mmap_mode="r")
+
+
+def _score_shard_in_worker(output_dir: str, shard: int, shard_rows: int, batch_size: int):
+    start = time.perf_counter()
+    rows = score_shard(_worker_state["model"], _worker_state["ids"], _worker_state["features"],
+                       output_dir, shard, shard_rows, batch_size)
+    return shard, rows, time.perf_counter() - start
+
+
+def read_scores(output_dir: str) -> pd.DataFrame:
+    """
+    Read the scores of a run into one DataFrame with id, prediction and one probability
+    column per class.
+    """
+    with open(os.path.join(output_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    frames = []
+    for shard in range(manifest["num_shards"]):
+        with np.load(shard_path(output_dir, shard)) as part:
+            frame = pd.DataFrame({"id": part["id"], "prediction": part["prediction"]})
+            for k in range(part["probability"].shape[1]):
+                frame[f"probability_{k}"] = part["probability"][:, k]
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def score(loader: DataLoader, model_name: str, model_path: str, output_dir: str,
+          batch_size: int = 65536, shard_rows: int = 1_000_000, workers: int = 1,
+          preprocess: bool = True, overwrite: bool = False) -> dict:
+    """
+    Score every id of the merged dataset with a saved model.
+
+    Scores are written to output_dir as one .npz file per shard of shard_rows rows, with
+    the columns id, prediction and probability, next to a manifest.json. Shards already
+    present are skipped, so an interrupted run resumes where it stopped.
+
+    Args:
+        loader (DataLoader): Loader for the data to score.
+        model_name (str): Model name in the registry.
+        model_path (str): Artifact path without extension, as passed to save().
+        output_dir (str): Directory for the scores.
+        batch_size (int): Rows per forward pass.
+        shard_rows (int): Rows per output file, and per task with several workers.
+        workers (int): Worker processes; each loads the model and reads memory-mapped features.
+        preprocess (bool): Apply the model's preprocessor (saved next to it by
+            scripts/model_train.py) before scoring. Raises FileNotFoundError without one.
+        overwrite (bool): Replace the scores of a different earlier run.
+
+    Returns:
+        dict: Rows scored, shards written and skipped, seconds and rows/sec.
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    preprocessor_path = preprocessor_path_for(model_path)
+    if not os.path.exists(preprocessor_path):
+        preprocessor_path = None
+    ids, features = prepare_features(loader, model_name, preprocess, preprocessor_path)
+    print(f"Prepared {len(ids)} rows x {features.shape[1]} features in {time.perf_counter() - start:.1f}s.")
+
+    num_shards = max(1, -(-len(ids) // shard_rows))
+    write_manifest(output_dir, {
+        "version": SCORING_VERSION,
+        "model_name": model_name,
+        "model_digest": file_digest(model_path + MODEL_EXTENSIONS.get(model_name, "")),
+        "ids_digest": hashlib.sha256(ids.tobytes()).hexdigest()[:16],
+        "num_rows": int(len(ids)),
+        "num_features": int(features.shape[1]),
+        "preprocess": preprocess,
+        "preprocessor_digest": file_digest(preprocessor_path) if preprocess and preprocessor_path else None,
+        "shard_rows": shard_rows,
+        "num_shards": num_shards,
+        "columns": ["id", "prediction", "probability"],
+    }, overwrite)
+
+    pending = [shard for shard in range(num_shards) if not os.path.exists(shard_path(output_dir, shard))]
+    if len(pending) < num_shards:
+        print(f"Resuming: {num_shards - len(pending)} of {num_shards} shards already scored.")
+
+    scoring_start = time.perf_counter()
+    rows_scored = 0
+    if workers <= 1 or len(pending) <= 1:
+        model = load_model(model_name, model_path)
+        for shard in pending:
+            rows_scored += score_shard(model, ids, features, output_dir, shard, shard_rows, batch_size)
+            print(f"Shard {shard + 1}/{num_shards}: {rows_scored / (time.perf_counter() - scoring_start):,.0f} rows/sec")
+    else:
+        # Share the inputs with the workers through memory-mapped files instead of pickling them
+        np.save(os.path.join(output_dir, "ids.npy"), ids)
+        np.save(os.path.join(output_dir, "features.npy"), features)
+        del features
+        threads = thread_counts(cpu_limit(), workers)[0]
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(model_name, model_path, output_dir, threads)) as executor:
+            futures = [executor.submit(_score_shard_in_worker, output_dir, shard, shard_rows, batch_size)
+                       for shard in pending]
+            for future in as_completed(futures):
+                shard, rows, seconds = future.result()
+                rows_scored += rows
+                print(f"Shard {shard + 1}/{num_shards}: {rows / seconds:,.0f} rows/sec in its worker")
+        for name in ("ids.npy", "features.npy"):
+            os.remove(os.path.join(output_dir, name))
+
+    scoring_seconds = time.perf_counter() - scoring_start
+    stats = {
+        "rows": rows_scored,
+        "shards_written": len(pending),
+        "shards_skipped": num_shards - len(pending),
+        "scoring_seconds": round(scoring_seconds, 3),
+        "total_seconds": round(time.perf_counter() - start, 3),
+        "rows_per_second": round(rows_scored / scoring_seconds, 1) if rows_scored else 0.0,
+    }
+    print(f"Scored {rows_scored} rows in {scoring_seconds:.2f}s ({stats['rows_per_second']:,.0f} rows/sec).")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score every id of the merged dataset with a saved model.")
+    parser.add_argument("--config", type=str, default="config.yaml", help="Path to the configuration file.")
+    parser.add_argument("--model", type=str, default=None, help="Model name in the registry (default: from config).")
+    parser.add_argument("--model-path", type=str, default=None,
+                        help="Artifact path without extension (default: artifacts/<model>_model).")
+    parser.add_argument("--output-dir", type=str, default="artifacts/scores", help="Directory for the scores.")
+    parser.add_argument("--batch-size", type=int, default=65536, help="Rows per forward pass.")
+    parser.add_argument("--shard-rows", type=int, default=1_000_000, help="Rows per output file.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes scoring shards in parallel.")
+    parser.add_argument("--raw-features", action="store_true",
+                        help="Score the raw merged features, for models trained without a preprocessor.")
+    parser.add_argument("--overwrite", action="store_true", help="Replace scores of a different earlier run.")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    model_name = args.model or config["model"]["name"]
+    model_path = args.model_path or os.path.join("artifacts", model_name + "_model")
+    data_config = dict(config.get("data", {}))
+    # The dummy columns the model was trained on, if its vocabulary was saved with it
+    if not data_config.get("categories_path") and os.path.exists(categories_path_for(model_path)):
+        data_config["categories_path"] = categories_path_for(model_path)
+    loader = make_loader(data_config)
+    score(loader, model_name, model_path, args.output_dir, batch_size=args.batch_size,
+          shard_rows=args.shard_rows, workers=args.workers, preprocess=not args.raw_features,
+          overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+import yaml
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.workers import cpu_limit
+from scripts.model_train import load_training_data, train_and_evaluate
+
+DATA_ARRAYS = ("X_train", "X_val", "y_train", "y_val")
+
+
+def grid_candidates(space: Dict[str, list]) -> List[dict]:
+    """
+    Every combination of the listed parameter values.
+    """
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_candidates(space: Dict[str, object], num_samples: int, seed: int = 0) -> List[dict]:
+    """
+    Random parameter combinations. Lists are sampled uniformly; {"min", "max"} ranges are
+    sampled uniformly, or log-uniformly with "log": true, and as integers if both bounds are.
+    """
+    rng = random.Random(seed)
+    candidates = []
+    for _ in range(num_samples):
+        params = {}
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, list):
+                params[name] = rng.choice(values)
+                continue
+            low, high = values["min"], values["max"]
+            if values.get("log"):
+                value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                value = rng.uniform(low, high)
+            params[name] = int(round(value)) if isinstance(low, int) and isinstance(high, int) else value
+        candidates.append(params)
+    return candidates
+
+
+def limit_threads(threads: int, model_name: str):
+    """
+    Cap the BLAS/OpenMP (and, for TensorFlow models, TensorFlow) thread pools of this
+    process, so parallel trials do not oversubscribe the CPUs.
+    """
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(threads)
+    if model_name == "tensorflow":
+        # Before TensorFlow runs any op, or the setting is ignored
+        from api.workers import configure_tf_threads
+        configure_tf_threads(threads, 1)
+
+
+# Training data of each worker process, memory-mapped from the sweep directory
+_worker_data = {}
+
+
+def _init_worker(data_dir: str, threads: int, model_name: str):
+    limit_threads(threads, model_name)
+    for name in DATA_ARRAYS:
+        _worker_data[name] = np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode="r")
+
+
+def _run_trial(trial: int, model_name: str, base_params: dict, params: dict, output_dir: str) -> dict:
+    start = time.perf_counter()
+    model_params = dict(base_params, **params)
+    result = {"trial": trial, "params": json.dumps(params, sort_keys=True)}
+    try:
+        model, metrics = train_and_evaluate(
+            model_name, model_params, _worker_data["X_train"], _worker_data["y_train"],
+            _worker_data["X_val"], _worker_data["y_val"])
+        model_path = os.path.join(output_dir, f"trial-{trial:03d}_model")
+        model.save(model_path)
+        result.update(metrics, model_path=model_path, status="ok")
+    except Exception as e:
+        result.update(status="failed", error=repr(e))
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_sweep(config: dict, candidates: List[dict], output_dir: str, workers: int = 1,
+              metric: str = "accuracy") -> pd.DataFrame:
+    """
+    Train one model per candidate parameter set, in parallel, and write a leaderboard.
+
+    The data is loaded and preprocessed once; the arrays are written to output_dir and
+    memory-mapped by the worker processes instead of being pickled to each of them.
+    Every worker gets an equal share of the CPUs for its BLAS and TensorFlow threads.
+
+    Args:
+        config (dict): Training configuration, as for scripts/model_train.py.
+        candidates (List[dict]): Parameter sets, each merged over config['model']['params'].
+        output_dir (str): Directory for the shared data, trial models and leaderboard.
+        workers (int): Trials trained in parallel.
+        metric (str): Evaluation metric the leaderboard is sorted by (higher is better).
+
+    Returns:
+        pandas.DataFrame: The leaderboard.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    data_dir = os.path.join(output_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    X_train, X_val, y_train, y_val, preprocessor = load_training_data(config)
+    for name, array in zip(DATA_ARRAYS, (X_train, X_val, y_train, y_val)):
+        np.save(os.path.join(data_dir, f"{name}.npy"), np.ascontiguousarray(array))
+    preprocessor.save(os.path.join(output_dir, "preprocessor.json"))
+    del X_train, X_val, y_train, y_val
+
+    model_name = config["model"]["name"]
+    base_params = config["model"].get("params") or {}
+    workers = max(1, min(workers, len(candidates)))
+    threads = max(1, int(cpu_limit()) // workers)
+    print(f"Running {len(candidates)} trials of '{model_name}' on {workers} workers with {threads} thread(s) each.")
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(data_dir, threads, model_name)) as executor:
+        futures = [executor.submit(_run_trial, trial, model_name, base_params, params, output_dir)
+                   for trial, params in enumerate(candidates)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"Trial {result['trial']} {result['status']} in {result['seconds']}s: "
+                  f"{result['params']} {metric}={result.get(metric)}")
+
+    leaderboard = pd.DataFrame(results)
+    if metric in leaderboard.columns:
+        leaderboard = leaderboard.sort_values(metric, ascending=False, na_position="last")
+    leaderboard.insert(0, "rank", range(1, len(leaderboard) + 1))
+    leaderboard_path = os.path.join(output_dir, "leaderboard.csv")
+    leaderboard.to_csv(leaderboard_path, index=False)
+    print(f"Sweep finished in {time.perf_counter() - start:.1f}s; leaderboard written to {leaderboard_path}.")
+    return leaderboard
+
+
+def main(config_path: str, output_dir: str, workers: int):
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+    sweep_config = config.get("sweep") or {}
+    space = sweep_config.get("params") or {}
+    if not space:
+        raise ValueError("The configuration has no sweep.params to search over.")
+
+    if sweep_config.get("method", "grid") == "random":
+        candidates = random_candidates(space, sweep_config.get("num_samples", 10), sweep_config.get("seed", 0))
+    else:
+        candidates = grid_candidates(space)
+    leaderboard = run_sweep(config, candidates, output_dir, workers=workers or sweep_config.get("workers", 1),
+                            metric=sweep_config.get("metric", "accuracy"))
+    print(leaderboard.head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grid or random search over model.params.")
+    parser.add_argument("--config", type=str, default="config.yaml", help="Path to the configuration file.")
+    parser.add_argument("--output-dir", type=str, default="artifacts/sweep", help="Directory for the sweep results.")
+    parser.add_argument("--workers", type=int, default=None, help="Trials trained in parallel (default: sweep.workers).")
+    args = parser.parse_args()
+
+    main(args.config, args.output_dir, args.workers)
@@ -15,9 +15,10 @@ from sklearn.model_selection import train_test_split
 customers_file = "./data/customers.csv"
 noncustomers_file = "./data/noncustomers.csv"
 actions_file = "./data/actions.csv"
+cache_dir = "./artifacts/feature_cache"
 
-# Load and preprocess data
-loader = DataLoader(customers_file, noncustomers_file, actions_file)
+# Load and preprocess data, reusing the cached merge when the CSVs are unchanged
+loader = DataLoader(customers_file, noncustomers_file, actions_file, cache_dir=cache_dir)
 merged_data = loader.load_and_preprocess()
 
 # Split data into features and labels
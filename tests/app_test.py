@@ -0,0 +1,85 @@
+import pytest
+
+from data.loader import DataLoader
+from data.feature_store import FeatureStore
+
+tf = pytest.importorskip("tensorflow")
+
+
+@pytest.fixture(scope="module")
+def client(synthetic_files, serve_app, tmp_path_factory):
+    from models.tensorflow_model import TensorFlowModel
+
+    tmp_dir = tmp_path_factory.mktemp("serving")
+    store = FeatureStore.from_frame(DataLoader(**synthetic_files).load_and_preprocess())
+    model = TensorFlowModel(input_shape=(store.num_features,), num_classes=2)
+    model.save(str(tmp_dir / "tf_model"))
+
+    config = {
+        "data": dict(synthetic_files, cache_dir=None),
+        "serving": {"model": {"path": str(tmp_dir / "tf_model.h5")},
+                    "batching": {"max_batch_size": 64, "max_latency_ms": 2}},
+    }
+    with serve_app(config) as (test_client, _):
+        test_client.store = store
+        yield test_client
+
+
+def test_probes(client):
+    assert client.get("/healthz").status_code == 200
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert set(response.json()["phases"]) == {"model", "features", "warmup"}
+
+
+def test_predict_reports_missing_ids(client):
+    known = client.store.ids[:3].tolist()
+    response = client.post("/predict/", json={"ids": known + [-1]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ids"] == known
+    assert body["missing_ids"] == [-1]
+    assert len(body["predictions"]) == 3
+
+    assert client.post("/predict/", json={"ids": [-1]}).status_code == 400
+
+
+def test_metrics_exposition(client):
+    client.post("/predict/", json={"ids": client.store.ids[:2].tolist()})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for name in ("predict_request_seconds_count", "feature_lookup_seconds_count",
+                 "tensor_conversion_seconds_count", "model_forward_seconds_count",
+                 "predict_ids_requested_total", "predict_requests_in_flight"):
+        assert name in response.text
+
+
+def test_predict_serves_repeated_ids_from_cache(client):
+    from api.metrics import PREDICTION_CACHE_HITS
+    ids = client.store.ids[10:14].tolist()
+    first = client.post("/predict/", json={"ids": ids[:2]}).json()
+
+    hits_before = PREDICTION_CACHE_HITS._value.get()
+    second = client.post("/predict/", json={"ids": ids[::-1]}).json()
+    assert PREDICTION_CACHE_HITS._value.get() - hits_before == 2
+    assert second["ids"] == ids[::-1]
+    assert second["predictions"][2:] == first["predictions"][::-1]
+
+
+def test_model_with_other_input_width_is_rejected(synthetic_files, serve_app, tmp_path):
+    from models.tensorflow_model import TensorFlowModel
+    from models.serving import model_input_width
+
+    num_features = FeatureStore.from_frame(DataLoader(**synthetic_files).load_and_preprocess()).num_features
+    TensorFlowModel(input_shape=(num_features - 2,), num_classes=2).save(str(tmp_path / "tf_model"))
+    assert model_input_width(str(tmp_path / "tf_model.h5")) == num_features - 2
+
+    config = {
+        "data": dict(synthetic_files, cache_dir=None),
+        "serving": {"model": {"path": str(tmp_path / "tf_model.h5")}},
+    }
+    with serve_app(config, ready=False) as (client, _):
+        warmup = client.get("/readyz").json()["phases"]["warmup"]
+    assert warmup["status"] == "failed"
+    assert "retrain required" in warmup["error"]
@@ -0,0 +1,132 @@
+import threading
+import time
+import numpy as np
+import pytest
+
+from api.batching import MicroBatcher
+
+
+def test_concurrent_requests_share_a_forward_pass():
+    calls = []
+
+    def predict_fn(x):
+        calls.append(len(x))
+        return x * 2
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=64, max_latency_ms=200)
+    batcher.start()
+    try:
+        barrier = threading.Barrier(4)
+        futures = [None] * 4
+
+        def submit(i):
+            barrier.wait()
+            futures[i] = batcher.submit(np.full((i + 1, 3), i, dtype=np.float32))
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for i, future in enumerate(futures):
+            result = future.result(timeout=5)
+            assert result.shape == (i + 1, 3)
+            assert (result == 2 * i).all()
+        assert sum(calls) == 10
+        assert len(calls) < 4
+    finally:
+        batcher.stop()
+
+
+def test_batch_size_limit_and_errors_propagate():
+    calls = []
+
+    def predict_fn(x):
+        calls.append(len(x))
+        if (x < 0).any():
+            raise RuntimeError("bad input")
+        return x
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_latency_ms=50)
+    futures = [batcher.submit(np.ones((3, 1), dtype=np.float32)) for _ in range(3)]
+    batcher.start()
+    try:
+        for future in futures:
+            assert future.result(timeout=5).shape == (3, 1)
+        assert max(calls) <= 4
+
+        with pytest.raises(RuntimeError):
+            batcher.submit(-np.ones((1, 1), dtype=np.float32)).result(timeout=5)
+    finally:
+        batcher.stop()
+
+
+def test_full_queue_rejects_and_pool_runs_batches():
+    from api.batching import QueueFullError
+    from api.workers import InferenceWorkerPool
+
+    pool = InferenceWorkerPool(lambda x: x + 1, kind="thread", num_workers=2)
+    batcher = MicroBatcher(None, max_batch_size=8, max_latency_ms=1, max_queue_size=2, pool=pool)
+    futures = [batcher.submit(np.zeros((1, 2), dtype=np.float32)) for _ in range(2)]
+    with pytest.raises(QueueFullError):
+        batcher.submit(np.zeros((1, 2), dtype=np.float32))
+
+    batcher.start()
+    try:
+        for future in futures:
+            assert (future.result(timeout=5) == 1).all()
+    finally:
+        batcher.stop()
+        pool.shutdown()
+
+
+def test_stop_runs_queued_and_held_over_requests():
+    from api.batching import BatcherStoppedError
+
+    started = threading.Event()
+
+    def predict_fn(x):
+        started.set()
+        time.sleep(0.2)
+        return x
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_latency_ms=1)
+    batcher.start()
+    first = batcher.submit(np.zeros((3, 1), dtype=np.float32))
+    assert started.wait(timeout=5)
+    # Queued while the first batch runs; the second of them does not fit next to the first
+    futures = [batcher.submit(np.full((3, 1), i, dtype=np.float32)) for i in range(3)]
+    batcher.stop()
+
+    assert first.done()
+    for i, future in enumerate(futures):
+        assert future.done()
+        assert (future.result() == i).all()
+    with pytest.raises(BatcherStoppedError):
+        batcher.submit(np.zeros((1, 1), dtype=np.float32))
+
+
+def test_stop_timeout_leaves_pending_requests_to_the_batching_thread():
+    release = threading.Event()
+    calls = []
+
+    def predict_fn(x):
+        calls.append(len(x))
+        release.wait(timeout=5)
+        return x
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_latency_ms=1)
+    batcher.start()
+    first = batcher.submit(np.zeros((3, 1), dtype=np.float32))
+    while not calls:
+        time.sleep(0.001)
+    futures = [batcher.submit(np.full((3, 1), i, dtype=np.float32)) for i in range(3)]
+    batcher.stop(timeout=0.05)
+    assert not any(future.done() for future in futures)
+
+    release.set()
+    assert first.result(timeout=5).shape == (3, 1)
+    for i, future in enumerate(futures):
+        assert (future.result(timeout=5) == i).all()
+    assert calls == [3, 3, 3, 3]
@@ -0,0 +1,25 @@
+import json
+
+from benchmarks.run import compare, run_suite
+
+
+def test_benchmark_suite_reports_json(tmp_path):
+    report = run_suite(["serving"], num_actions=3_000, num_companies=200, data_dir=str(tmp_path),
+                       train_steps=5, concurrency=[1, 4], num_requests=20, ids_per_request=3)
+
+    json.dumps(report)
+    results = report["results"]
+    assert report["parameters"]["suites"] == ["loader", "preprocess", "serving", "train"]
+    assert results["loader.total_s"] > 0
+    assert results["preprocess.fit_s"] > 0
+    assert results["train.logistic_regression_fit_s"] > 0
+    assert results["serving.c4.requests_per_s"] > 0
+    assert results["serving.c1.errors"] == results["serving.c4.errors"] == 0
+    # The generated data is reused by a run with the same parameters
+    assert (tmp_path / "benchmark_data.json").exists()
+
+
+def test_compare_flags_regressions():
+    baseline = {"parameters": {}, "results": {"a_s": 1.0, "b_per_s": 100.0, "c_ms": 10.0, "rows": 5}}
+    current = {"parameters": {}, "results": {"a_s": 1.5, "b_per_s": 95.0, "c_ms": 9.0, "rows": 50}}
+    assert compare(baseline, current, threshold=0.1) == ["a_s"]
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from data.cache import FrameCache
+
+
+def test_round_trip_and_invalidation(tmp_path):
+    source = tmp_path / "actions.csv"
+    source.write_text("id,value\n1,2\n")
+    cache = FrameCache(str(tmp_path / "cache"))
+
+    frame = pd.DataFrame({
+        "id": np.array([1, 2], dtype=np.int64),
+        "value": np.array([0.5, np.nan]),
+        "INDUSTRY_Software": np.array([1, 0], dtype=np.uint8),
+    })
+    key = FrameCache.make_key([str(source)], "1")
+    assert cache.load(key) is None
+
+    cache.save(key, frame)
+    loaded = cache.load(key)
+    pd.testing.assert_frame_equal(loaded, frame)
+    loaded.drop(columns=["id"], inplace=True)
+
+    assert FrameCache.make_key([str(source)], "2") != key
+    source.write_text("id,value\n1,3\n")
+    new_key = FrameCache.make_key([str(source)], "1")
+    assert new_key != key
+
+    cache.save(new_key, frame)
+    cache.prune(keep_key=new_key)
+    assert cache.load(key) is None
+    assert cache.load(new_key) is not None
+
+
+def test_loaded_columns_are_backed_by_the_cache_files(tmp_path, monkeypatch):
+    cache = FrameCache(str(tmp_path / "cache"))
+    frame = pd.DataFrame({"id": np.arange(100, dtype=np.int64),
+                          "a": np.linspace(0, 1, 100), "b": np.linspace(1, 2, 100)})
+    cache.save("key", frame)
+
+    maps = []
+    load = np.load
+    monkeypatch.setattr(np, "load", lambda *args, **kwargs: maps.append(load(*args, **kwargs)) or maps[-1])
+    loaded = cache.load("key")
+
+    assert len(maps) == 3 and all(isinstance(values, np.memmap) for values in maps)
+    for name, on_disk in zip(frame.columns, maps):
+        assert np.shares_memory(loaded[name].to_numpy(), on_disk)
+    pd.testing.assert_frame_equal(loaded, frame)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from data.categorical import CategoricalEncoder
+from data.loader import DataLoader
+
+COLUMNS = {"INDUSTRY": "INDUSTRY", "EMPLOYEE_RANGE": "EM"}
+
+
+def companies(industries, ranges):
+    return pd.DataFrame({"INDUSTRY": industries, "EMPLOYEE_RANGE": ranges})
+
+
+def test_encoding_matches_get_dummies_plus_unknown():
+    df = companies(["Retail", "Banking", "Retail", None], ["1 to 10", "11 to 50", "Unknown", "1 to 10"])
+    encoder = CategoricalEncoder(COLUMNS).fit(df)
+    encoded = encoder.transform_frame(df)
+
+    expected = pd.concat([pd.get_dummies(df["INDUSTRY"].fillna("Unknown"), prefix="INDUSTRY"),
+                          pd.get_dummies(df["EMPLOYEE_RANGE"], prefix="EM")], axis=1)
+    assert encoded.columns.tolist() == expected.columns.tolist()
+    assert (encoded.dtypes == np.uint8).all()
+    pd.testing.assert_frame_equal(encoded, expected.astype(np.uint8))
+
+
+def test_unseen_values_keep_the_layout(tmp_path):
+    encoder = CategoricalEncoder(COLUMNS).fit(companies(["Retail", "Banking"], ["1 to 10", "11 to 50"]))
+    assert encoder.feature_names == ["INDUSTRY_Banking", "INDUSTRY_Retail", "INDUSTRY_Unknown",
+                                     "EM_1 to 10", "EM_11 to 50", "EM_Unknown"]
+    encoder.save(str(tmp_path / "categories.json"))
+    loaded = CategoricalEncoder.load(str(tmp_path / "categories.json"))
+    assert loaded.feature_names == encoder.feature_names
+    assert loaded.fingerprint() == encoder.fingerprint()
+
+    df = companies(["Mining", "Retail", None], ["51 to 200", "1 to 10", "11 to 50"])
+    dense = loaded.transform(df)
+    assert dense.tolist() == [[0, 0, 1, 0, 0, 1], [0, 1, 0, 1, 0, 0], [0, 0, 1, 0, 1, 0]]
+    assert loaded.unseen(df) == {"INDUSTRY": 1, "EMPLOYEE_RANGE": 1}
+    assert (loaded.transform(df, sparse=True).toarray() == dense).all()
+
+
+def test_loader_with_frozen_vocabulary(synthetic_files, tmp_path):
+    loader = DataLoader(**synthetic_files)
+    merged = loader.load_and_preprocess()
+    industries = [name for name in merged.columns if name.startswith("INDUSTRY_")]
+    assert "INDUSTRY_Unknown" in industries
+    assert (merged[industries].sum(axis=1) == 1).all()
+
+    # A vocabulary that lacks an industry of the data counts it as Unknown, in the same columns
+    customers, noncustomers = loader.load_companies()
+    known = pd.concat([customers, noncustomers], ignore_index=True)
+    dropped = sorted(set(known["INDUSTRY"]) - {"Unknown"})[0]
+    frozen = CategoricalEncoder().fit(known[known["INDUSTRY"] != dropped])
+
+    cached = DataLoader(**synthetic_files, cache_dir=str(tmp_path / "cache"), encoder=frozen)
+    encoded = cached.load_and_preprocess()
+    assert encoded.columns.tolist() == [name for name in merged.columns if name != f"INDUSTRY_{dropped}"]
+    np.testing.assert_array_equal(encoded["INDUSTRY_Unknown"],
+                                  merged["INDUSTRY_Unknown"] + merged[f"INDUSTRY_{dropped}"])
+    # The cache is keyed by the vocabulary as well as the files
+    pd.testing.assert_frame_equal(DataLoader(**synthetic_files, cache_dir=str(tmp_path / "cache"))
+                                  .load_and_preprocess(), merged)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from api.codec import decode_ids, decode_record, decode_response, encode_ids, encode_record, iter_records
+
+
+def test_record_round_trip():
+    rng = np.random.default_rng(0)
+    ids = np.array([5, 3, 9], dtype=np.int64)
+    probabilities = rng.random((3, 3), dtype=np.float32)
+    data = encode_record(ids, probabilities, [7, -1], last=False)
+    assert len(data) % 8 == 0
+
+    record = decode_record(data)
+    np.testing.assert_array_equal(record.ids, ids)
+    np.testing.assert_array_equal(record.probabilities, probabilities)
+    np.testing.assert_array_equal(record.classes, probabilities.argmax(axis=1))
+    assert record.missing_ids.tolist() == [7, -1]
+    assert not record.last
+
+
+def test_streamed_records_decode_from_any_chunking():
+    rng = np.random.default_rng(1)
+    parts = [(np.arange(4) + 10 * i, rng.random((4, 2), dtype=np.float32), [100 + i]) for i in range(3)]
+    parts.append((np.empty(0, dtype=np.int64), None, [200, 201]))
+    body = b"".join(encode_record(ids, p, missing, last=i == len(parts) - 1)
+                    for i, (ids, p, missing) in enumerate(parts))
+
+    for size in (1, 7, 64, len(body)):
+        records = list(iter_records(body[i:i + size] for i in range(0, len(body), size)))
+        assert [len(record.ids) for record in records] == [4, 4, 4, 0]
+        assert records[-1].last
+
+    result = decode_response(body)
+    assert result.ids.tolist() == list(range(4)) + list(range(10, 14)) + list(range(20, 24))
+    assert result.probabilities.shape == (12, 2)
+    assert result.missing_ids.tolist() == [100, 101, 102, 200, 201]
+
+    with pytest.raises(ValueError):
+        decode_response(body[:-8])
+
+
+def test_decode_ids():
+    assert decode_ids(encode_ids([1, -2, 2 ** 40])).tolist() == [1, -2, 2 ** 40]
+    with pytest.raises(ValueError):
+        decode_ids(b"\x01\x02\x03")
+
+
+def test_binary_endpoint_matches_json(linear_model, synthetic_files, serve_app):
+    path, ids, expected = linear_model
+    config = {
+        "data": dict(synthetic_files, cache_dir=None),
+        "serving": {"model": {"name": "logistic_regression", "path": path + ".pkl"},
+                    "prediction_cache": {"max_request_ids": 20}},
+    }
+    request_ids = ids[:50].tolist() + [-1, -2]
+    with serve_app(config) as (client, app_module):
+        # Bulk requests bypass the prediction cache; the streamed chunks of 7 ids use it
+        response = client.post("/predict/binary", content=encode_ids(request_ids))
+        assert len(app_module.prediction_cache) == 0
+        body = client.post("/predict/", json={"ids": request_ids}).json()
+        with client.stream("POST", "/predict/binary?stream=true&chunk_size=7",
+                           content=encode_ids(request_ids)) as streamed:
+            records = list(iter_records(streamed.iter_bytes()))
+        assert client.post("/predict/binary", content=b"\x00" * 12).status_code == 400
+
+    assert response.status_code == 200
+    result = decode_response(response.content)
+    assert result.ids.tolist() == body["ids"] == ids[:50].tolist()
+    assert result.classes.tolist() == body["predictions"]
+    assert result.missing_ids.tolist() == body["missing_ids"] == [-1, -2]
+    np.testing.assert_allclose(result.probabilities, expected[:50], atol=1e-5)
+
+    assert len(records) == 8
+    assert np.concatenate([record.ids for record in records]).tolist() == body["ids"]
+    assert np.concatenate([record.classes for record in records]).tolist() == body["predictions"]
+    assert records[-1].missing_ids.tolist() == [-1, -2]
@@ -0,0 +1,63 @@
+import contextlib
+
+import pytest
+import yaml
+
+from data.loader import DataLoader
+from data.synthetic import generate_dataset
+from models.registry import get_model
+from preprocess.registry import get_preprocessor
+
+
+@pytest.fixture(scope="session")
+def synthetic_files(tmp_path_factory):
+    """
+    Small synthetic customers/noncustomers/actions CSVs shared by the tests.
+    """
+    return generate_dataset(str(tmp_path_factory.mktemp("data")), num_customers=60,
+                            num_noncustomers=140, num_actions=5_000, num_industries=12)
+
+
+@pytest.fixture(scope="session")
+def linear_model(synthetic_files, tmp_path_factory):
+    """
+    A logistic regression trained and saved the way scripts/model_train.py does it.
+    Returns its path (without extension), the customer ids and their expected probabilities.
+    """
+    data = DataLoader(**synthetic_files).load_and_preprocess()
+    features = data.drop(columns=["id", "IS_CUSTOMER"])
+    preprocessor = get_preprocessor("logistic_regression")
+    model = get_model("logistic_regression", max_iter=500)
+    model.train(preprocessor.preprocess(features), data["IS_CUSTOMER"].to_numpy())
+
+    path = str(tmp_path_factory.mktemp("linear") / "logistic_regression_model")
+    model.save(path)
+    preprocessor.save(path + "_preprocessor.json")
+    expected = model.predict_proba(preprocessor.preprocess(features))
+    return path, data["id"].to_numpy(), expected
+
+
+@pytest.fixture(scope="session")
+def serve_app(tmp_path_factory):
+    """
+    Context manager that serves api.app in process with a configuration dict, e.g.
+
+        with serve_app({"data": ..., "serving": ...}) as (client, app_module):
+            client.post("/predict/", json=...)
+
+    yields a fastapi TestClient once every startup phase is done, and the freshly
+    imported api.app module. With ready=False, startup is expected to fail instead.
+    """
+    @contextlib.contextmanager
+    def serve(config: dict, timeout: float = 120, ready: bool = True):
+        from fastapi.testclient import TestClient
+        from scripts.replay import load_app
+
+        config_path = tmp_path_factory.mktemp("app") / "config.yaml"
+        config_path.write_text(yaml.safe_dump(config))
+        app_module = load_app(str(config_path))
+        with TestClient(app_module.app) as client:
+            assert app_module.startup.wait(timeout=timeout) is ready, app_module.startup.status()
+            yield client, app_module
+
+    return serve
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.feature_store import FeatureStore
+
+
+def make_frame(ids):
+    return pd.DataFrame({
+        "id": ids,
+        "ALEXA_RANK": np.arange(len(ids), dtype=np.float64),
+        "IS_CUSTOMER": np.ones(len(ids), dtype=np.int64),
+        "INDUSTRY_Software": np.ones(len(ids), dtype=np.uint8),
+    })
+
+
+@pytest.mark.parametrize("ids", [[3, 1, 7, 5], [10**12, 5, 10**9, 42]])
+def test_lookup_preserves_request_order_and_reports_missing(ids):
+    store = FeatureStore.from_frame(make_frame(ids))
+
+    assert store.feature_names == ["ALEXA_RANK", "INDUSTRY_Software"]
+    assert store.features.dtype == np.float32
+    assert store.features.flags["C_CONTIGUOUS"]
+
+    result = store.lookup([ids[2], 999, ids[0], ids[2], -4])
+    assert result.ids.tolist() == [ids[2], ids[0], ids[2]]
+    assert result.features[:, 0].tolist() == [2.0, 0.0, 2.0]
+    assert result.missing_ids == [999, -4]
+
+
+def test_lookup_into_preallocated_buffer():
+    store = FeatureStore.from_frame(make_frame([1, 2, 3]))
+    buffer = np.zeros((8, store.num_features), dtype=np.float32)
+
+    result = store.lookup([3, 1], out=buffer)
+    assert np.shares_memory(result.features, buffer)
+    assert buffer[:2, 0].tolist() == [2.0, 0.0]
+
+
+def test_update_rows_copies_only_touched_rows():
+    store = FeatureStore.from_frame(make_frame(list(range(100))))
+    first = store.update_rows(np.array([7, 3]), np.full((2, 2), -1.0))
+    second = first.update_rows(np.array([3, 50]), np.full((2, 2), -2.0))
+    assert second.version == 2
+    assert np.shares_memory(second._base, store.features)
+    assert second._patch_rows.tolist() == [3, 7, 50]
+
+    assert second.lookup([50, 3, 7, 8]).features[:, 0].tolist() == [-2.0, -2.0, -1.0, 8.0]
+    assert first.lookup([50, 3]).features[:, 0].tolist() == [50.0, -1.0]
+    assert store.lookup([3]).features[:, 0].tolist() == [3.0]
+    np.testing.assert_array_equal(second.features, second.lookup(second.ids).features)
+
+    compacted = second.update_rows(np.arange(10, 20), np.zeros((10, 2)))
+    assert len(compacted._patch_rows) == 0
+    assert not np.shares_memory(compacted.features, store.features)
+    np.testing.assert_array_equal(compacted.features[[3, 7, 15], 0], [-2.0, -1.0, 0.0])
+
+
+def test_duplicate_ids_rejected():
+    with pytest.raises(ValueError):
+        FeatureStore.from_frame(make_frame([1, 1]))
+
+
+def test_incremental_refresh_matches_full_rebuild(synthetic_files, tmp_path):
+    from data.loader import DataLoader
+    from data.refresh import FeatureRefresher
+
+    actions = pd.read_csv(synthetic_files["actions_file"])
+    initial_file = tmp_path / "initial_actions.csv"
+    actions.iloc[:4000].to_csv(initial_file, index=False)
+    files = dict(synthetic_files, actions_file=str(initial_file))
+
+    refresher = FeatureRefresher(DataLoader(**files))
+    initial = refresher.build()
+    expected_initial = FeatureStore.from_frame(DataLoader(**files).load_and_preprocess())
+    np.testing.assert_array_equal(initial.ids, expected_initial.ids)
+    np.testing.assert_allclose(initial.features, expected_initial.features)
+
+    refresher.apply_actions(actions.iloc[4000:4500])
+    updated = refresher.apply_actions(actions.iloc[4500:])
+    assert updated.version == 2
+    assert initial.version == 0
+
+    expected = FeatureStore.from_frame(DataLoader(**synthetic_files).load_and_preprocess())
+    assert sorted(updated.ids.tolist()) == expected.ids.tolist()
+    np.testing.assert_allclose(updated.lookup(expected.ids).features, expected.features, rtol=1e-6)
+
+
+def test_failed_refresh_leaves_aggregates_unchanged(synthetic_files, monkeypatch):
+    from data.loader import DataLoader
+    from data.refresh import FeatureRefresher
+
+    actions = pd.read_csv(synthetic_files["actions_file"])
+    refresher = FeatureRefresher(DataLoader(**synthetic_files))
+    initial = refresher.build()
+    batch = actions[actions["id"].isin(initial.ids)].iloc[:200]
+
+    def fail(*args, **kwargs):
+        raise MemoryError
+    with monkeypatch.context() as patch:
+        patch.setattr(FeatureStore, "update_rows", fail)
+        with pytest.raises(MemoryError):
+            refresher.apply_actions(batch)
+    assert refresher.store is initial
+
+    once = FeatureRefresher(DataLoader(**synthetic_files))
+    once.build()
+    np.testing.assert_array_equal(refresher.apply_actions(batch).features, once.apply_actions(batch).features)
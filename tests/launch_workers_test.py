@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import textwrap
+
+import pytest
+
+from scripts.launch_workers import launch, tf_config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_tf_config_lists_cluster_and_task():
+    config = json.loads(tf_config(["localhost:1", "localhost:2"], 1))
+    assert config == {"cluster": {"worker": ["localhost:1", "localhost:2"]},
+                      "task": {"type": "worker", "index": 1}}
+
+
+def test_failing_worker_stops_the_others(tmp_path):
+    script = textwrap.dedent("""
+        import json, os, sys, time
+        if json.loads(os.environ["TF_CONFIG"])["task"]["index"] == 1:
+            sys.exit(3)
+        time.sleep(60)
+    """)
+    codes = launch([sys.executable, "-c", script], 2)
+    assert codes[1] == 3
+    assert codes[0] != 0
+
+
+def test_multi_worker_training_stays_in_sync(tmp_path):
+    pytest.importorskip("tensorflow")
+    script = textwrap.dedent(f"""
+        import json, os
+        import numpy as np
+        import tensorflow as tf
+        from models.tensorflow_model import TensorFlowModel
+
+        class CountSteps(tf.keras.callbacks.Callback):
+            steps = []
+            def on_epoch_begin(self, epoch, logs=None):
+                self.steps.append(0)
+            def on_train_batch_end(self, batch, logs=None):
+                self.steps[-1] += 1
+
+        model = TensorFlowModel(hidden_units=4, epochs=2, batch_size=32, seed=0, strategy="multi_worker")
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal((256, 3)).astype(np.float32)
+        y = (X[:, 0] > 0).astype(np.int64)
+        model.train(X, y, X, y, callbacks=[CountSteps()])
+        weights = [w.tolist() for w in model.model.get_weights()]
+        with open(os.path.join({repr(str(tmp_path))}, f"worker-{{model.worker_index}}.json"), "w") as f:
+            json.dump({{"workers": model.num_workers, "chief": model.is_chief, "weights": weights,
+                       "steps": CountSteps.steps}}, f)
+    """)
+    assert launch([sys.executable, "-c", script], 2, env={"PYTHONPATH": ROOT}) == [0, 0]
+
+    results = [json.loads((tmp_path / f"worker-{index}.json").read_text()) for index in range(2)]
+    assert [result["workers"] for result in results] == [2, 2]
+    assert [result["chief"] for result in results] == [True, False]
+    # Every epoch covers all rows: 128 per worker, global batches of 32 split into 16 per worker
+    assert [result["steps"] for result in results] == [[8, 8], [8, 8]]
+    # Synchronous training: both workers end with the same weights
+    assert results[0]["weights"] == results[1]["weights"]
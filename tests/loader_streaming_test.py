@@ -0,0 +1,18 @@
+import pandas as pd
+
+from data.loader import DataLoader
+
+
+def test_streaming_merge_matches_full_merge(synthetic_files):
+    expected = DataLoader(**synthetic_files).load_and_preprocess()
+    streamed = DataLoader(**synthetic_files, chunksize=777).load_and_preprocess()
+
+    assert len(expected) > 100
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+def test_parallel_merge_matches_full_merge(synthetic_files):
+    expected = DataLoader(**synthetic_files).load_and_preprocess()
+    parallel = DataLoader(**synthetic_files, chunksize=1_500, num_workers=3).load_and_preprocess()
+
+    pd.testing.assert_frame_equal(parallel, expected)
@@ -1,15 +1,39 @@
+import numpy as np
+import pandas as pd
+
 from data.loader import DataLoader
+from data.synthetic import START_DATE, format_timestamps, generate_dataset
+
+
+def test_load_and_preprocess(synthetic_files):
+    merged = DataLoader(**synthetic_files).load_and_preprocess()
+    customers = pd.read_csv(synthetic_files["customers_file"])
+
+    assert merged["id"].is_unique
+    assert set(merged["IS_CUSTOMER"].unique()) <= {0.0, 1.0}
+    assert merged.loc[merged["IS_CUSTOMER"] == 1, "id"].isin(customers["id"]).all()
+    assert any(column.startswith("INDUSTRY_") for column in merged.columns)
+
+
+def test_cached_load_matches_build(synthetic_files, tmp_path):
+    expected = DataLoader(**synthetic_files).load_and_preprocess()
+    loader = DataLoader(**synthetic_files, cache_dir=str(tmp_path))
+
+    pd.testing.assert_frame_equal(loader.load_and_preprocess(), expected)
+    # Second load comes from the cache
+    pd.testing.assert_frame_equal(loader.load_and_preprocess(), expected)
+
 
-# File paths
-customers_file = "./data/customers.csv"
-noncustomers_file = "./data/noncustomers.csv"
-actions_file = "./data/usage_actions.csv"
+def test_format_timestamps_matches_strftime():
+    seconds = np.array([0, 59, 86_399, 86_400, 5_097_600, 31_535_999])
+    expected = (START_DATE + pd.to_timedelta(seconds, unit="s")).strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+    assert format_timestamps(seconds).tolist() == expected.tolist()
 
-# Initialize loader
-loader = DataLoader(customers_file, noncustomers_file, actions_file)
 
-# Load and preprocess data
-merged_data = loader.load_and_preprocess()
+def test_generated_actions_do_not_depend_on_workers(tmp_path):
+    sizes = dict(num_customers=10, num_noncustomers=20, num_actions=2_500, chunk_rows=1_000)
+    single = generate_dataset(str(tmp_path / "single"), **sizes)
+    parallel = generate_dataset(str(tmp_path / "parallel"), num_workers=2, **sizes)
 
-# Display the processed data
-print(merged_data.head())
\ No newline at end of file
+    with open(single["actions_file"], "rb") as a, open(parallel["actions_file"], "rb") as b:
+        assert a.read() == b.read()
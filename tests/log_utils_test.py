@@ -0,0 +1,30 @@
+import logging
+
+from api.log_utils import RateLimitedFilter
+
+
+def make_record(msg, level=logging.INFO, lineno=10):
+    return logging.LogRecord("api.app", level, "app.py", lineno, msg, None, None)
+
+
+def test_rate_limited_per_call_site():
+    log_filter = RateLimitedFilter(rate=2, per_seconds=60)
+
+    assert [log_filter.filter(make_record(f"request {i}")) for i in range(4)] == [True, True, False, False]
+    # Other call sites and errors are not affected
+    assert log_filter.filter(make_record("other", lineno=11))
+    assert log_filter.filter(make_record("failure", level=logging.ERROR))
+
+
+def test_suppressed_count_reported_in_next_window(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("api.log_utils.time.monotonic", lambda: now[0])
+    log_filter = RateLimitedFilter(rate=1, per_seconds=1.0)
+
+    assert log_filter.filter(make_record("first"))
+    assert not log_filter.filter(make_record("dropped"))
+    assert not log_filter.filter(make_record("dropped"))
+    now[0] = 1.5
+    record = make_record("next")
+    assert log_filter.filter(record)
+    assert record.getMessage() == "next (2 similar messages suppressed)"
@@ -0,0 +1,162 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from api.model_manager import ModelManager
+from api.workers import InferenceWorkerPool
+from data.loader import DataLoader
+from models.registry import get_model
+from models.serving import load_serving_model, publish_version, read_manifest
+from preprocess.registry import get_preprocessor
+
+
+@pytest.fixture(scope="module")
+def training_data(synthetic_files):
+    data = DataLoader(**synthetic_files).load_and_preprocess()
+    return data.drop(columns=["id", "IS_CUSTOMER"]), data["IS_CUSTOMER"].to_numpy(), data["id"].to_numpy()
+
+
+def train(training_data, path: str, flip: bool = False, C: float = 1.0) -> str:
+    """
+    Train and save a logistic regression the way scripts/model_train.py does; flip
+    trains on inverted labels, for a model that disagrees with the others.
+    """
+    features, labels, _ = training_data
+    preprocessor = get_preprocessor("logistic_regression")
+    model = get_model("logistic_regression", max_iter=500, C=C)
+    model.train(preprocessor.preprocess(features), 1 - labels if flip else labels)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    preprocessor.save(path + "_preprocessor.json")
+    model.save(path + ".tmp")
+    os.replace(path + ".tmp.pkl", path + ".pkl")
+    return path + ".pkl"
+
+
+def build_pool(model_path, preprocessor_path):
+    return InferenceWorkerPool(load_serving_model("logistic_regression", model_path,
+                                                  preprocessor_path=preprocessor_path))
+
+
+def shadow_requests(manager, features: np.ndarray, count: int):
+    for i in range(count):
+        rows = features[i * 4:(i + 1) * 4]
+        manager.shadow(rows, manager.active.pool.submit(rows).result(), 0.001)
+    deadline = time.monotonic() + 10
+    while manager.comparison.requests < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_new_model_file_is_swapped_in_and_rolled_back(training_data, tmp_path):
+    path = train(training_data, str(tmp_path / "model"))
+    manager = ModelManager(build_pool, {}, model_path=path)
+    manager.load_initial()
+    first = manager.active.version
+    assert manager.active.preprocessor_path == str(tmp_path / "model_preprocessor.json")
+
+    manager.poll()
+    assert manager.active.version == first
+
+    train(training_data, str(tmp_path / "model"), C=0.01)
+    manager.poll()
+    assert manager.active.version != first
+    assert manager.previous.version == first
+
+    manager.rollback()
+    assert manager.active.version == first
+    manager.stop()
+
+
+def test_shadowed_version_is_judged_before_promotion(training_data, tmp_path):
+    features = training_data[0].to_numpy(dtype=np.float32)
+    publish_dir = str(tmp_path / "published")
+    manifest = os.path.join(publish_dir, "manifest.json")
+    publish_version(publish_dir, train(training_data, str(tmp_path / "v1" / "model")),
+                    str(tmp_path / "v1" / "model_preprocessor.json"))
+    manager = ModelManager(build_pool, {}, manifest_path=manifest, shadow_sample_rate=1.0,
+                           shadow_min_requests=5, min_agreement=0.9, max_latency_ratio=None)
+    manager.load_initial()
+    first = manager.active.version
+    assert first == read_manifest(manifest)["version"]
+
+    # A model that predicts the opposite class is rejected after shadowing
+    publish_version(publish_dir, train(training_data, str(tmp_path / "v2" / "model"), flip=True),
+                    str(tmp_path / "v2" / "model_preprocessor.json"))
+    manager.poll()
+    assert manager.candidate is not None and manager.active.version == first
+    shadow_requests(manager, features, 5)
+    assert manager.comparison.agreement < 0.9
+    manager.judge()
+    assert manager.candidate is None and manager.active.version == first
+    assert manager.status()["rejected_version"] == read_manifest(manifest)["version"]
+
+    # A close retrain is promoted
+    publish_version(publish_dir, train(training_data, str(tmp_path / "v3" / "model"), C=0.9),
+                    str(tmp_path / "v3" / "model_preprocessor.json"))
+    manager.poll()
+    shadow_requests(manager, features, 5)
+    manager.judge()
+    assert manager.active.version == read_manifest(manifest)["version"]
+    assert manager.previous.version == first
+    manager.stop()
+
+
+def test_version_failing_warm_up_is_not_served(training_data, tmp_path):
+    path = train(training_data, str(tmp_path / "model"))
+
+    def warm_up(deployment):
+        if manager.active is not None:
+            raise ValueError("features do not match")
+
+    manager = ModelManager(build_pool, {}, model_path=path, warm_up=warm_up)
+    manager.load_initial()
+    first = manager.active.version
+    train(training_data, str(tmp_path / "model"), C=0.01)
+    manager.poll()
+    assert manager.active.version == first
+    assert manager.status()["rejected_version"] != first
+    manager.stop()
+
+
+def test_api_swaps_published_versions(training_data, synthetic_files, serve_app, tmp_path):
+    ids = training_data[2]
+    publish_dir = str(tmp_path / "published")
+    publish_version(publish_dir, train(training_data, str(tmp_path / "v1" / "model")),
+                    str(tmp_path / "v1" / "model_preprocessor.json"))
+    config = {
+        "data": dict(synthetic_files, cache_dir=None),
+        "serving": {
+            "model": {"name": "logistic_regression", "manifest": os.path.join(publish_dir, "manifest.json")},
+            "model_manager": {"enabled": True, "interval_seconds": 0.1},
+        },
+    }
+    with serve_app(config) as (client, _):
+        before = client.post("/predict/", json={"ids": ids[:20].tolist()}).json()["predictions"]
+        assert client.post("/admin/model/rollback").status_code == 409
+
+        version = publish_version(publish_dir, train(training_data, str(tmp_path / "v2" / "model"), flip=True),
+                                  str(tmp_path / "v2" / "model_preprocessor.json"))
+        deadline = time.monotonic() + 30
+        while client.get("/admin/model").json()["active"]["version"] != version:
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+        after = client.post("/predict/", json={"ids": ids[:20].tolist()}).json()["predictions"]
+        assert after == [1 - p for p in before]
+
+        status = client.post("/admin/model/rollback").json()
+        assert status["previous"]["version"] == version
+        assert client.post("/predict/", json={"ids": ids[:20].tolist()}).json()["predictions"] == before
+
+
+def test_admin_endpoints_answer_503_before_the_model_is_loaded(tmp_path):
+    from fastapi.testclient import TestClient
+    from scripts.replay import load_app
+
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("{}\n")
+    # Without entering the client, the startup phases never run
+    client = TestClient(load_app(str(config_path)).app)
+    assert client.get("/admin/model").status_code == 503
+    assert client.post("/admin/model/promote").status_code == 503
+    assert client.post("/admin/model/rollback").status_code == 503
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from preprocess.numeric_preprocessor import NumericPreprocessor
+
+
+def test_preprocessor_round_trip_and_in_place_transform(tmp_path):
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.normal(5, 3, size=(200, 4)), columns=["a", "b", "c", "d"])
+    data.loc[::7, "b"] = np.nan
+    data["d"] = 2.0
+    expected = StandardScaler().fit_transform(data.fillna(-1))
+
+    NumericPreprocessor().fit(data).save(str(tmp_path / "preprocessor.json"))
+    preprocessor = NumericPreprocessor.load(str(tmp_path / "preprocessor.json"))
+    assert preprocessor.get_required_features() == ["a", "b", "c", "d"]
+
+    features = np.ascontiguousarray(data.to_numpy(dtype=np.float32))
+    transformed = preprocessor.transform(features, copy=False)
+    assert np.shares_memory(transformed, features)
+    np.testing.assert_allclose(transformed, expected, atol=1e-5)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from models.numpy_runtime import NumpyMLP, export_keras
+from models.serving import model_input_width
+
+tf = pytest.importorskip("tensorflow")
+
+
+@pytest.mark.parametrize("hidden_activation,output_activation", [("relu", "softmax"), ("tanh", "sigmoid")])
+def test_numpy_runtime_matches_keras(tmp_path, hidden_activation, output_activation):
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.InputLayer(input_shape=(20,)),
+        tf.keras.layers.Dense(16, activation=hidden_activation),
+        tf.keras.layers.Dropout(0.5),
+        tf.keras.layers.Dense(2, activation=output_activation),
+    ])
+    path = str(tmp_path / "model.npz")
+    export_keras(model, path)
+    assert model_input_width(path) == 20
+
+    runtime = NumpyMLP(path)
+    inputs = np.random.default_rng(0).normal(scale=3.0, size=(64, 20)).astype(np.float32)
+    outputs = runtime(inputs)
+    assert outputs.dtype == np.float32
+    np.testing.assert_allclose(outputs, model(inputs, training=False).numpy(), atol=1e-5)
+
+
+def test_unsupported_layers_rejected(tmp_path):
+    model = tf.keras.Sequential([
+        tf.keras.layers.InputLayer(input_shape=(4,)),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Dense(2, activation="softmax"),
+    ])
+    with pytest.raises(ValueError):
+        export_keras(model, str(tmp_path / "model.npz"))
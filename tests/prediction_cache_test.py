@@ -0,0 +1,46 @@
+import numpy as np
+
+from api.prediction_cache import PredictionCache
+
+
+def test_lru_eviction_and_versioned_keys():
+    cache = PredictionCache(max_entries=2)
+    cache.put_many("m1", 0, [1, 2], np.array([[0.1, 0.9], [0.8, 0.2]]))
+    assert cache.get_many("m1", 0, [1])[0].tolist() == [0.1, 0.9]
+
+    # 2 is least recently used now
+    cache.put_many("m1", 0, [3], np.array([[0.5, 0.5]]))
+    hits = cache.get_many("m1", 0, [1, 2, 3])
+    assert [hit is not None for hit in hits] == [True, False, True]
+
+    # A new model or feature store version does not see older entries
+    assert cache.get_many("m2", 0, [1]) == [None]
+    assert cache.get_many("m1", 1, [1]) == [None]
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("api.prediction_cache.time.monotonic", lambda: now[0])
+    cache = PredictionCache(max_entries=10, ttl_seconds=5)
+    cache.put_many("m1", 0, [1], np.array([[0.1, 0.9]]))
+
+    now[0] = 4.0
+    assert cache.get_many("m1", 0, [1])[0] is not None
+    now[0] = 6.0
+    assert cache.get_many("m1", 0, [1]) == [None]
+    assert len(cache) == 0
+
+
+def test_large_request_does_not_flush_hot_entries():
+    cache = PredictionCache(max_entries=100, max_entries_per_request=20)
+    cache.put_many("m1", 0, [1], np.array([[0.1, 0.9]]))
+    for start in range(100, 199, 11):
+        cache.put_many("m1", 0, list(range(start, start + 11)), np.zeros((11, 2)))
+    assert len(cache) == 100
+    assert cache.get_many("m1", 0, [1])[0] is not None
+
+    cache.put_many("m1", 0, list(range(1000, 1500)), np.zeros((500, 2)))
+    assert len(cache) == 100
+    assert cache.get_many("m1", 0, [1])[0].tolist() == [0.1, 0.9]
+    hits = cache.get_many("m1", 0, list(range(1000, 1500)))
+    assert sum(hit is not None for hit in hits) == 20
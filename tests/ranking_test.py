@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from api.ranking import ScoreTable, top_k
+from data.feature_store import FeatureStore
+from data.loader import DataLoader
+
+
+def test_top_k_matches_full_sort():
+    scores = np.random.default_rng(0).permutation(10_000).astype(np.float32)
+    expected = np.argsort(-scores)
+    for k in (1, 10, 100, 10_000, 20_000):
+        assert top_k(scores, k).tolist() == expected[:k].tolist()
+
+
+@pytest.fixture
+def table():
+    rng = np.random.default_rng(1)
+    num_rows = 1_000
+    segment = (rng.random(num_rows) < 0.3).astype(np.float32)
+    features = np.column_stack([rng.random(num_rows), segment]).astype(np.float32)
+    store = FeatureStore(np.arange(num_rows) * 10, features, ["x", "INDUSTRY_A"])
+    positive = rng.random(num_rows, dtype=np.float32)
+    positive[5] = np.nan
+    return ScoreTable(store, "v1", np.column_stack([1 - positive, positive]))
+
+
+def test_rank_all_and_segment(table):
+    scores = table.probabilities[:, 1]
+    rows, probabilities = table.rank(20)
+    assert rows.tolist() == np.argsort(-scores)[:20].tolist()
+    assert np.all(np.diff(probabilities) <= 0)
+
+    segment = np.flatnonzero(table.store.features[:, 1] == 1)
+    rows, _ = table.rank(10, segment="INDUSTRY_A")
+    assert rows.tolist() == segment[np.argsort(-scores[segment])][:10].tolist()
+    # Smaller k is served from the cached selection, larger k recomputes it
+    assert table.rank(3, segment="INDUSTRY_A")[0].tolist() == rows[:3].tolist()
+    assert table.rank(50, segment="INDUSTRY_A")[0][:10].tolist() == rows.tolist()
+
+    # Unscored (NaN) rows are left out
+    rows, probabilities = table.rank(len(table.store))
+    assert len(rows) == len(table.store) - 1 and 5 not in rows
+    assert np.isfinite(probabilities).all()
+
+
+def test_rank_given_rows(table):
+    rows = np.array([3, 7, 11, 400, 999])
+    ranked, probabilities = table.rank(2, rows=rows)
+    scores = table.probabilities[rows, 1]
+    assert ranked.tolist() == rows[np.argsort(-scores)][:2].tolist()
+    assert ranked.tolist() == table.rank(2, rows=rows, segment=None)[0].tolist()
+
+    # k beyond the scored candidates: the unscored row 5 is not returned as -inf
+    ranked, probabilities = table.rank(10, rows=np.array([5, 3, 7]))
+    assert ranked.tolist() == rows[:2][np.argsort(-scores[:2])].tolist()
+    assert np.isfinite(probabilities).all()
+
+    with pytest.raises(ValueError):
+        table.rank(5, segment="x")
+    with pytest.raises(ValueError):
+        table.rank(5, segment="INDUSTRY_B")
+    with pytest.raises(ValueError):
+        table.rank(5, class_index=2)
+
+
+def test_rank_and_probabilities(linear_model, synthetic_files, serve_app):
+    path, ids, expected = linear_model
+    config = {
+        "data": dict(synthetic_files, cache_dir=None),
+        "serving": {"model": {"name": "logistic_regression", "path": path + ".pkl"},
+                    "ranking": {"precompute": True, "chunk_rows": 50}},
+    }
+    data = DataLoader(**synthetic_files).load_and_preprocess()
+    segment = next(column for column in data.columns if column.startswith("INDUSTRY_"))
+    with serve_app(config) as (client, _):
+        predicted = client.post("/predict/?probabilities=true", json={"ids": ids[:5].tolist()}).json()
+        top = client.post("/rank", json={"k": 10}).json()
+        in_segment = client.post("/rank", json={"k": 3, "segment": segment}).json()
+        subset = client.post("/rank", json={"k": 2, "ids": ids[:8].tolist() + [-1]}).json()
+        assert client.post("/rank", json={"k": 3, "segment": "nope"}).status_code == 400
+        assert client.post("/rank", json={"k": 0}).status_code == 400
+
+    np.testing.assert_allclose(predicted["probabilities"], expected[:5], atol=1e-5)
+    order = np.argsort(-expected[:, 1], kind="stable")
+    assert top["ids"] == ids[order[:10]].tolist()
+    np.testing.assert_allclose(top["probabilities"], expected[order[:10], 1], atol=1e-5)
+    members = set(data.loc[data[segment] == 1, "id"])
+    assert set(in_segment["ids"]) <= members
+    assert in_segment["ids"] == [i for i in ids[order] if i in members][:3]
+    assert subset["ids"] == ids[:8][np.argsort(-expected[:8, 1], kind="stable")][:2].tolist()
+    assert subset["missing_ids"] == [-1]
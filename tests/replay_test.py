@@ -0,0 +1,104 @@
+import asyncio
+
+import numpy as np
+import pytest
+import yaml
+
+from api.recording import RequestRecorder
+from data.loader import DataLoader
+from models.sklearn_logistic_model import LogisticRegressionModel
+from preprocess.numeric_preprocessor import NumericPreprocessor
+from scripts.replay import (arrival_offsets, find_saturation, generate_requests, read_requests, replay,
+                            request_sizes, serve_in_process, write_requests)
+
+
+@pytest.mark.parametrize("distribution", ["fixed", "uniform", "geometric", "lognormal"])
+def test_request_sizes(distribution):
+    sizes = request_sizes(20_000, distribution, mean_size=10, max_size=1000, rng=np.random.default_rng(0))
+    assert sizes.min() >= 1 and sizes.max() <= 1000
+    assert abs(sizes.mean() - 10) < 1.0
+
+
+def test_request_log_round_trip(tmp_path):
+    requests = generate_requests(np.arange(100), 50, "uniform", mean_size=5, rate=100.0)
+    path = tmp_path / "requests.jsonl"
+    write_requests(str(path), requests)
+    # Bare payloads are /predict/ requests without an arrival time
+    with open(path, "a") as f:
+        f.write('{"ids": [1, 2]}\n')
+
+    read = read_requests(str(path))
+    assert read[:-1] == requests
+    assert read[-1] == {"t": None, "path": "/predict/", "body": {"ids": [1, 2]}}
+    assert all(len(set(request["body"]["ids"])) == len(request["body"]["ids"]) for request in requests)
+
+
+def test_find_saturation():
+    closed = [{"concurrency": c, "error_rate": 0.0, "p99_ms": 5.0, "throughput_per_s": t}
+              for c, t in ((1, 100.0), (4, 350.0), (16, 360.0))]
+    assert find_saturation(closed) == 2
+    opened = [{"rate": r, "offered_per_s": r, "error_rate": 0.0, "p99_ms": p, "throughput_per_s": t}
+              for r, p, t in ((100, 5.0, 99.0), (200, 40.0, 198.0), (400, 90.0, 300.0))]
+    assert find_saturation(opened) == 2
+    assert find_saturation(opened, p99_slo_ms=20.0) == 1
+    assert find_saturation(opened[:2]) is None
+
+
+def test_recorder_samples_and_limits(tmp_path):
+    path = tmp_path / "recorded.jsonl"
+    recorder = RequestRecorder(str(path), max_requests=3)
+    for i in range(5):
+        recorder.record("/predict/", {"ids": [i]})
+    recorder.close()
+    recorder.record("/predict/", {"ids": [9]})
+
+    reopened = RequestRecorder(str(path))
+    reopened.record("/predict/", {"ids": [10]})
+    reopened.close()
+
+    recorded = read_requests(str(path))
+    assert [request["body"]["ids"] for request in recorded] == [[0], [1], [2], [10]]
+    times = [request["t"] for request in recorded]
+    assert times == sorted(times)
+
+
+def test_arrival_offsets_follow_on_where_times_go_backwards():
+    np.testing.assert_allclose(arrival_offsets([100.0, 100.5, 101.0]), [0.0, 0.5, 1.0])
+    np.testing.assert_allclose(arrival_offsets([0.0, 1.0, 2.0, 0.0, 1.0]), [0.0, 1.0, 2.0, 3.0, 4.0])
+
+
+def test_replay_in_process_records_traffic(synthetic_files, tmp_path):
+    merged = DataLoader(**synthetic_files).load_and_preprocess()
+    labels = merged.pop("IS_CUSTOMER")
+    preprocessor = NumericPreprocessor().fit(merged.drop(columns=["id"]))
+    model = LogisticRegressionModel(max_iter=200)
+    model.train(preprocessor.transform(merged), labels)
+    model.save(str(tmp_path / "model"))
+    preprocessor.save(str(tmp_path / "model_preprocessor.json"))
+
+    recorded_path = tmp_path / "recorded.jsonl"
+    config = {
+        "data": dict(synthetic_files, cache_dir=None),
+        "serving": {
+            "model": {"name": "logistic_regression", "path": str(tmp_path / "model.pkl"),
+                      "preprocessor_path": str(tmp_path / "model_preprocessor.json")},
+            "record": {"path": str(recorded_path)},
+        },
+    }
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(config))
+    requests = generate_requests(merged["id"].to_numpy(), 30, "geometric", mean_size=4, rate=500.0)
+
+    async def run():
+        async with serve_in_process(str(config_path)) as client:
+            return await replay(client, requests, concurrency=[1, 4], rates=[200.0], recorded=True,
+                                speed=4.0, warmup=0)
+
+    steps = asyncio.run(run())
+    assert len(steps) == 4
+    assert all(step["ok"] == 30 and step["error_rate"] == 0.0 for step in steps)
+    assert steps[2]["offered_per_s"] > 0
+
+    recorded = read_requests(str(recorded_path))
+    assert len(recorded) == 4 * 30
+    assert [request["body"] for request in recorded[:30]] == [request["body"] for request in requests]
@@ -0,0 +1,58 @@
+import os
+import shutil
+import numpy as np
+import pytest
+
+from data.loader import DataLoader
+from models.registry import get_model
+from preprocess.registry import get_preprocessor
+from scripts.score import prepare_features, read_scores, score, shard_path
+
+
+@pytest.fixture(scope="module")
+def trained_model(synthetic_files, tmp_path_factory):
+    data = DataLoader(**synthetic_files).load_and_preprocess()
+    preprocessor = get_preprocessor("logistic_regression")
+    features = preprocessor.preprocess(data.drop(columns=["id", "IS_CUSTOMER"]))
+    model = get_model("logistic_regression", max_iter=200)
+    model.train(features, data["IS_CUSTOMER"].to_numpy())
+    path = str(tmp_path_factory.mktemp("model") / "logistic_regression_model")
+    model.save(path)
+    preprocessor.save(path + "_preprocessor.json")
+    return model, path
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scores_match_model_and_resume(synthetic_files, trained_model, tmp_path, workers):
+    model, model_path = trained_model
+    loader = DataLoader(**synthetic_files)
+    output_dir = str(tmp_path / "scores")
+
+    stats = score(loader, "logistic_regression", model_path, output_dir,
+                  batch_size=16, shard_rows=64, workers=workers)
+    ids, features = prepare_features(loader, "logistic_regression", preprocessor_path=model_path + "_preprocessor.json")
+    assert stats["rows"] == len(ids)
+
+    scores = read_scores(output_dir)
+    assert scores["id"].tolist() == ids.tolist()
+    expected = model.predict_proba(features)
+    np.testing.assert_allclose(scores[["probability_0", "probability_1"]].to_numpy(), expected, rtol=1e-5)
+    assert (scores["prediction"].to_numpy() == expected.argmax(axis=1)).all()
+
+    # A rerun only scores the shards that are missing
+    os.remove(shard_path(output_dir, 1))
+    stats = score(loader, "logistic_regression", model_path, output_dir, batch_size=16, shard_rows=64)
+    assert stats["shards_written"] == 1
+    assert stats["rows"] == 64
+
+    with pytest.raises(ValueError):
+        score(loader, "logistic_regression", model_path, output_dir, batch_size=16, shard_rows=32)
+
+
+def test_missing_preprocessor_is_not_refitted(synthetic_files, trained_model, tmp_path):
+    _, model_path = trained_model
+    # The model without the preprocessor it was trained with
+    shutil.copy(model_path + ".pkl", tmp_path / "logistic_regression_model.pkl")
+    with pytest.raises(FileNotFoundError, match="--raw-features"):
+        score(DataLoader(**synthetic_files), "logistic_regression", str(tmp_path / "logistic_regression_model"),
+              str(tmp_path / "scores"))
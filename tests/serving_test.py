@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from data.loader import DataLoader
+from models.serving import LinearServingFunction, load_serving_model, model_input_width
+
+
+@pytest.mark.parametrize("num_classes,params", [(2, {}), (3, {}), (3, {"solver": "liblinear"})])
+def test_linear_fast_path_matches_sklearn(num_classes, params):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(loc=3.0, scale=5.0, size=(400, 12))
+    y = rng.integers(0, num_classes, size=len(X))
+    scaler = StandardScaler().fit(X)
+    estimator = LogisticRegression(**params).fit(scaler.transform(X), y)
+
+    function = LinearServingFunction.from_estimator(estimator).with_standardization(
+        scaler.mean_, scaler.scale_, fill_value=-1)
+    outputs = function(X.astype(np.float32))
+    assert outputs.dtype == np.float32
+    np.testing.assert_allclose(outputs, estimator.predict_proba(scaler.transform(X)), atol=1e-5)
+
+
+def test_load_serving_model_with_preprocessor(linear_model, synthetic_files):
+    path, _, expected = linear_model
+    function = load_serving_model("logistic_regression", path + ".pkl",
+                                  preprocessor_path=path + "_preprocessor.json")
+    data = DataLoader(**synthetic_files).load_and_preprocess()
+    np.testing.assert_allclose(function(data.drop(columns=["id", "IS_CUSTOMER"]).to_numpy()), expected, atol=1e-5)
+    assert model_input_width(path + ".pkl") == data.shape[1] - 2
+
+
+def test_api_serves_logistic_regression(linear_model, synthetic_files, serve_app):
+    path, ids, expected = linear_model
+    config = {
+        "data": dict(synthetic_files, cache_dir=None),
+        "serving": {"model": {"name": "logistic_regression", "path": path + ".pkl"}},
+    }
+    with serve_app(config) as (client, app_module):
+        assert app_module.model_manager.active.preprocessor_path == path + "_preprocessor.json"
+        body = client.post("/predict/", json={"ids": ids[:20].tolist()}).json()
+    assert body["predictions"] == expected[:20].argmax(axis=1).tolist()
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from scripts.sweep import grid_candidates, random_candidates, run_sweep
+
+
+def test_candidates():
+    assert grid_candidates({"C": [0.1, 1.0], "penalty": ["l2"]}) == [
+        {"C": 0.1, "penalty": "l2"}, {"C": 1.0, "penalty": "l2"}]
+
+    samples = random_candidates({"C": {"min": 0.01, "max": 10.0, "log": True},
+                                 "hidden_units": {"min": 16, "max": 256}}, num_samples=20, seed=1)
+    assert len(samples) == 20
+    assert all(0.01 <= s["C"] <= 10.0 and isinstance(s["hidden_units"], int) for s in samples)
+    assert samples == random_candidates({"C": {"min": 0.01, "max": 10.0, "log": True},
+                                         "hidden_units": {"min": 16, "max": 256}}, num_samples=20, seed=1)
+
+
+def test_sweep_writes_leaderboard(synthetic_files, tmp_path):
+    config = {
+        "model": {"name": "logistic_regression", "params": {"max_iter": 200}},
+        "preprocessor": {"params": {}},
+        "data": dict(synthetic_files, cache_dir=None),
+    }
+    candidates = grid_candidates({"C": [0.01, 1.0], "penalty": ["l2", "bogus"]})
+    leaderboard = run_sweep(config, candidates, str(tmp_path), workers=2)
+
+    assert (tmp_path / "leaderboard.csv").exists()
+    assert leaderboard["rank"].tolist() == [1, 2, 3, 4]
+    assert leaderboard["status"].value_counts().to_dict() == {"ok": 2, "failed": 2}
+    ok = leaderboard[leaderboard["status"] == "ok"]
+    assert ok["accuracy"].is_monotonic_decreasing
+    assert pd.read_csv(tmp_path / "leaderboard.csv")["trial"].nunique() == 4
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from models.tensorflow_model import TensorFlowModel, make_dataset
+
+
+@pytest.fixture
+def matrices(tmp_path):
+    X = np.arange(1000 * 3, dtype=np.float32).reshape(1000, 3)
+    y = np.arange(1000) % 2
+    np.save(tmp_path / "X.npy", X)
+    return X, y, np.load(tmp_path / "X.npy", mmap_mode="r")
+
+
+def epoch_rows(dataset) -> np.ndarray:
+    return np.concatenate([x.numpy()[:, 0] for x, _ in dataset]) / 3
+
+
+@pytest.mark.parametrize("source", ["memory", "mmap"])
+def test_dataset_covers_every_row_once_per_epoch(matrices, source):
+    X, y, X_disk = matrices
+    dataset = make_dataset(X if source == "memory" else X_disk, y, batch_size=64, shuffle=True,
+                           seed=0, block_rows=256)
+    first, second = epoch_rows(dataset), epoch_rows(dataset)
+    np.testing.assert_array_equal(np.sort(first), np.arange(1000))
+    np.testing.assert_array_equal(np.sort(second), np.arange(1000))
+    assert not np.array_equal(first, second)
+
+    for x, labels in dataset.take(3):
+        assert x.shape[1] == 3 and x.dtype == tf.float32
+        np.testing.assert_array_equal(labels.numpy(), (x.numpy()[:, 0] / 3).astype(int) % 2)
+
+
+@pytest.mark.parametrize("source", ["memory", "mmap"])
+def test_shards_are_disjoint(matrices, source):
+    X, y, X_disk = matrices
+    X = X if source == "memory" else X_disk
+    shards = [epoch_rows(make_dataset(X, y, batch_size=64, shard=(2, index), block_rows=128))
+              for index in range(2)]
+    assert not set(shards[0]) & set(shards[1])
+    np.testing.assert_array_equal(np.sort(np.concatenate(shards)), np.arange(1000))
+
+
+def test_train_streams_from_disk_with_early_stopping(tmp_path):
+    tf.keras.utils.set_random_seed(0)
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((512, 3)).astype(np.float32)
+    y = (X[:, 0] > 0).astype(np.int64)
+    np.save(tmp_path / "X.npy", X)
+    X_disk = np.load(tmp_path / "X.npy", mmap_mode="r")
+
+    model = TensorFlowModel(hidden_units=8, epochs=50, batch_size=64, early_stopping_patience=1, seed=0)
+    # Validation labels unrelated to the features: the validation loss stops improving
+    model.train(X_disk, y, X_disk, rng.integers(0, 2, 512))
+    assert len(model.model.history.epoch) < 50
+    assert model.evaluate(X_disk, y)["accuracy"] > 0.6
+    assert model.predict(X).shape == (512,)
+
+
+@pytest.mark.parametrize("source", ["memory", "mmap"])
+def test_resumed_training_matches_uninterrupted(tmp_path, source):
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((300, 3)).astype(np.float32)
+    y = (X[:, 0] > 0).astype(np.int64)
+    if source == "mmap":
+        np.save(tmp_path / "X.npy", X)
+        X = np.load(tmp_path / "X.npy", mmap_mode="r")
+
+    def train(epochs, checkpoint_dir=None):
+        tf.keras.utils.set_random_seed(0)
+        model = TensorFlowModel(hidden_units=8, batch_size=32, seed=1, checkpoint_dir=checkpoint_dir)
+        model.train(X, y, X, y, epochs=epochs)
+        return model
+
+    expected = train(4).model.get_weights()
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    # A run that stops after 2 epochs, then a restart that continues to 4
+    train(2, checkpoint_dir)
+    resumed = train(4, checkpoint_dir)
+    assert len(resumed.model.history.epoch) == 2
+    for actual, wanted in zip(resumed.model.get_weights(), expected):
+        np.testing.assert_allclose(actual, wanted, rtol=1e-5, atol=1e-6)
+
+    resumed.clear_checkpoint()
+    assert len(train(1, checkpoint_dir).model.history.epoch) == 1
+
+
+def test_save_replaces_the_artifact(tmp_path):
+    model = TensorFlowModel(input_shape=(3,), hidden_units=4)
+    model.save(str(tmp_path / "model"))
+    model.save(str(tmp_path / "model"))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model.h5"]
+    loaded = TensorFlowModel()
+    loaded.load(str(tmp_path / "model"))
+    for actual, wanted in zip(loaded.model.get_weights(), model.model.get_weights()):
+        np.testing.assert_array_equal(actual, wanted)
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.loader import DataLoader
+from data.window_features import WindowFeatureBuilder
+
+START = pd.Timestamp("2020-01-01")
+
+
+@pytest.fixture(scope="module")
+def tables():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    actions = pd.DataFrame({
+        "id": rng.integers(0, 60, n),
+        "WHEN_TIMESTAMP": (START + pd.to_timedelta(rng.integers(0, 200 * 86400, n), unit="s"))
+        .strftime("%Y-%m-%d %H:%M:%S"),
+        "A": rng.poisson(3.0, n),
+        "B": rng.random(n),
+    })
+    close_dates = pd.Series(START + pd.to_timedelta(rng.integers(-10, 220, 20), unit="D"))
+    customers = pd.DataFrame({"id": np.arange(20), "CLOSEDATE": close_dates.mask(np.arange(20) == 3)})
+    # Ids 55 to 59 are in neither table
+    noncustomers = pd.DataFrame({"id": np.arange(20, 55)})
+    return actions, customers, noncustomers
+
+
+def expected_features(actions, customers, noncustomers, as_of):
+    """
+    Per-id reference implementation with boolean filters.
+    """
+    times = pd.to_datetime(actions["WHEN_TIMESTAMP"])
+    cutoffs = dict(zip(customers["id"], customers["CLOSEDATE"]))
+    cutoffs.update((i, as_of) for i in noncustomers["id"])
+    rows = {}
+    for i, cutoff in cutoffs.items():
+        before = (actions["id"] == i) & (times < cutoff) if pd.notna(cutoff) else None
+        if before is None or not before.any():
+            continue
+        age = (cutoff - times[before]).dt.total_seconds() / 86400
+        weights = 0.5 ** (age / 30)
+        row = {}
+        for days in (7, 30, 90):
+            window = before & (times >= cutoff - pd.Timedelta(days=days))
+            row[f"NUM_ACTIONS_{days}D"] = window.sum()
+            row[f"A_SUM_{days}D"] = actions.loc[window, "A"].sum()
+            row[f"B_SUM_{days}D"] = actions.loc[window, "B"].sum()
+        row["A_DECAY_30D"] = (actions.loc[before, "A"] * weights).sum() / weights.sum()
+        row["B_DECAY_30D"] = (actions.loc[before, "B"] * weights).sum() / weights.sum()
+        row["DAYS_SINCE_FIRST_ACTION"] = age.max()
+        row["DAYS_SINCE_LAST_ACTION"] = age.min()
+        rows[i] = row
+    return pd.DataFrame.from_dict(rows, orient="index").sort_index()
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_features_match_per_id_filters(tables, tmp_path, spill):
+    actions, customers, noncustomers = tables
+    builder = WindowFeatureBuilder(spill_dir=str(tmp_path) if spill else None, num_partitions=4)
+    for start in range(0, len(actions), 3_000):
+        builder.add(actions.iloc[start:start + 3_000])
+    features = builder.compute(customers, noncustomers).set_index("id")
+
+    as_of = pd.to_datetime(actions["WHEN_TIMESTAMP"]).max() + pd.Timedelta(seconds=1)
+    expected = expected_features(actions, customers, noncustomers, as_of)
+    assert features.index.tolist() == expected.index.tolist()
+    pd.testing.assert_frame_equal(features[expected.columns].astype(np.float64), expected.astype(np.float64),
+                                  check_names=False, rtol=1e-5)
+    # Spilled partitions are removed once computed
+    assert os.listdir(tmp_path) == []
+
+
+def test_loader_adds_window_features(synthetic_files, tmp_path):
+    window_features = {"windows_days": [30], "half_lives_days": [14], "spill_dir": str(tmp_path / "spill"),
+                       "num_partitions": 3}
+    merged = DataLoader(**synthetic_files, window_features=window_features).load_and_preprocess()
+    assert merged["id"].is_unique
+    assert {"NUM_ACTIONS_30D", "ACTIONS_EMAIL_SUM_30D", "ACTIONS_EMAIL_DECAY_14D",
+            "DAYS_SINCE_LAST_ACTION"} <= set(merged.columns)
+    assert merged["DAYS_SINCE_LAST_ACTION"].notna().all()
+    assert (merged["DAYS_SINCE_FIRST_ACTION"] >= merged["DAYS_SINCE_LAST_ACTION"]).all()
+
+    # The streaming path reads the actions file again and gets the same features
+    streamed = DataLoader(**synthetic_files, chunksize=1_000, window_features=window_features).load_and_preprocess()
+    pd.testing.assert_frame_equal(streamed[merged.columns], merged, check_dtype=False)
@@ -0,0 +1,8 @@
+from api.workers import thread_counts
+
+
+def test_thread_counts_split_cpu_budget():
+    assert thread_counts(2.0, 1) == (2, 1)
+    assert thread_counts(16.0, 2) == (8, 2)
+    assert thread_counts(8.0, 4) == (2, 1)
+    assert thread_counts(0.5, 4) == (1, 1)